@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Times ChuniServlet startup with encryption keys configured for every version,
+with the hashed endpoint cache turned off, on a first start that fills it,
+and on a start that reads it back.
+
+Random keys are written to a throwaway config folder, so nothing in the real
+config folder is touched. The database engine doesn't connect until a query
+runs, so no database is needed.
+
+Run from the artemis folder: python -m benchmarks.chuni_startup -c config
+"""
+import argparse
+import os
+import tempfile
+import time
+from os import mkdir, path
+
+import yaml
+
+from core.config import CoreConfig
+from core.data import Data
+from titles.chuni.const import ChuniConstants
+from titles.chuni.index import ChuniServlet
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Chunithm startup benchmark")
+    parser.add_argument("--config", "-c", type=str, default="config")
+    parser.add_argument("--iterations", "-n", type=int, default=5)
+    args = parser.parse_args()
+
+    cfg = CoreConfig()
+    if path.exists(f"{args.config}/core.yaml"):
+        cfg.update(yaml.safe_load(open(f"{args.config}/core.yaml")))
+
+    if not path.exists(cfg.server.log_dir):
+        mkdir(cfg.server.log_dir)
+
+    Data(cfg)
+
+    versions = range(ChuniConstants.VER_CHUNITHM_VERSE + 1)
+    keys = {
+        v: [os.urandom(32).hex(), os.urandom(16).hex(), os.urandom(8).hex()]
+        for v in versions
+    }
+
+    with tempfile.TemporaryDirectory() as cfg_dir:
+        cache_path = f"{cfg_dir}/hash_cache.json"
+
+        def write_config(hash_cache: str) -> None:
+            with open(f"{cfg_dir}/{ChuniConstants.CONFIG_NAME}", "w") as f:
+                yaml.safe_dump(
+                    {"crypto": {"keys": keys, "hash_cache": hash_cache}}, f
+                )
+
+        def start() -> float:
+            begin = time.perf_counter()
+            servlet = ChuniServlet(cfg, cfg_dir)
+            elapsed = time.perf_counter() - begin
+            assert len(servlet.hash_table) == len(versions)
+            return elapsed
+
+        write_config("")
+        no_cache = min(start() for _ in range(args.iterations))
+
+        write_config(cache_path)
+        cold = []
+        for _ in range(args.iterations):
+            if path.exists(cache_path):
+                os.remove(cache_path)
+            cold.append(start())
+
+        warm = min(start() for _ in range(args.iterations))
+
+    print(f"{len(versions)} versions keyed")
+    print(f"   no cache: {no_cache * 1000:.0f}ms")
+    print(f" cold cache: {min(cold) * 1000:.0f}ms")
+    print(f" warm cache: {warm * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Measures how long large request and response bodies hold up the event loop,
+with the codec work done inline and with it moved to worker threads.
+
+While a batch of concurrent unpack/pack calls runs, a ticker task sleeps 1ms
+at a time and records how late it wakes up. The worst delay is roughly how
+long another cabinet's request would have waited. The payload is the chuni
+profile export in the artemis folder, or any captured JSON body passed in.
+
+Run from the artemis folder: python -m benchmarks.codec_offload [payload.json]
+"""
+import argparse
+import asyncio
+import glob
+import json
+import time
+from typing import Any, List, Tuple
+
+from core import serialization
+
+
+async def ticker(delays: List[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        delays.append(time.perf_counter() - start - 0.001)
+
+
+async def run_batch(obj: Any, zipped: bytes, concurrency: int) -> Tuple[float, float]:
+    delays: List[float] = []
+    stop = asyncio.Event()
+    tick = asyncio.create_task(ticker(delays, stop))
+    await asyncio.sleep(0.01)
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *[serialization.unpack(zipped) for _ in range(concurrency)],
+        *[serialization.pack(obj) for _ in range(concurrency)],
+    )
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await tick
+    return elapsed, max(delays)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Codec offload benchmark")
+    parser.add_argument("payload", nargs="?")
+    parser.add_argument("--concurrency", "-n", type=int, default=4)
+    parser.add_argument("--workers", "-w", type=int, default=2)
+    args = parser.parse_args()
+
+    path = args.payload or next(iter(glob.glob("export-*.json")), None)
+    if path is None:
+        parser.error("No payload given and no export-*.json in this folder")
+
+    with open(path, "rb") as f:
+        obj = json.load(f)
+
+    zipped = serialization.encode_response(serialization.dumps(obj))
+    print(
+        f"{path}: {len(zipped) / 1024:.0f}KiB compressed, "
+        f"{args.concurrency} requests and responses at once, {serialization.backend_name()} JSON"
+    )
+
+    for mode, offload_size, workers in (
+        ("inline", 0, 0),
+        ("offloaded", 1, args.workers),
+    ):
+        serialization._offload_size = offload_size
+        serialization._workers = workers
+
+        elapsed, worst = asyncio.run(run_batch(obj, zipped, args.concurrency))
+        print(
+            f"  {mode:>9}: {elapsed * 1000:.0f}ms total, "
+            f"event loop blocked for up to {worst * 1000:.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Measures how concurrent queries behave under each database execution mode.
+
+Every simulated request issues one query that takes `--delay` seconds on the
+server. With `sync` execution the requests queue behind each other on the event
+loop, with `executor` they overlap up to the size of the thread pool.
+
+Run from the artemis folder: python -m benchmarks.db_execute -c config
+"""
+import argparse
+import asyncio
+import time
+from os import mkdir, path
+
+import yaml
+
+from core.config import CoreConfig
+from core.data import Data
+
+
+async def run_mode(data: Data, requests: int, delay: float) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(
+        *[data.base.execute(f"SELECT SLEEP({delay})") for _ in range(requests)]
+    )
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="BaseData.execute concurrency benchmark")
+    parser.add_argument("--config", "-c", type=str, default="config")
+    parser.add_argument("--requests", "-n", type=int, default=32)
+    parser.add_argument("--delay", "-d", type=float, default=0.05)
+    args = parser.parse_args()
+
+    cfg = CoreConfig()
+    if path.exists(f"{args.config}/core.yaml"):
+        cfg.update(yaml.safe_load(open(f"{args.config}/core.yaml")))
+    cfg.setdefault("database", {})
+
+    if not path.exists(cfg.server.log_dir):
+        mkdir(cfg.server.log_dir)
+
+    data = Data(cfg)
+    print(f"{args.requests} concurrent requests, {args.delay}s per query")
+
+    for mode in ("sync", "executor"):
+        cfg["database"]["execution_mode"] = mode
+        elapsed = asyncio.run(run_mode(data, args.requests, args.delay))
+        print(
+            f"{mode:>8}: {elapsed:.3f}s total, {elapsed / args.requests * 1000:.1f}ms per request"
+        )
+
+
+if __name__ == "__main__":
+    main()
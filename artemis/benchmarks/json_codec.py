@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Compares the JSON backends in core.serialization on captured payloads. The
+default payload is the chuni profile export in the artemis folder. It has the
+same shape as an UpsertUserAllApi request and holds the music detail and
+item lists that make up the largest GetUserMusicApi / GetUserItemApi
+responses. Pass other captured request or response bodies as arguments.
+
+For each payload and backend it reports decode and encode time, and it
+checks that both backends decode each other's output to the same data.
+
+Run from the artemis folder: python -m benchmarks.json_codec [payload.json ...]
+"""
+import argparse
+import glob
+import json
+import time
+from typing import Any, Callable, List
+
+from core import serialization
+
+
+def timed(func: Callable[[], Any], iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations
+
+
+def bench(path: str, iterations: int) -> None:
+    with open(path, "rb") as f:
+        raw = f.read()
+
+    print(f"{path} ({len(raw) / 1024:.0f}KiB)")
+    decoded = json.loads(raw)
+
+    backends = [("stdlib", False)]
+    if serialization.has_orjson:
+        backends.append(("orjson", True))
+    else:
+        print("  orjson isn't installed, only timing the standard library")
+
+    outputs = {}
+    for name, use_orjson in backends:
+        serialization._use_orjson = use_orjson
+
+        loads = timed(lambda: serialization.loads(raw), iterations)
+        dumps = timed(lambda: serialization.dumps(decoded), iterations)
+        outputs[name] = serialization.dumps(decoded)
+
+        print(
+            f"  {name:>6}: loads {loads * 1000:.2f}ms, dumps {dumps * 1000:.2f}ms, "
+            f"{len(outputs[name]) / 1024:.0f}KiB out"
+        )
+
+    for name, out in outputs.items():
+        assert json.loads(out) == decoded, f"{name} output decodes differently"
+
+    serialization._use_orjson = serialization.has_orjson
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="JSON backend benchmark")
+    parser.add_argument("payloads", nargs="*")
+    parser.add_argument("--iterations", "-n", type=int, default=20)
+    args = parser.parse_args()
+
+    payloads: List[str] = args.payloads or glob.glob("export-*.json")
+    if not payloads:
+        parser.error("No payloads given and no export-*.json in this folder")
+
+    for path in payloads:
+        bench(path, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Compares the event loop and HTTP implementations the title server can run on.
+For every installed combination, it starts the title server on a spare port
+with the given config folder, then sends requests over keep-alive connections
+and reports requests per second and latency for each request type:
+
+- chuni ping and mai2 ping, which measure the server stack itself
+- a chuni UpsertUserAllApi like the one sent after a credit. This is only
+  sent when --user-id is given, since it writes to that user's profile. Use
+  a test account, and a database like the one you deploy on.
+
+The upsert is built from the profile export in the artemis folder, or the one
+passed with --payload.
+
+Run from the artemis folder: python -m benchmarks.server_stack -c config
+"""
+import argparse
+import asyncio
+import glob
+import importlib.util
+import json
+import socket
+import statistics
+import time
+import zlib
+from multiprocessing import get_context
+from os import environ
+from typing import Dict, List, Optional, Tuple
+
+import uvicorn
+
+# Requests as (name, path, body)
+Scenario = Tuple[str, str, bytes]
+
+
+def serve(cfg_dir: str, port: int, loop: str, http: str) -> None:
+    environ["ARTEMIS_CFG_DIR"] = cfg_dir
+    # The app is imported once the loop is running, as in index.py, since some
+    # games start servers of their own while loading
+    server_cfg = uvicorn.Config(
+        "core.app:app",
+        host="127.0.0.1",
+        port=port,
+        loop=loop,
+        http=http,
+        log_level="critical",
+    )
+    uvicorn.Server(server_cfg).run()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), 1).close()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def upsert_request(payload: str, user_id: int) -> bytes:
+    """
+    Builds an UpsertUserAllApi body from a profile export, cut down to what a
+    single credit sends: the profile, options, and a few of everything else
+    """
+    with open(payload, encoding="utf-8") as f:
+        export = json.load(f)
+
+    upsert: Dict = {
+        "userData": [export["userData"]],
+        "userGameOption": [export["userGameOption"]],
+        "userCharacterList": export["userCharacterList"][:5],
+        "userItemList": export["userItemList"][:10],
+        "userMusicDetailList": export["userMusicDetailList"][:4],
+        "userActivityList": export["userActivityList"][:5],
+        "userPlaylogList": export["userPlaylogList"][:4],
+        "userChargeList": export["userChargeList"],
+    }
+    return zlib.compress(
+        json.dumps({"userId": user_id, "upsertUserAll": upsert}).encode("utf-8")
+    )
+
+
+async def send(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, path: str, body: bytes
+) -> int:
+    writer.write(
+        f"POST {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+        + body
+    )
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+
+    length = 0
+    for line in head.split(b"\r\n"):
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":", 1)[1])
+
+    await reader.readexactly(length)
+    return status
+
+
+async def run_scenario(
+    port: int, scenario: Scenario, connections: int, requests: int
+) -> Tuple[float, List[float], int]:
+    _, path, body = scenario
+    latencies: List[float] = []
+    errors = 0
+    per_connection = max(requests // connections, 1)
+
+    async def client() -> None:
+        nonlocal errors
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        for _ in range(per_connection):
+            start = time.perf_counter()
+            if await send(reader, writer, path, body) != 200:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+        writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(connections)])
+    return time.perf_counter() - start, latencies, errors
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Server stack benchmark")
+    parser.add_argument("--config", "-c", type=str, default="config")
+    parser.add_argument("--connections", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--user-id", type=int, help="Also send upserts for this user")
+    parser.add_argument("--payload", type=str, help="Profile export to build the upsert from")
+    parser.add_argument("--startup-timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    scenarios: List[Scenario] = [
+        ("chuni ping", "/SDHD/215/ChuniServlet/Ping", b""),
+        ("mai2 ping", "/140/Maimai2Servlet/Ping", b""),
+    ]
+
+    if args.user_id is not None:
+        payload: Optional[str] = args.payload or next(iter(glob.glob("export-*.json")), None)
+        if payload is None:
+            parser.error("No --payload given and no export-*.json in this folder")
+
+        scenarios.append(
+            (
+                "chuni upsert",
+                "/SDHD/215/ChuniServlet/UpsertUserAllApi",
+                upsert_request(payload, args.user_id),
+            )
+        )
+
+    loops = ["asyncio"] + (["uvloop"] if importlib.util.find_spec("uvloop") else [])
+    https = ["h11"] + (["httptools"] if importlib.util.find_spec("httptools") else [])
+    if len(loops) * len(https) == 1:
+        print("Neither uvloop nor httptools is installed, only asyncio + h11 can be measured")
+
+    for loop in loops:
+        for http in https:
+            port = free_port()
+            server = get_context("spawn").Process(
+                target=serve, args=(args.config, port, loop, http)
+            )
+            server.start()
+
+            try:
+                if not wait_for_port(port, args.startup_timeout):
+                    print(f"{loop} + {http}: server didn't start")
+                    continue
+
+                print(f"{loop} + {http}")
+                for scenario in scenarios:
+                    elapsed, latencies, errors = asyncio.run(
+                        run_scenario(port, scenario, args.connections, args.requests)
+                    )
+                    latencies.sort()
+                    print(
+                        f"  {scenario[0]:>12}: {len(latencies) / elapsed:.0f} req/s, "
+                        f"p50 {statistics.median(latencies) * 1000:.2f}ms, "
+                        f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f}ms"
+                        + (f", {errors} errors" if errors else "")
+                    )
+
+            finally:
+                server.terminate()
+                server.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Compares building a statement on every call against reusing one made by
+BaseData.cached_statement, for a typical hot read (chuni profile by user).
+
+Both sides compile against the MySQL dialect with SQLAlchemy's compiled cache
+enabled, the same as the engine does when executing, so the difference is the
+cost of building the expression and generating its cache key. No database
+connection is needed.
+
+Run from the artemis folder: python -m benchmarks.statement_cache
+"""
+import argparse
+import time
+from typing import Callable, Dict
+
+from sqlalchemy import and_
+from sqlalchemy.dialects import mysql
+from sqlalchemy.sql import bindparam, select
+
+from core.config import CoreConfig
+from core.data.schema.base import BaseData
+from titles.chuni.schema.profile import profile
+
+
+def build_inline(aime_id: int, version: int):
+    return select(profile).where(
+        and_(
+            profile.c.user == aime_id,
+            profile.c.version <= version,
+        )
+    ).order_by(profile.c.version.desc())
+
+
+_data = BaseData(CoreConfig(), None)
+
+
+def build_cached(aime_id: int, version: int):
+    return _data.cached_statement(
+        lambda: select(profile)
+        .where(
+            and_(
+                profile.c.user == bindparam("aime_id"),
+                profile.c.version <= bindparam("version"),
+            )
+        )
+        .order_by(profile.c.version.desc())
+    )
+
+
+def run(builder: Callable, iterations: int) -> float:
+    dialect = mysql.dialect()
+    compiled_cache: Dict = {}
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        stmt = builder(i, 13)
+        stmt._compile_w_cache(
+            dialect, compiled_cache=compiled_cache, column_keys=[]
+        )
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Statement cache benchmark")
+    parser.add_argument("--iterations", "-n", type=int, default=20000)
+    args = parser.parse_args()
+
+    for name, builder in (("inline", build_inline), ("cached", build_cached)):
+        elapsed = run(builder, args.iterations)
+        print(
+            f"{name:>6}: {elapsed:.3f}s total, {elapsed / args.iterations * 1e6:.1f}us per statement"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Compares constructing a version handler for every request, as the chuni and
+mai2 servlets used to, against reusing the one built when the servlet starts.
+
+For each side it reports the time per call and, through tracemalloc, the
+memory allocated per call. Building a handler also builds its title Data
+object and every schema object under it. The database engine is
+shared and doesn't connect until a query runs, so no database is needed.
+
+Run from the artemis folder: python -m benchmarks.version_handlers -c config
+"""
+import argparse
+import time
+import tracemalloc
+from os import mkdir, path
+from typing import Any, Callable, Tuple
+
+import yaml
+
+from core.config import CoreConfig
+from core.data import Data
+from titles.chuni.config import ChuniConfig
+from titles.chuni.sunplus import ChuniSunPlus
+from titles.mai2.config import Mai2Config
+from titles.mai2.festival import Mai2Festival
+
+
+def measure(lookup: Callable[[], Any], iterations: int) -> Tuple[float, int]:
+    """
+    Returns seconds per call, and bytes allocated per call, counted as how far
+    traced memory peaks above where it was before the call
+    """
+    start = time.perf_counter()
+    for _ in range(iterations):
+        getattr(lookup(), "handle_get_game_setting_api_request")
+    elapsed = time.perf_counter() - start
+
+    allocated = 0
+    tracemalloc.start()
+    for _ in range(iterations):
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        getattr(lookup(), "handle_get_game_setting_api_request")
+        _, peak = tracemalloc.get_traced_memory()
+        allocated += peak - before
+    tracemalloc.stop()
+
+    return elapsed / iterations, allocated // iterations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Version handler benchmark")
+    parser.add_argument("--config", "-c", type=str, default="config")
+    parser.add_argument("--iterations", "-n", type=int, default=2000)
+    args = parser.parse_args()
+
+    cfg = CoreConfig()
+    if path.exists(f"{args.config}/core.yaml"):
+        cfg.update(yaml.safe_load(open(f"{args.config}/core.yaml")))
+
+    if not path.exists(cfg.server.log_dir):
+        mkdir(cfg.server.log_dir)
+
+    Data(cfg)
+
+    for name, cls, game_cfg in (
+        ("chuni", ChuniSunPlus, ChuniConfig()),
+        ("mai2", Mai2Festival, Mai2Config()),
+    ):
+        handler = cls(cfg, game_cfg)
+
+        for mode, lookup in (
+            ("per request", lambda: cls(cfg, game_cfg)),
+            ("singleton", lambda: handler),
+        ):
+            per_call, allocated = measure(lookup, args.iterations)
+            print(
+                f"{name:>5} {mode:>11}: {per_call * 1e6:.1f}us, "
+                f"{allocated} bytes allocated per call"
+            )
+
+
+if __name__ == "__main__":
+    main()
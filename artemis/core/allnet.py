@@ -23,7 +23,7 @@ from starlette.routing import Route
 
 from .config import CoreConfig
 from .const import *
-from .data import Data
+from .data import Data, event_writer
 from .title import TitleServlet
 from .utils import Utils
 
@@ -1008,6 +1008,7 @@ app_billing = Starlette(
         Route("/request/", billing.handle_billing_request, methods=["POST"]),
     ],
     on_startup=[billing.startup],
+    on_shutdown=[event_writer.shutdown],
 )
 
 allnet = AllnetServlet(cfg, cfg_dir)
@@ -1029,4 +1030,9 @@ if cfg.allnet.allow_online_updates:
         Route("/dl/ini/{file:str}", allnet.handle_dlorder_ini),
     ]
 
-app_allnet = Starlette(cfg.server.is_develop, route_lst, on_startup=[allnet.startup])
+app_allnet = Starlette(
+    cfg.server.is_develop,
+    route_lst,
+    on_startup=[allnet.startup],
+    on_shutdown=[event_writer.shutdown],
+)
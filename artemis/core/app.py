@@ -6,6 +6,7 @@ from typing import List
 import coloredlogs
 import yaml
 from starlette.applications import Starlette
+from starlette.middleware import Middleware
 from starlette.requests import Request
 from starlette.responses import PlainTextResponse
 from starlette.routing import Route
@@ -17,6 +18,9 @@ from core import (
     # MuchaServlet,
     TitleServlet,
 )
+from core import metrics
+from core.data import Data, event_writer, write_behind
+from core.data.schema import metadata
 from core.frontend import FrontendServlet
 
 
@@ -24,6 +28,12 @@ async def dummy_rt(request: Request):
     return PlainTextResponse("Service OK")
 
 
+def startup() -> None:
+    data = Data(cfg)
+    event_writer.start_pruning(data.base)
+    write_behind.start(data.base, metadata)
+
+
 cfg_dir = environ.get("ARTEMIS_CFG_DIR", "config")
 cfg: CoreConfig = CoreConfig()
 if path.exists(f"{cfg_dir}/core.yaml"):
@@ -101,7 +111,16 @@ if not cfg.allnet.standalone:
             Route("/dl/ini/{file:str}", allnet.handle_dlorder_ini),
         ]
 
+if cfg.server.enable_metrics:
+    route_lst.append(Route("/metrics", metrics.handle_metrics))
+
 for code, game in title.title_registry.items():
     route_lst += game.get_routes()
 
-app = Starlette(cfg.server.is_develop, route_lst)
+app = Starlette(
+    cfg.server.is_develop,
+    route_lst,
+    middleware=[Middleware(metrics.QueryStatsMiddleware, cfg=cfg)],
+    on_startup=[startup],
+    on_shutdown=[event_writer.shutdown, write_behind.shutdown],
+)
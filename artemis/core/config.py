@@ -1,6 +1,6 @@
 import logging
 import os
-from typing import Any
+from typing import Any, List
 
 
 class ServerConfig:
@@ -114,6 +114,62 @@ class ServerConfig:
             self.__config, "core", "server", "strict_ip_checking", default=False
         )
 
+    @property
+    def enable_metrics(self) -> bool:
+        """
+        Serve query, cache and pool metrics in Prometheus format at /metrics
+        """
+        return CoreConfig.get_config_field(
+            self.__config, "core", "server", "enable_metrics", default=False
+        )
+
+    @property
+    def json_backend(self) -> str:
+        """
+        JSON library for title requests and responses: auto, orjson or stdlib
+        """
+        return CoreConfig.get_config_field(
+            self.__config, "core", "server", "json_backend", default="auto"
+        )
+
+    @property
+    def event_loop(self) -> str:
+        """
+        auto, asyncio or uvloop
+        """
+        return CoreConfig.get_config_field(
+            self.__config, "core", "server", "event_loop", default="auto"
+        )
+
+    @property
+    def http(self) -> str:
+        """
+        HTTP/1.1 implementation: auto, h11 or httptools
+        """
+        return CoreConfig.get_config_field(
+            self.__config, "core", "server", "http", default="auto"
+        )
+
+    @property
+    def workers(self) -> int:
+        """
+        Title server processes sharing the port, 1 to serve everything from
+        a single process
+        """
+        return int(
+            CoreConfig.get_config_field(
+                self.__config, "core", "server", "workers", default=1
+            )
+        )
+
+    @property
+    def worker_healthcheck_timeout(self) -> float:
+        return float(
+            CoreConfig.get_config_field(
+                self.__config, "core", "server", "worker_healthcheck_timeout", default=5.0
+            )
+        )
+
 
 class TitleConfig:
     def __init__(self, parent_config: "CoreConfig") -> None:
@@ -139,6 +195,47 @@ class TitleConfig:
             self.__config, "core", "title", "reboot_end_time", default=""
         )
 
+    @property
+    def compression_level(self) -> int:
+        """
+        zlib level for compressed responses, -1 for zlib's default
+        """
+        return int(
+            CoreConfig.get_config_field(
+                self.__config, "core", "title", "compression_level", default=-1
+            )
+        )
+
+    @property
+    def max_request_size(self) -> int:
+        """
+        Most bytes a compressed request may inflate to before it's rejected
+        """
+        return int(
+            CoreConfig.get_config_field(
+                self.__config, "core", "title", "max_request_size", default=16777216
+            )
+        )
+
+    @property
+    def codec_offload_size(self) -> int:
+        """
+        Payloads at least this big are decoded and encoded on a worker thread
+        """
+        return int(
+            CoreConfig.get_config_field(
+                self.__config, "core", "title", "codec_offload_size", default=65536
+            )
+        )
+
+    @property
+    def codec_workers(self) -> int:
+        return int(
+            CoreConfig.get_config_field(
+                self.__config, "core", "title", "codec_workers", default=2
+            )
+        )
+
 
 class DatabaseConfig:
     def __init__(self, parent_config: "CoreConfig") -> None:
@@ -206,6 +303,295 @@ class DatabaseConfig:
             self.__config, "core", "database", "memcached_host", default="localhost"
         )
 
+    @property
+    def local_cache_entries(self) -> int:
+        """
+        Maximum number of entries held in the in-process cache tier
+        """
+        return int(
+            CoreConfig.get_config_field(
+                self.__config, "core", "database", "local_cache_entries", default=4096
+            )
+        )
+
+    @property
+    def local_cache_bytes(self) -> int:
+        """
+        Maximum total size, in bytes of pickled values, of the in-process cache tier
+        """
+        return int(
+            CoreConfig.get_config_field(
+                self.__config,
+                "core",
+                "database",
+                "local_cache_bytes",
+                default=64 * 1024 * 1024,
+            )
+        )
+
+    @property
+    def static_refresh_interval(self) -> int:
+        """
+        How often, in seconds, to check if static data has been re-imported
+        """
+        return int(
+            CoreConfig.get_config_field(
+                self.__config, "core", "database", "static_refresh_interval", default=60
+            )
+        )
+
+    @property
+    def execution_mode(self) -> str:
+        """
+        How queries are run. "sync" runs them directly on the event loop,
+        "executor" runs them on a bounded thread pool so a slow query doesn't
+        block every other request
+        """
+        return CoreConfig.get_config_field(
+            self.__config, "core", "database", "execution_mode", default="sync"
+        )
+
+    @property
+    def executor_workers(self) -> int:
+        """
+        Number of threads used to run queries when execution_mode is "executor"
+        """
+        return int(
+            CoreConfig.get_config_field(
+                self.__config, "core", "database", "executor_workers", default=8
+            )
+        )
+
+    @property
+    def replicas(self) -> List[str]:
+        """
+        Read replicas that read-only queries are spread across. Each entry is
+        either a full connection string, or a host[:port] that is connected to
+        with the same credentials and database name as the primary.
+        """
+        return CoreConfig.get_config_field(
+            self.__config, "core", "database", "replicas", default=[]
+        )
+
+    @property
+    def replica_retry_interval(self) -> int:
+        """
+        Seconds a replica is skipped for after a query on it fails
+        """
+        return int(
+            CoreConfig.get_config_field(
+                self.__config, "core", "database", "replica_retry_interval", default=30
+            )
+        )
+
+    @property
+    def slow_query_ms(self) -> int:
+        """
+        Queries taking at least this long are logged with their parameters. 0 to disable
+        """
+        return int(
+            CoreConfig.get_config_field(
+                self.__config, "core", "database", "slow_query_ms", default=1000
+            )
+        )
+
+    @property
+    def request_query_warn(self) -> int:
+        """
+        Requests making at least this many queries are logged as a warning. 0 to disable
+        """
+        return int(
+            CoreConfig.get_config_field(
+                self.__config, "core", "database", "request_query_warn", default=100
+            )
+        )
+
+    @property
+    def pool_size(self) -> int:
+        """
+        Number of connections kept open to the database
+        """
+        return int(
+            CoreConfig.get_config_field(
+                self.__config, "core", "database", "pool_size", default=5
+            )
+        )
+
+    @property
+    def max_overflow(self) -> int:
+        """
+        Number of extra connections that can be opened past pool_size under load
+        """
+        return int(
+            CoreConfig.get_config_field(
+                self.__config, "core", "database", "max_overflow", default=10
+            )
+        )
+
+    @property
+    def pool_timeout(self) -> int:
+        """
+        Seconds to wait for a free connection before giving up on a query
+        """
+        return int(
+            CoreConfig.get_config_field(
+                self.__config, "core", "database", "pool_timeout", default=30
+            )
+        )
+
+    @property
+    def pool_recycle(self) -> int:
+        """
+        Seconds after which a connection is replaced, should be below the server's wait_timeout
+        """
+        return int(
+            CoreConfig.get_config_field(
+                self.__config, "core", "database", "pool_recycle", default=3600
+            )
+        )
+
+    @property
+    def pool_pre_ping(self) -> bool:
+        """
+        Test connections before handing them out, to survive database restarts
+        """
+        return CoreConfig.get_config_field(
+            self.__config, "core", "database", "pool_pre_ping", default=False
+        )
+
+    @property
+    def event_log_buffered(self) -> bool:
+        """
+        Queue event log entries and write them in batches instead of one INSERT per event
+        """
+        return CoreConfig.get_config_field(
+            self.__config, "core", "database", "event_log_buffered", default=True
+        )
+
+    @property
+    def event_log_flush_interval(self) -> float:
+        """
+        Longest time, in seconds, a buffered event waits before being written
+        """
+        return float(
+            CoreConfig.get_config_field(
+                self.__config, "core", "database", "event_log_flush_interval", default=1.0
+            )
+        )
+
+    @property
+    def event_log_batch_size(self) -> int:
+        """
+        Number of buffered events that triggers an early flush, and the most written per INSERT
+        """
+        return int(
+            CoreConfig.get_config_field(
+                self.__config, "core", "database", "event_log_batch_size", default=100
+            )
+        )
+
+    @property
+    def event_log_max_queue(self) -> int:
+        """
+        Most events held in memory before event_log_overflow applies
+        """
+        return int(
+            CoreConfig.get_config_field(
+                self.__config, "core", "database", "event_log_max_queue", default=10000
+            )
+        )
+
+    @property
+    def event_log_overflow(self) -> str:
+        """
+        What to do with new events when the queue is full: write_through, drop_oldest or drop_newest
+        """
+        return CoreConfig.get_config_field(
+            self.__config, "core", "database", "event_log_overflow", default="write_through"
+        )
+
+    @property
+    def event_log_retention_days(self) -> int:
+        """
+        Events older than this many days are deleted. 0 keeps them forever
+        """
+        return int(
+            CoreConfig.get_config_field(
+                self.__config, "core", "database", "event_log_retention_days", default=0
+            )
+        )
+
+    @property
+    def event_log_prune_interval(self) -> int:
+        """
+        Seconds between runs of the event log pruning job
+        """
+        return int(
+            CoreConfig.get_config_field(
+                self.__config, "core", "database", "event_log_prune_interval", default=3600
+            )
+        )
+
+    @property
+    def playlog_archive_days(self) -> int:
+        """
+        Playlogs older than this many days are moved to the archive by dbutils archive-playlogs
+        """
+        return int(
+            CoreConfig.get_config_field(
+                self.__config, "core", "database", "playlog_archive_days", default=0
+            )
+        )
+
+    @property
+    def write_behind(self) -> bool:
+        """
+        Journal playlogs and other write-only rows to disk and insert them from a background task
+        """
+        return CoreConfig.get_config_field(
+            self.__config, "core", "database", "write_behind", default=False
+        )
+
+    @property
+    def write_behind_journal(self) -> str:
+        """
+        File queued rows are journaled to until they're written
+        """
+        return CoreConfig.get_config_field(
+            self.__config, "core", "database", "write_behind_journal", default="write_behind.jsonl"
+        )
+
+    @property
+    def write_behind_fsync(self) -> bool:
+        """
+        fsync the journal after every queued row
+        """
+        return CoreConfig.get_config_field(
+            self.__config, "core", "database", "write_behind_fsync", default=False
+        )
+
+    @property
+    def write_behind_flush_interval(self) -> float:
+        """
+        Seconds between writes of queued rows
+        """
+        return float(
+            CoreConfig.get_config_field(
+                self.__config, "core", "database", "write_behind_flush_interval", default=1.0
+            )
+        )
+
+    @property
+    def write_behind_batch_size(self) -> int:
+        """
+        Queued rows that trigger an early write, and the most rows per INSERT
+        """
+        return int(
+            CoreConfig.get_config_field(
+                self.__config, "core", "database", "write_behind_batch_size", default=100
+            )
+        )
+
 
 class FrontendConfig:
     def __init__(self, parent_config: "CoreConfig") -> None:
@@ -1,3 +1,5 @@
 # ruff: noqa: F401
 from .cache import cached
+from .replica import read_only
+from .static_cache import static_data, static_writer
 from .database import Data
@@ -0,0 +1,41 @@
+"""Static data generation counters
+
+Revision ID: 4a02e3e8a9c1
+Revises: ead361541998
+Create Date: 2026-10-16 09:12:41.208713
+
+"""
+
+from alembic import op
+from sqlalchemy import Column, UniqueConstraint
+from sqlalchemy.sql import func
+from sqlalchemy.types import TIMESTAMP, Integer, String
+
+# revision identifiers, used by Alembic.
+revision = "4a02e3e8a9c1"
+down_revision = "ead361541998"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "static_generation",
+        Column("id", Integer, primary_key=True, nullable=False),
+        Column("title", String(32), nullable=False),
+        Column("version", Integer, nullable=False),
+        Column("generation", Integer, nullable=False, server_default="0"),
+        Column(
+            "when_updated",
+            TIMESTAMP,
+            nullable=False,
+            server_default=func.now(),
+            onupdate=func.now(),
+        ),
+        UniqueConstraint("title", "version", name="static_generation_uk"),
+        mysql_charset="utf8mb4",
+    )
+
+
+def downgrade():
+    op.drop_table("static_generation")
@@ -0,0 +1,29 @@
+"""Event log indexes
+
+Revision ID: b7c1d9e2f4a0
+Revises: 4a02e3e8a9c1
+Create Date: 2026-10-16 23:48:05.114920
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b7c1d9e2f4a0"
+down_revision = "4a02e3e8a9c1"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "event_log_system_type_idx",
+        "event_log",
+        ["system", "type", "when_logged"],
+    )
+    op.create_index("event_log_when_logged_idx", "event_log", ["when_logged"])
+
+
+def downgrade():
+    op.drop_index("event_log_when_logged_idx", table_name="event_log")
+    op.drop_index("event_log_system_type_idx", table_name="event_log")
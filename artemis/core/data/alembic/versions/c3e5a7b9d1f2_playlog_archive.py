@@ -0,0 +1,69 @@
+"""Playlog archive
+
+Revision ID: c3e5a7b9d1f2
+Revises: b7c1d9e2f4a0
+Create Date: 2026-10-17 00:21:37.562013
+
+"""
+
+from alembic import op
+from sqlalchemy import Column, ForeignKey, UniqueConstraint
+from sqlalchemy.sql import func
+from sqlalchemy.types import TIMESTAMP, Integer, LargeBinary, String
+
+# revision identifiers, used by Alembic.
+revision = "c3e5a7b9d1f2"
+down_revision = "b7c1d9e2f4a0"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "playlog_archive",
+        Column("id", Integer, primary_key=True, nullable=False),
+        Column(
+            "user",
+            Integer,
+            ForeignKey("aime_user.id", ondelete="cascade", onupdate="cascade"),
+            nullable=False,
+        ),
+        Column("source", String(64), nullable=False),
+        Column("first_id", Integer, nullable=False),
+        Column("last_id", Integer, nullable=False),
+        Column("row_count", Integer, nullable=False),
+        Column("data", LargeBinary(length=16777215), nullable=False),
+        Column("when_archived", TIMESTAMP, nullable=False, server_default=func.now()),
+        mysql_charset="utf8mb4",
+    )
+    op.create_index(
+        "playlog_archive_user_idx", "playlog_archive", ["user", "source"]
+    )
+
+    op.create_table(
+        "chuni_score_playlog_summary",
+        Column("id", Integer, primary_key=True, nullable=False),
+        Column(
+            "user",
+            Integer,
+            ForeignKey("aime_user.id", ondelete="cascade", onupdate="cascade"),
+            nullable=False,
+        ),
+        Column("romVersion", String(255)),
+        Column("musicId", Integer),
+        Column("level", Integer),
+        Column("plays", Integer, nullable=False, server_default="0"),
+        UniqueConstraint(
+            "user",
+            "romVersion",
+            "musicId",
+            "level",
+            name="chuni_score_playlog_summary_uk",
+        ),
+        mysql_charset="utf8mb4",
+    )
+
+
+def downgrade():
+    op.drop_table("chuni_score_playlog_summary")
+    op.drop_table("playlog_archive")
@@ -0,0 +1,45 @@
+"""Composite indexes for hot queries
+
+Revision ID: d4f6b8c0e2a3
+Revises: c3e5a7b9d1f2
+Create Date: 2026-10-17 00:52:10.840316
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "d4f6b8c0e2a3"
+down_revision = "c3e5a7b9d1f2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "chuni_score_playlog_romversion_user_idx",
+        "chuni_score_playlog",
+        ["romVersion", "user"],
+    )
+    op.create_index(
+        "diva_score_ranking_idx",
+        "diva_score",
+        ["pv_id", "difficulty", "edition", "score"],
+    )
+    op.create_index("machine_serial_idx", "machine", ["serial"])
+    op.create_index(
+        "ongeki_tech_event_ranking_version_idx",
+        "ongeki_tech_event_ranking",
+        ["version", "eventId", "totalTechScore"],
+    )
+
+
+def downgrade():
+    op.drop_index(
+        "ongeki_tech_event_ranking_version_idx", table_name="ongeki_tech_event_ranking"
+    )
+    op.drop_index("machine_serial_idx", table_name="machine")
+    op.drop_index("diva_score_ranking_idx", table_name="diva_score")
+    op.drop_index(
+        "chuni_score_playlog_romversion_user_idx", table_name="chuni_score_playlog"
+    )
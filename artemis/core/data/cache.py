@@ -1,9 +1,14 @@
 import hashlib
+import inspect
 import logging
 import pickle
+import time
+from collections import OrderedDict
 from functools import wraps
-from typing import Any, Callable
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, Union
 
+from core import metrics
 from core.config import CoreConfig
 
 cfg: CoreConfig = None  # type: ignore
@@ -16,44 +21,282 @@ except ModuleNotFoundError:
     has_mc = False
 
 
-def cached(lifetime: int = 10, extra_key: Any = None) -> Callable:
+class CacheStats:
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+class LRUCache:
+    """
+    In-process cache bounded by both entry count and total size. Values are
+    stored pickled, which gives us their size and stops callers from mutating
+    a cached result in place. Keys can be anything hashable.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries: "OrderedDict[Hashable, Tuple[float, bytes]]" = OrderedDict()
+        self.stats = CacheStats()
+        self.lock = Lock()
+
+    def get(self, key: Hashable) -> Any:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+
+            expires, value = entry
+            if expires < time.time():
+                self._remove(key)
+                self.stats.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.stats.hits += 1
+
+        return pickle.loads(value)
+
+    def set(self, key: Hashable, value: Any, expires: float) -> None:
+        data = pickle.dumps(value)
+        if len(data) > self.max_bytes:
+            return
+
+        with self.lock:
+            self._remove(key)
+            self.entries[key] = (expires, data)
+            self.size += len(data)
+
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.stats.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        with self.lock:
+            self._remove(key)
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+
+class MemcachedCache:
+    """
+    Shared tier. Entries are stored along with their expiry time so the local
+    tier can hold them for exactly as long as they remain valid.
+    """
+
+    def __init__(self, hostname: str) -> None:
+        self.client = pylibmc.Client([hostname], binary=True)
+        self.client.behaviors = {"tcp_nodelay": True, "ketama": True}
+        self.stats = CacheStats()
+
+    def get(self, key: str) -> Optional[Tuple[float, Any]]:
+        try:
+            entry = self.client.get(key)
+        except pylibmc.Error as e:
+            logging.getLogger("database").error(f"Memcache failed: {e}")
+            entry = None
+
+        if entry is None:
+            self.stats.misses += 1
+            return None
+
+        self.stats.hits += 1
+        return entry
+
+    def set(self, key: str, value: Any, expires: float) -> None:
+        try:
+            self.client.set(key, (expires, value), max(1, int(expires - time.time())))
+        except pylibmc.Error as e:
+            logging.getLogger("database").error(f"Memcache failed: {e}")
+
+    def delete(self, key: str) -> None:
+        try:
+            self.client.delete(key)
+        except pylibmc.Error as e:
+            logging.getLogger("database").error(f"Memcache failed: {e}")
+
+
+class TieredCache:
+    """
+    Per-worker LRU in front of an optional memcached tier. Hot keys are served
+    from memory, memcached is only asked on a local miss and lets workers share
+    results with each other.
+    """
+
+    def __init__(
+        self, local: LRUCache, remote: Optional[MemcachedCache] = None
+    ) -> None:
+        self.local = local
+        self.remote = remote
+
+    @staticmethod
+    def remote_key(key: Hashable) -> str:
+        if isinstance(key, str):
+            return key
+        return hashlib.md5(pickle.dumps(key)).hexdigest()
+
+    def get(self, key: Hashable) -> Any:
+        result = self.local.get(key)
+        if result is not None or self.remote is None:
+            return result
+
+        entry = self.remote.get(self.remote_key(key))
+        if entry is None:
+            return None
+
+        expires, result = entry
+        self.local.set(key, result, expires)
+        return result
+
+    def set(self, key: Hashable, value: Any, lifetime: int) -> None:
+        expires = time.time() + lifetime
+        self.local.set(key, value, expires)
+        if self.remote is not None:
+            self.remote.set(self.remote_key(key), value, expires)
+
+    def delete(self, key: Hashable) -> None:
+        self.local.delete(key)
+        if self.remote is not None:
+            self.remote.delete(self.remote_key(key))
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        ret = {"local": self.local.stats.as_dict()}
+        ret["local"]["entries"] = len(self.local.entries)
+        ret["local"]["bytes"] = self.local.size
+
+        if self.remote is not None:
+            ret["memcached"] = self.remote.stats.as_dict()
+
+        return ret
+
+
+_backend: Optional[TieredCache] = None
+
+
+def configure(config: CoreConfig) -> None:
+    """
+    Sets the config used to build the cache. Called by Data on startup,
+    decorated functions pick up the new backend on their next call.
+    """
+    global cfg, _backend
+    if config is cfg:
+        return
+
+    cfg = config
+    _backend = None
+
+
+def get_backend() -> TieredCache:
+    global _backend
+    if _backend is None:
+        if cfg:
+            local = LRUCache(
+                cfg.database.local_cache_entries, cfg.database.local_cache_bytes
+            )
+        else:
+            local = LRUCache(4096, 64 * 1024 * 1024)
+
+        remote = None
+        if has_mc and cfg and cfg.database.enable_memcached:
+            remote = MemcachedCache(cfg.database.memcached_host)
+
+        _backend = TieredCache(local, remote)
+
+    return _backend
+
+
+def _cache_stats() -> Dict[Tuple[Tuple[str, str], ...], float]:
+    if _backend is None:
+        return {}
+
+    ret = {}
+    for tier, stats in _backend.stats().items():
+        for stat, value in stats.items():
+            ret[(("tier", tier), ("stat", stat))] = value
+    return ret
+
+
+metrics.register_gauge(
+    "artemis_cache", "Cache hits, misses, evictions and size by tier", _cache_stats
+)
+
+
+def cached(
+    lifetime: Union[int, Callable[..., int]] = 10, extra_key: Any = None
+) -> Callable:
+    """
+    Caches the return value of a function or coroutine function, keyed by its
+    arguments (excluding the first, usually self). None is never cached.
+
+    lifetime is either a number of seconds, or a callable that receives the
+    same arguments as the decorated function and returns the lifetime for that
+    key. Pass lifetime=None to disable caching.
+
+    The wrapper gets an `invalidate(*args, **kwargs)` method that drops the
+    entry that a call with the same arguments would use.
+    """
+
     def _cached(func: Callable) -> Callable:
-        if has_mc and (cfg and cfg.database.enable_memcached):
-            hostname = "127.0.0.1"
-            if cfg:
-                hostname = cfg.database.memcached_host
-            memcache = pylibmc.Client([hostname], binary=True)
-            memcache.behaviors = {"tcp_nodelay": True, "ketama": True}
+        func_id = f"{func.__module__}-{func.__qualname__}"
+
+        def cache_key(*args: Any, **kwargs: Any) -> Hashable:
+            key = (
+                func_id,
+                args[1:],
+                tuple(sorted(kwargs.items())),
+                extra_key() if hasattr(extra_key, "__call__") else extra_key,
+            )
+
+            # Hashable args are used as-is, which is all the local tier needs.
+            # Anything else (ex. a request dict) gets hashed into a string.
+            try:
+                hash(key)
+            except TypeError:
+                key = f"{func_id}-{hashlib.md5(pickle.dumps(key)).hexdigest()}"
+
+            return key
+
+        def get_lifetime(*args: Any, **kwargs: Any) -> int:
+            if hasattr(lifetime, "__call__"):
+                return lifetime(*args, **kwargs)
+            return lifetime
+
+        def lookup(cache_key: Hashable) -> Any:
+            result = get_backend().get(cache_key)
+            if result is not None:
+                logging.getLogger("database").debug(f"Cache hit: {func_id}")
+            return result
+
+        def store(cache_key: Hashable, result: Any, ttl: int) -> None:
+            logging.getLogger("database").debug(f"Setting cache: {func_id}")
+            get_backend().set(cache_key, result, ttl)
+
+        if inspect.iscoroutinefunction(func):
 
             @wraps(func)
-            def wrapper(*args: Any, **kwargs: Any) -> Any:
-                if lifetime is not None:
-                    # Hash function args
-                    items = kwargs.items()
-                    hashable_args = (args[1:], sorted(list(items)))
-                    args_key = hashlib.md5(pickle.dumps(hashable_args)).hexdigest()
-
-                    # Generate unique cache key
-                    cache_key = f'{func.__module__}-{func.__name__}-{args_key}-{extra_key() if hasattr(extra_key, "__call__") else extra_key}'
-
-                    # Return cached version if allowed and available
-                    try:
-                        result = memcache.get(cache_key)
-                    except pylibmc.Error as e:
-                        logging.getLogger("database").error(f"Memcache failed: {e}")
-                        result = None
-
-                    if result is not None:
-                        logging.getLogger("database").debug(f"Cache hit: {result}")
-                        return result
-
-                # Generate output
-                result = func(*args, **kwargs)
+            async def wrapper(*args: Any, **kwargs: Any) -> Any:
+                if lifetime is None:
+                    return await func(*args, **kwargs)
+
+                key = cache_key(*args, **kwargs)
+                result = lookup(key)
+                if result is not None:
+                    return result
 
-                # Cache output if allowed
-                if lifetime is not None and result is not None:
-                    logging.getLogger("database").debug(f"Setting cache: {result}")
-                    memcache.set(cache_key, result, lifetime)
+                result = await func(*args, **kwargs)
+                if result is not None:
+                    store(key, result, get_lifetime(*args, **kwargs))
 
                 return result
 
@@ -61,8 +304,25 @@ def cached(lifetime: int = 10, extra_key: Any = None) -> Callable:
 
             @wraps(func)
             def wrapper(*args: Any, **kwargs: Any) -> Any:
-                return func(*args, **kwargs)
+                if lifetime is None:
+                    return func(*args, **kwargs)
+
+                key = cache_key(*args, **kwargs)
+                result = lookup(key)
+                if result is not None:
+                    return result
+
+                result = func(*args, **kwargs)
+                if result is not None:
+                    store(key, result, get_lifetime(*args, **kwargs))
+
+                return result
+
+        def invalidate(*args: Any, **kwargs: Any) -> None:
+            get_backend().delete(cache_key(*args, **kwargs))
 
+        wrapper.cache_key = cache_key
+        wrapper.invalidate = invalidate
         return wrapper
 
     return _cached
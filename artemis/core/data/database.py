@@ -4,22 +4,28 @@ import secrets
 import string
 from hashlib import sha256
 from logging.handlers import TimedRotatingFileHandler
-from typing import Optional
+from typing import AsyncContextManager, Optional
 
 import alembic.config
 import bcrypt
 import coloredlogs
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import scoped_session, sessionmaker
 
 from core.config import CoreConfig
+from core.data import cache, pool, replica
+from core.data.pool import TimedQueuePool
+from core.data.replica import Replica
 from core.data.schema import *
+from core.data.schema.base import UnitOfWork
 from core.utils import Utils
 
 
 class Data:
     engine = None
     session = None
+    replicas = None
     user = None
     arcade = None
     card = None
@@ -27,21 +33,39 @@ class Data:
 
     def __init__(self, cfg: CoreConfig) -> None:
         self.config = cfg
+        cache.configure(cfg)
 
-        if self.config.database.sha2_password:
-            passwd = sha256(self.config.database.password.encode()).digest()
-            self.__url = f"{self.config.database.protocol}://{self.config.database.username}:{passwd.hex()}@{self.config.database.host}:{self.config.database.port}/{self.config.database.name}?charset=utf8mb4"
-        else:
-            self.__url = f"{self.config.database.protocol}://{self.config.database.username}:{self.config.database.password}@{self.config.database.host}:{self.config.database.port}/{self.config.database.name}?charset=utf8mb4"
+        self.__url = self.__make_url(
+            self.config.database.host, self.config.database.port
+        )
 
         if Data.engine is None:
-            Data.engine = create_engine(self.__url, pool_recycle=3600)
+            Data.engine = self.__create_engine(self.__url)
             self.__engine = Data.engine
+            pool.track("primary", Data.engine)
 
         if Data.session is None:
             s = sessionmaker(bind=Data.engine, autoflush=True, autocommit=True)
             Data.session = scoped_session(s)
 
+        if Data.replicas is None:
+            Data.replicas = []
+            for entry in self.config.database.replicas:
+                if "://" in entry:
+                    url = entry
+                else:
+                    host, _, port = entry.partition(":")
+                    url = self.__make_url(host, port or self.config.database.port)
+
+                engine = self.__create_engine(url)
+                name = f"{engine.url.host}:{engine.url.port}"
+                pool.track(name, engine)
+
+                s = sessionmaker(bind=engine, autoflush=True, autocommit=True)
+                Data.replicas.append(Replica(name, scoped_session(s)))
+
+            replica.set_replicas(Data.replicas)
+
         if Data.user is None:
             Data.user = UserData(self.config, self.session)
 
@@ -80,6 +104,32 @@ class Data:
             )
             self.logger.handler_set = True  # type: ignore
 
+    def __make_url(self, host: str, port: int) -> str:
+        if self.config.database.sha2_password:
+            passwd = sha256(self.config.database.password.encode()).digest().hex()
+        else:
+            passwd = self.config.database.password
+
+        return f"{self.config.database.protocol}://{self.config.database.username}:{passwd}@{host}:{port}/{self.config.database.name}?charset=utf8mb4"
+
+    def __create_engine(self, url: str) -> Engine:
+        return create_engine(
+            url,
+            poolclass=TimedQueuePool,
+            pool_size=self.config.database.pool_size,
+            max_overflow=self.config.database.max_overflow,
+            pool_timeout=self.config.database.pool_timeout,
+            pool_recycle=self.config.database.pool_recycle,
+            pool_pre_ping=self.config.database.pool_pre_ping,
+        )
+
+    def transaction(self) -> AsyncContextManager[UnitOfWork]:
+        """
+        Opens a unit of work, see BaseData.transaction. Title handlers wrap
+        multi-statement writes like upserts in this so they commit once.
+        """
+        return self.base.transaction()
+
     def __alembic_cmd(self, command: str, *args: str) -> None:
         old_dir = os.path.abspath(os.path.curdir)
         base_dir = os.path.join(
@@ -0,0 +1,217 @@
+import asyncio
+import contextvars
+import logging
+from collections import deque
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Deque, Dict, List, Optional
+
+from sqlalchemy import Table
+
+if TYPE_CHECKING:
+    from core.data.schema.base import BaseData
+
+
+class EventLogWriter:
+    """
+    Collects event log rows in memory and writes them as multi-row INSERTs
+    from a background task, either every event_log_flush_interval seconds or
+    as soon as event_log_batch_size rows are waiting, whichever comes first.
+    """
+
+    def __init__(self, data: "BaseData", table: Table) -> None:
+        self.data = data
+        self.table = table
+        self.config = data.config
+        self.queue: Deque[Dict] = deque()
+        self.task: Optional[asyncio.Task] = None
+        self.wakeup: Optional[asyncio.Event] = None
+        self.closing = False
+        self.dropped = 0
+        self.logger = logging.getLogger("database")
+
+    async def put(self, row: Dict) -> bool:
+        # Nothing will flush the queue once shutdown has started
+        if self.closing:
+            return await self.write([row])
+
+        if len(self.queue) >= self.config.database.event_log_max_queue:
+            policy = self.config.database.event_log_overflow
+
+            if policy == "drop_oldest":
+                self.queue.popleft()
+                self._dropped()
+
+            elif policy == "drop_newest":
+                self._dropped()
+                return False
+
+            else:
+                return await self.write([row])
+
+        self.queue.append(row)
+        self._ensure_running()
+
+        if len(self.queue) >= self.config.database.event_log_batch_size:
+            self.wakeup.set()
+
+        return True
+
+    async def flush(self) -> bool:
+        """
+        Writes queued events until the queue is empty. If a write fails, its
+        batch goes back on the front of the queue to be retried by the next
+        flush, and False is returned.
+        """
+        batch_size = self.config.database.event_log_batch_size
+
+        while self.queue:
+            batch = [
+                self.queue.popleft() for _ in range(min(batch_size, len(self.queue)))
+            ]
+            if not await self.write(batch):
+                self._requeue(batch)
+                return False
+
+        return True
+
+    async def write(self, rows: List[Dict]) -> bool:
+        result = await self.data.execute(self.table.insert().values(rows))
+
+        if result is None:
+            self.logger.error(f"Failed to write {len(rows)} events to the event log!")
+            return False
+        return True
+
+    async def close(self) -> None:
+        """
+        Stops the background task once everything queued has been written
+        """
+        self.closing = True
+        if self.task is not None and not self.task.done():
+            self.wakeup.set()
+            await self.task
+
+        if not await self.flush():
+            self.logger.error(
+                f"Shutting down with {len(self.queue)} events that couldn't be written to the event log"
+            )
+
+    def _ensure_running(self) -> None:
+        if self.closing or (self.task is not None and not self.task.done()):
+            return
+
+        self.wakeup = asyncio.Event()
+        # The first put() can come from inside a transaction or a replica
+        # read, start the task in an empty context so it doesn't inherit them
+        self.task = contextvars.Context().run(
+            asyncio.get_running_loop().create_task, self._run()
+        )
+
+    async def _run(self) -> None:
+        interval = self.config.database.event_log_flush_interval
+        written = True
+
+        while not self.closing:
+            if written:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), interval)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                # The last flush failed, wait out the interval instead of
+                # retrying on every put while the database is down
+                await asyncio.sleep(interval)
+
+            self.wakeup.clear()
+
+            try:
+                written = await self.flush()
+            except Exception as e:
+                self.logger.error(f"Event log flush failed: {e}")
+                written = False
+
+    def _requeue(self, rows: List[Dict]) -> None:
+        self.queue.extendleft(reversed(rows))
+
+        # Events queued while the batch was being written can push the queue
+        # past its limit. write_through can't write anything right now, so
+        # only the drop policies trim it.
+        policy = self.config.database.event_log_overflow
+        while len(self.queue) > self.config.database.event_log_max_queue:
+            if policy == "drop_oldest":
+                self.queue.popleft()
+            elif policy == "drop_newest":
+                self.queue.pop()
+            else:
+                break
+            self._dropped()
+
+    def _dropped(self) -> None:
+        self.dropped += 1
+        # Don't flood the log while the queue stays full
+        if self.dropped == 1 or self.dropped % 1000 == 0:
+            self.logger.warning(
+                f"Event log queue is full, {self.dropped} events dropped so far"
+            )
+
+
+_writer: Optional[EventLogWriter] = None
+_pruner: Optional[asyncio.Task] = None
+
+
+def get_writer(data: "BaseData", table: Table) -> EventLogWriter:
+    global _writer
+    if _writer is None:
+        _writer = EventLogWriter(data, table)
+    return _writer
+
+
+async def prune(data: "BaseData") -> Optional[int]:
+    """
+    Deletes events older than event_log_retention_days, if it's set
+    """
+    days = data.config.database.event_log_retention_days
+    if days <= 0:
+        return 0
+
+    deleted = await data.prune_event_log(datetime.now() - timedelta(days=days))
+    if deleted:
+        logging.getLogger("database").info(
+            f"Pruned {deleted} events older than {days} days from the event log"
+        )
+    return deleted
+
+
+async def _prune_loop(data: "BaseData") -> None:
+    while True:
+        try:
+            await prune(data)
+        except Exception as e:
+            logging.getLogger("database").error(f"Event log pruning failed: {e}")
+
+        await asyncio.sleep(data.config.database.event_log_prune_interval)
+
+
+def start_pruning(data: "BaseData") -> None:
+    """
+    Starts the background pruning job if a retention window is configured
+    """
+    global _pruner
+    if _pruner is None and data.config.database.event_log_retention_days > 0:
+        _pruner = asyncio.get_running_loop().create_task(_prune_loop(data))
+
+
+async def shutdown() -> None:
+    """
+    Stops the pruning job and writes out any queued events. Registered as a
+    shutdown handler on every app that logs events, safe to call more than once.
+    """
+    global _writer, _pruner
+    if _pruner is not None:
+        _pruner.cancel()
+        _pruner = None
+
+    if _writer is not None:
+        writer = _writer
+        _writer = None
+        await writer.close()
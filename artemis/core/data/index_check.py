@@ -0,0 +1,117 @@
+import logging
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
+
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+if TYPE_CHECKING:
+    from core.data.database import Data
+
+# (description, index the query should use, the statement the schema method
+# runs, values for any bindparams in it). Statements come from the same
+# builders the schema methods use, so a change to a query is checked as-is.
+# Titles add their own through a hot_queries() method on their schema classes.
+HotQuery = Tuple[str, str, Executable, Dict[str, Any]]
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement: Executable) -> None:
+        self.statement = statement
+
+
+@compiles(Explain)
+def _compile_explain(element: Explain, compiler: Any, **kw: Any) -> str:
+    return f"EXPLAIN {compiler.process(element.statement, **kw)}"
+
+
+def core_queries(data: "Data") -> List[HotQuery]:
+    by_serial, by_serial_opts = data.arcade.machine_serial_sql("A69E01A88888888")
+    by_prefix, by_prefix_opts = data.arcade.machine_serial_sql("A69E01A8888")
+
+    return [
+        (
+            "machine by 15 character serial",
+            "machine_serial_idx",
+            by_serial,
+            by_serial_opts,
+        ),
+        (
+            "machine by 11 character serial prefix",
+            "machine_serial_idx",
+            by_prefix,
+            by_prefix_opts,
+        ),
+        (
+            "event log by system and type",
+            "event_log_system_type_idx",
+            data.base.event_log_sql(system="allnet", type="ALLNET_AUTH_BAD_IP"),
+            {},
+        ),
+        (
+            "event log by time",
+            "event_log_when_logged_idx",
+            data.base.event_log_sql(since=datetime(2024, 1, 1)),
+            {},
+        ),
+    ]
+
+
+def title_queries(data: "Data") -> List[HotQuery]:
+    from core.utils import Utils
+
+    queries: List[HotQuery] = []
+    seen = set()
+
+    for mod in Utils.get_all_titles().values():
+        if not hasattr(mod, "database"):
+            continue
+
+        for schema in vars(mod.database(data.config)).values():
+            # Some titles share schema classes with others
+            if hasattr(schema, "hot_queries") and type(schema) not in seen:
+                seen.add(type(schema))
+                queries += schema.hot_queries()
+
+    return queries
+
+
+async def check_indexes(data: "Data") -> bool:
+    """
+    Runs EXPLAIN on each hot query and checks that MySQL picks the index it's
+    meant to use. Returns False if any query doesn't, ex. because the index
+    was dropped or the query changed shape.
+
+    The plan depends on table statistics, and small or empty tables are often
+    scanned instead, so run this against a database with production-sized
+    tables.
+    """
+    logger = logging.getLogger("database")
+    ok = True
+
+    for name, index, sql, opts in core_queries(data) + title_queries(data):
+        result = await data.base.execute(Explain(sql), opts)
+        if result is None:
+            logger.error(f"{name}: EXPLAIN failed")
+            ok = False
+            continue
+
+        possible = set()
+        used = set()
+        for row in result.fetchall():
+            row = row._asdict()
+            possible.update((row.get("possible_keys") or "").split(","))
+            used.add(row.get("key"))
+
+        if index not in used:
+            logger.error(
+                f"{name}: MySQL chose {used} instead of {index} (possible keys: {possible})"
+            )
+            ok = False
+
+        else:
+            logger.info(f"{name}: uses {index}")
+
+    return ok
@@ -0,0 +1,59 @@
+import time
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+from core import metrics
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool that records how long each checkout waited for a connection,
+    including the time spent opening a new one.
+    """
+
+    name = "primary"
+
+    def _do_get(self) -> Any:
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.get_histogram(
+                "artemis_db_pool_wait_seconds",
+                "Time spent waiting to check a connection out of the pool",
+                (("pool", self.name),),
+            ).observe(time.perf_counter() - start)
+
+
+_pools: List[Tuple[str, QueuePool]] = []
+
+
+def track(name: str, engine: Engine) -> None:
+    """
+    Publishes the engine's pool usage through the metrics endpoint
+    """
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return
+
+    if isinstance(pool, TimedQueuePool):
+        pool.name = name
+    _pools.append((name, pool))
+
+
+def _pool_stats() -> Dict[Tuple[Tuple[str, str], ...], float]:
+    ret = {}
+    for name, pool in _pools:
+        ret[(("pool", name), ("stat", "size"))] = pool.size()
+        ret[(("pool", name), ("stat", "checked_in"))] = pool.checkedin()
+        ret[(("pool", name), ("stat", "checked_out"))] = pool.checkedout()
+        # Negative until the pool has opened pool_size connections
+        ret[(("pool", name), ("stat", "overflow"))] = max(0, pool.overflow())
+    return ret
+
+
+metrics.register_gauge(
+    "artemis_db_pool", "Database connection pool usage", _pool_stats
+)
@@ -0,0 +1,65 @@
+import time
+from contextvars import ContextVar
+from functools import wraps
+from itertools import count
+from typing import Any, Callable, List, Optional
+
+from sqlalchemy.orm import scoped_session
+
+
+class Replica:
+    def __init__(self, name: str, session: scoped_session) -> None:
+        self.name = name
+        self.session = session
+        self.down_until = 0.0
+
+    def mark_down(self, interval: int) -> None:
+        self.down_until = time.monotonic() + interval
+
+
+_replicas: List[Replica] = []
+_next = count()
+_read_only: ContextVar[bool] = ContextVar("read_only", default=False)
+
+
+def set_replicas(replicas: List[Replica]) -> None:
+    global _replicas
+    _replicas = replicas
+
+
+def get_replica() -> Optional[Replica]:
+    """
+    Returns the next usable replica in round-robin order, or None if there are
+    none configured or all of them recently failed.
+    """
+    now = time.monotonic()
+    for _ in range(len(_replicas)):
+        replica = _replicas[next(_next) % len(_replicas)]
+        if replica.down_until <= now:
+            return replica
+
+    return None
+
+
+def is_read_only() -> bool:
+    return _read_only.get()
+
+
+def read_only(func: Callable) -> Callable:
+    """
+    Marks a BaseData method as safe to serve from a read replica. SELECTs made
+    while it runs go to a replica if one is configured, anything else (and
+    anything inside a transaction) still goes to the primary. Only use this for
+    reads that can tolerate replication lag, not ones that need to see a write
+    made earlier in the same request.
+    """
+
+    @wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        token = _read_only.set(True)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            _read_only.reset(token)
+
+    return wrapper
@@ -1,10 +1,10 @@
 import re
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
-from sqlalchemy import Column, Table, and_, or_
+from sqlalchemy import Column, Index, Table, and_, or_
 from sqlalchemy.dialects.mysql import insert
 from sqlalchemy.engine import Row
-from sqlalchemy.sql import select
+from sqlalchemy.sql import Executable, bindparam, select
 from sqlalchemy.sql.schema import ForeignKey, PrimaryKeyConstraint
 from sqlalchemy.types import JSON, Boolean, Integer, String
 
@@ -45,6 +45,7 @@ machine = Table(
     Column("memo", String(255)),
     Column("is_cab", Boolean),
     Column("data", JSON),
+    Index("machine_serial_idx", "serial"),
     mysql_charset="utf8mb4",
 )
 
@@ -70,27 +71,47 @@ arcade_owner = Table(
 
 
 class ArcadeData(BaseData):
-    async def get_machine(self, serial: str = None, id: int = None) -> Optional[Row]:
-        if serial is not None:
-            serial = serial.replace("-", "")
-            if len(serial) == 11:
-                sql = machine.select(machine.c.serial.like(f"{serial}%"))
+    def machine_serial_sql(self, serial: str) -> Optional[Tuple[Executable, Dict]]:
+        """
+        Builds the lookup get_machine does for a serial, an exact match for 15
+        characters or a prefix match for 11. Returns the statement and its
+        parameters, or None if the serial is neither length.
+        """
+        serial = serial.replace("-", "")
+        if len(serial) == 11:
+            sql = self.cached_statement(
+                lambda: machine.select(machine.c.serial.like(bindparam("serial")))
+            )
+            return sql, {"serial": f"{serial}%"}
+
+        if len(serial) == 15:
+            sql = self.cached_statement(
+                lambda: machine.select(machine.c.serial == bindparam("serial"))
+            )
+            return sql, {"serial": serial}
 
-            elif len(serial) == 15:
-                sql = machine.select(machine.c.serial == serial)
+        return None
 
-            else:
+    async def get_machine(self, serial: str = None, id: int = None) -> Optional[Row]:
+        if serial is not None:
+            query = self.machine_serial_sql(serial)
+            if query is None:
                 self.logger.error(f"{__name__ }: Malformed serial {serial}")
                 return None
 
+            sql, opts = query
+
         elif id is not None:
-            sql = machine.select(machine.c.id == id)
+            sql = self.cached_statement(
+                lambda: machine.select(machine.c.id == bindparam("id"))
+            )
+            opts = {"id": id}
 
         else:
             self.logger.error(f"{__name__ }: Need either serial or ID to look up!")
             return None
 
-        result = await self.execute(sql)
+        result = await self.execute(sql, opts)
         if result is None:
             return None
         return result.fetchone()
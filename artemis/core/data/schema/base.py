@@ -1,16 +1,40 @@
+import asyncio
 import json
 import logging
+import sys
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from datetime import datetime
 from random import randrange
-from typing import Any, Dict, List, Optional
+from types import FrameType
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
 
-from sqlalchemy import Column, MetaData, Table
+from sqlalchemy import Column, ForeignKey, Index, MetaData, Table, UniqueConstraint
+from sqlalchemy.dialects.mysql import insert
+from sqlalchemy.engine import Row
 from sqlalchemy.engine.base import Connection
 from sqlalchemy.engine.cursor import CursorResult
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.sql import func, text
-from sqlalchemy.types import JSON, TIMESTAMP, Integer, String
+from sqlalchemy.sql import Executable, Select, func, select, text
+from sqlalchemy.types import JSON, TIMESTAMP, Integer, LargeBinary, String
 
+from core import metrics
 from core.config import CoreConfig
+from core.data import event_writer, replica, write_behind
+from core.data.replica import read_only
+from core.data.static_cache import registry as static_registry
 
 metadata = MetaData()
 
@@ -24,9 +48,84 @@ event_log = Table(
     Column("message", String(1000), nullable=False),
     Column("details", JSON, nullable=False),
     Column("when_logged", TIMESTAMP, nullable=False, server_default=func.now()),
+    Index("event_log_system_type_idx", "system", "type", "when_logged"),
+    Index("event_log_when_logged_idx", "when_logged"),
+    mysql_charset="utf8mb4",
+)
+
+playlog_archive = Table(
+    "playlog_archive",
+    metadata,
+    Column("id", Integer, primary_key=True, nullable=False),
+    Column(
+        "user",
+        ForeignKey("aime_user.id", ondelete="cascade", onupdate="cascade"),
+        nullable=False,
+    ),
+    Column("source", String(64), nullable=False),
+    Column("first_id", Integer, nullable=False),
+    Column("last_id", Integer, nullable=False),
+    Column("row_count", Integer, nullable=False),
+    Column("data", LargeBinary(length=16777215), nullable=False),
+    Column("when_archived", TIMESTAMP, nullable=False, server_default=func.now()),
+    Index("playlog_archive_user_idx", "user", "source"),
+    mysql_charset="utf8mb4",
+)
+
+static_generation = Table(
+    "static_generation",
+    metadata,
+    Column("id", Integer, primary_key=True, nullable=False),
+    Column("title", String(32), nullable=False),
+    Column("version", Integer, nullable=False),
+    Column("generation", Integer, nullable=False, server_default="0"),
+    Column(
+        "when_updated",
+        TIMESTAMP,
+        nullable=False,
+        server_default=func.now(),
+        onupdate=func.now(),
+    ),
+    UniqueConstraint("title", "version", name="static_generation_uk"),
     mysql_charset="utf8mb4",
 )
 
+_executor: Optional[ThreadPoolExecutor] = None
+_statement_cache: Dict[Any, Executable] = {}
+_client_columns: Dict[Tuple[str, Tuple[str, ...]], List[Column]] = {}
+
+
+def get_executor(cfg: CoreConfig) -> ThreadPoolExecutor:
+    """
+    Returns the process-wide thread pool used to run queries off the event loop,
+    creating it on first use. Each worker thread gets its own session from the
+    scoped_session registry, so concurrent queries never share a connection.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=cfg.database.executor_workers, thread_name_prefix="db"
+        )
+    return _executor
+
+
+class UnitOfWork:
+    """
+    A single connection with an open transaction, shared by every query made
+    inside a BaseData.transaction() block. Rows passed to insert_later inside
+    the block wait in deferred until the transaction commits.
+    """
+
+    def __init__(self, conn: Connection) -> None:
+        self.conn = conn
+        self.failed = False
+        self.deferred: List[Tuple[Table, Dict, bool]] = []
+
+
+_unit_of_work: ContextVar[Optional[UnitOfWork]] = ContextVar(
+    "unit_of_work", default=None
+)
+
 
 class BaseData:
     def __init__(self, cfg: CoreConfig, conn: Connection) -> None:
@@ -36,12 +135,90 @@ class BaseData:
 
     async def execute(
         self, sql: str, opts: Dict[str, Any] = {}
+    ) -> Optional[CursorResult]:
+        start = time.perf_counter()
+        res = await self._dispatch(sql, opts)
+        elapsed = time.perf_counter() - start
+
+        method = self._caller_name(sys._getframe(1))
+        metrics.record_query(method, elapsed)
+
+        slow_ms = self.config.database.slow_query_ms
+        if slow_ms and elapsed * 1000 >= slow_ms:
+            self.logger.warning(
+                f"Slow query in {method} took {elapsed * 1000:.0f}ms: {self._describe(sql, opts)}"
+            )
+
+        return res
+
+    async def _dispatch(
+        self, sql: str, opts: Dict[str, Any]
+    ) -> Optional[CursorResult]:
+        uow = _unit_of_work.get()
+
+        if uow is None and replica.is_read_only() and self._is_select(sql):
+            target = replica.get_replica()
+            if target is not None:
+                res = await self._run(self._execute, target.session, sql, opts)
+                if res is not None:
+                    return res
+
+                self.logger.warning(
+                    f"Query on replica {target.name} failed, retrying on primary"
+                )
+                target.mark_down(self.config.database.replica_retry_interval)
+
+        conn = self.conn if uow is None else uow.conn
+
+        res = await self._run(self._execute, conn, sql, opts)
+        if res is None and uow is not None:
+            uow.failed = True
+
+        return res
+
+    def _caller_name(self, frame: FrameType) -> str:
+        # Skip past helpers defined here (ex. upsert_many) to the schema method
+        while frame.f_back is not None and frame.f_code.co_filename == __file__:
+            frame = frame.f_back
+
+        return f"{type(self).__name__}.{frame.f_code.co_name}"
+
+    def _describe(self, sql: Any, opts: Dict[str, Any]) -> str:
+        if isinstance(sql, str):
+            return f"{' '.join(sql.split())} {opts}"
+
+        compiled = sql.compile(dialect=self.conn.get_bind().dialect)
+        params = {**compiled.params, **opts}
+        return f"{' '.join(str(compiled).split())} {params}"
+
+    @staticmethod
+    def _is_select(sql: Any) -> bool:
+        if isinstance(sql, str):
+            return sql.lstrip()[:6].lower() == "select"
+        return getattr(sql, "is_select", False)
+
+    async def _run(self, func: Callable, *args: Any) -> Any:
+        if self.config.database.execution_mode == "executor":
+            return await asyncio.get_running_loop().run_in_executor(
+                get_executor(self.config), func, *args
+            )
+
+        return func(*args)
+
+    def _execute(
+        self, conn: Connection, sql: str, opts: Dict[str, Any] = {}
     ) -> Optional[CursorResult]:
         res = None
 
         try:
-            self.logger.debug(f"SQL Execute: {''.join(str(sql).splitlines())}")
-            res = self.conn.execute(text(sql), opts)
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(f"SQL Execute: {''.join(str(sql).splitlines())}")
+
+            # Only raw strings need wrapping, expression objects are passed as-is
+            if isinstance(sql, str):
+                sql = text(sql)
+
+            res = conn.execute(sql, opts)
 
         except SQLAlchemyError as e:
             self.logger.error(f"SQLAlchemy error {e}")
@@ -52,22 +229,298 @@ class BaseData:
             return None
 
         except Exception:
-            try:
-                res = self.conn.execute(sql, opts)
+            self.logger.error(f"Unknown error")
+            raise
 
-            except SQLAlchemyError as e:
-                self.logger.error(f"SQLAlchemy error {e}")
-                return None
+        return res
 
-            except UnicodeEncodeError as e:
-                self.logger.error(f"UnicodeEncodeError error {e}")
-                return None
+    def cached_statement(self, builder: Callable[[], Executable]) -> Executable:
+        """
+        Returns the statement made by builder, only calling it the first time
+        this call site is reached in the process. Reusing the same statement
+        object skips rebuilding the expression and lets SQLAlchemy's compiled
+        cache hit without regenerating its cache key from scratch.
 
-            except Exception:
-                self.logger.error(f"Unknown error")
-                raise
+        The cache is keyed by the builder's code, so builder must not close
+        over anything that changes between calls. Use bindparam() for values
+        and pass them to execute() instead, ex.
 
-        return res
+        sql = self.cached_statement(
+            lambda: select(profile).where(profile.c.user == bindparam("user"))
+        )
+        result = await self.execute(sql, {"user": aime_id})
+        """
+        key = builder.__code__
+        stmt = _statement_cache.get(key)
+
+        if stmt is None:
+            stmt = builder()
+            _statement_cache[key] = stmt
+
+        return stmt
+
+    def client_select(
+        self, table: Table, exclude: Tuple[str, ...] = ("id", "user")
+    ) -> Select:
+        """
+        Returns a select() of the columns of table that get sent to clients,
+        everything except the server-side columns in exclude. Use it with
+        fetch_client_rows instead of fetching whole rows and popping "id" and
+        "user" out of each one in the handler.
+        """
+        key = (table.name, exclude)
+        columns = _client_columns.get(key)
+
+        if columns is None:
+            columns = [x for x in table.columns if x.name not in exclude]
+            _client_columns[key] = columns
+
+        return select(columns)
+
+    async def fetch_client_rows(
+        self, sql: Select, opts: Dict[str, Any] = {}
+    ) -> Optional[List[Dict]]:
+        """
+        Runs sql and returns its rows as plain dicts, ready to be serialized
+        or added to.
+        """
+        result = await self.execute(sql, opts)
+        if result is None:
+            return None
+
+        keys = list(result.keys())
+        return [dict(zip(keys, row)) for row in result]
+
+    async def fetch_client_page(
+        self,
+        sql: Select,
+        key: Column,
+        start: int,
+        limit: int,
+        opts: Dict[str, Any] = {},
+    ) -> Optional[Tuple[List[Dict], Optional[int]]]:
+        """
+        Keyset pagination for the nextIndex/maxCount style APIs. Returns up to
+        limit rows of sql whose key is at least start, in key order, along with
+        the key the next page starts at (None on the last page). Handlers send
+        that key back to the client as the next index, so every page is an
+        index range read of limit + 1 rows instead of the whole list.
+
+        key should be unique, usually the table's id. It doesn't need to be
+        one of the columns sql selects.
+        """
+        sql = (
+            sql.add_columns(key.label("page_key"))
+            .where(key >= start)
+            .order_by(key)
+            .limit(limit + 1)
+        )
+
+        result = await self.execute(sql, opts)
+        if result is None:
+            return None
+
+        keys = list(result.keys())[:-1]
+        rows = result.fetchall()
+        next_start = rows[limit][-1] if len(rows) > limit else None
+
+        return [dict(zip(keys, row[:-1])) for row in rows[:limit]], next_start
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[UnitOfWork]:
+        """
+        Runs every query made inside the block on one connection and commits
+        them together when the block exits. If the block raises, or any query
+        inside it failed, everything is rolled back instead. Nested blocks join
+        the outermost transaction. Don't run queries concurrently (ex. with
+        asyncio.gather) inside the block, they would share the connection.
+
+        uow.failed is still set once the block exits, so callers can tell the
+        client that nothing was saved.
+        """
+        uow = _unit_of_work.get()
+        if uow is not None:
+            yield uow
+            return
+
+        conn: Connection = await self._run(self.conn.get_bind().connect)
+        trans = await self._run(conn.begin)
+        uow = UnitOfWork(conn)
+        token = _unit_of_work.set(uow)
+
+        try:
+            yield uow
+
+        except BaseException:
+            await self._run(trans.rollback)
+            raise
+
+        else:
+            if uow.failed:
+                self.logger.error(
+                    "Rolling back transaction because one or more statements failed"
+                )
+                await self._run(trans.rollback)
+            else:
+                await self._run(trans.commit)
+
+        finally:
+            _unit_of_work.reset(token)
+            await self._run(conn.close)
+
+        if not uow.failed:
+            for table, row, upsert in uow.deferred:
+                await self.insert_later(table, row, upsert)
+
+    async def upsert_many(
+        self, table: Table, rows: List[Dict], chunk_size: int = 100
+    ) -> bool:
+        """
+        Inserts rows using multi-row INSERT ... ON DUPLICATE KEY UPDATE
+        statements of at most chunk_size rows each, updating every column the
+        row provides on conflict. Rows are grouped by the columns they provide,
+        since every row of a multi-row insert needs the same columns.
+
+        Returns False if any of the statements failed
+        """
+        groups: Dict[tuple, List[Dict]] = {}
+        for row in rows:
+            groups.setdefault(tuple(sorted(row.keys())), []).append(row)
+
+        success = True
+        for columns, group in groups.items():
+            for i in range(0, len(group), chunk_size):
+                sql = insert(table).values(group[i : i + chunk_size])
+                conflict = sql.on_duplicate_key_update(
+                    {col: sql.inserted[col] for col in columns}
+                )
+
+                if await self.execute(conflict) is None:
+                    self.logger.error(
+                        f"upsert_many: Failed to upsert {len(group[i : i + chunk_size])} rows into {table.name}"
+                    )
+                    success = False
+
+        return success
+
+    async def insert_later(
+        self, table: Table, row: Dict, upsert: bool = False
+    ) -> Optional[int]:
+        """
+        Inserts row into table, updating the existing row on conflict if upsert
+        is set. With write_behind on, the row is only journaled and 0 is
+        returned instead of its id, the insert happens later in a background
+        task. Only use this for rows nothing reads back during the session,
+        ex. playlogs.
+
+        Inside a transaction, the row is only journaled once the transaction
+        commits, and not at all if it's rolled back.
+        """
+        if self.config.database.write_behind:
+            uow = _unit_of_work.get()
+            if uow is not None:
+                uow.deferred.append((table, row, upsert))
+                return 0
+
+            if await write_behind.get_queue(self, metadata).put(table, row, upsert):
+                return 0
+
+        sql = insert(table).values(**row)
+        if upsert:
+            sql = sql.on_duplicate_key_update(**row)
+
+        result = await self.execute(sql)
+        if result is None:
+            return None
+        return result.lastrowid
+
+    async def archive_rows(
+        self,
+        table: Table,
+        condition: Any,
+        chunk_size: int = 1000,
+        summarize: Optional[Callable[[List[Dict]], Awaitable[bool]]] = None,
+    ) -> Optional[int]:
+        """
+        Moves rows of a per-user log table (ex. a playlog) that match condition
+        into playlog_archive, one zlib-compressed JSON blob per user per chunk.
+        If given, summarize is awaited with each chunk inside the same
+        transaction so the rows can be folded into aggregate tables first.
+
+        Returns the number of rows archived, or None if a chunk failed (that
+        chunk is rolled back, earlier chunks stay archived).
+        """
+        archived = 0
+
+        while True:
+            async with self.transaction() as uow:
+                sql = select(table).where(condition).order_by(table.c.id)
+                result = await self.execute(sql.limit(chunk_size))
+                if result is None:
+                    return None
+
+                rows = [row._asdict() for row in result.fetchall()]
+                if not rows:
+                    return archived
+
+                by_user: Dict[int, List[Dict]] = {}
+                for row in rows:
+                    by_user.setdefault(row["user"], []).append(row)
+
+                archive = [
+                    {
+                        "user": user,
+                        "source": table.name,
+                        "first_id": user_rows[0]["id"],
+                        "last_id": user_rows[-1]["id"],
+                        "row_count": len(user_rows),
+                        "data": zlib.compress(
+                            json.dumps(user_rows, default=str).encode()
+                        ),
+                    }
+                    for user, user_rows in by_user.items()
+                ]
+                sql = playlog_archive.insert().values(archive)
+                if await self.execute(sql) is None:
+                    return None
+
+                if summarize is not None and not await summarize(rows):
+                    uow.failed = True
+                    return None
+
+                sql = table.delete().where(table.c.id.in_([x["id"] for x in rows]))
+                if await self.execute(sql) is None:
+                    return None
+
+            archived += len(rows)
+            self.logger.info(f"Archived {archived} rows from {table.name}")
+
+            if len(rows) < chunk_size:
+                return archived
+
+    async def get_archived_rows(
+        self, user_id: int, source: str
+    ) -> Optional[List[Dict]]:
+        """
+        Returns every row archive_rows moved out of the source table for a user
+        """
+        sql = (
+            select(playlog_archive.c.data)
+            .where(
+                (playlog_archive.c.user == user_id)
+                & (playlog_archive.c.source == source)
+            )
+            .order_by(playlog_archive.c.first_id)
+        )
+        result = await self.execute(sql)
+
+        if result is None:
+            return None
+
+        ret = []
+        for row in result.fetchall():
+            ret += json.loads(zlib.decompress(row["data"]))
+        return ret
 
     def generate_id(self) -> int:
         """
@@ -78,13 +531,28 @@ class BaseData:
     async def log_event(
         self, system: str, type: str, severity: int, message: str, details: Dict = {}
     ) -> Optional[int]:
-        sql = event_log.insert().values(
-            system=system,
-            type=type,
-            severity=severity,
-            message=message,
-            details=json.dumps(details),
-        )
+        """
+        Records an event. When event_log_buffered is on the event is only
+        queued, and None is returned instead of the new row's id.
+        """
+        row = {
+            "system": system,
+            "type": type,
+            "severity": severity,
+            "message": message,
+            "details": json.dumps(details),
+            # Set here, the row may not be inserted until a while later
+            "when_logged": datetime.now(),
+        }
+
+        if self.config.database.event_log_buffered:
+            if not await event_writer.get_writer(self, event_log).put(row):
+                self.logger.error(
+                    f"{__name__}: Failed to insert event into event log! system = {system}, type = {type}, severity = {severity}, message = {message}"
+                )
+            return None
+
+        sql = event_log.insert().values(**row)
         result = await self.execute(sql)
 
         if result is None:
@@ -95,14 +563,102 @@ class BaseData:
 
         return result.lastrowid
 
-    async def get_event_log(self, entries: int = 100) -> Optional[List[Dict]]:
-        sql = event_log.select().limit(entries).all()
-        result = await self.execute(sql)
+    def event_log_sql(
+        self,
+        entries: int = 100,
+        system: Optional[str] = None,
+        type: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Select:
+        """
+        Builds the query get_event_log runs
+        """
+        sql = select(event_log)
+
+        if system is not None:
+            sql = sql.where(event_log.c.system == system)
+        if type is not None:
+            sql = sql.where(event_log.c.type == type)
+        if since is not None:
+            sql = sql.where(event_log.c.when_logged >= since)
+        if until is not None:
+            sql = sql.where(event_log.c.when_logged < until)
+
+        sql = sql.order_by(event_log.c.when_logged.desc(), event_log.c.id.desc())
+        return sql.limit(entries)
+
+    @read_only
+    async def get_event_log(
+        self,
+        entries: int = 100,
+        system: Optional[str] = None,
+        type: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Optional[List[Row]]:
+        """
+        Returns the newest events first. Filtering by system (and type) or by
+        time range is served by the event_log indexes.
+        """
+        result = await self.execute(
+            self.event_log_sql(entries, system, type, since, until)
+        )
 
         if result is None:
             return None
         return result.fetchall()
 
+    async def prune_event_log(
+        self, before: datetime, chunk_size: int = 5000
+    ) -> Optional[int]:
+        """
+        Deletes events logged before the given time, a chunk at a time so a
+        large backlog doesn't hold locks on the table for long. Returns the
+        number of events deleted.
+        """
+        deleted = 0
+
+        while True:
+            result = await self.execute(
+                "DELETE FROM event_log WHERE when_logged < :before LIMIT :limit",
+                {"before": before, "limit": chunk_size},
+            )
+            if result is None:
+                self.logger.error(f"Failed to prune event log, {deleted} events deleted")
+                return None
+
+            deleted += result.rowcount
+            if result.rowcount < chunk_size:
+                return deleted
+
+    async def get_static_generations(self) -> Optional[Dict[Tuple[str, int], int]]:
+        result = await self.execute(select(static_generation))
+
+        if result is None:
+            return None
+        return {(x["title"], x["version"]): x["generation"] for x in result.fetchall()}
+
+    async def bump_static_generation(self, title: str, version: int) -> bool:
+        """
+        Marks the static data of a title version as changed, so every running
+        server reloads it. Call after writing to a title's static tables.
+        """
+        static_registry.invalidate(title)
+
+        sql = insert(static_generation).values(title=title, version=version, generation=1)
+        conflict = sql.on_duplicate_key_update(
+            generation=static_generation.c.generation + 1
+        )
+
+        result = await self.execute(conflict)
+        if result is None:
+            self.logger.error(
+                f"Failed to bump static data generation for {title} v{version}"
+            )
+            return False
+        return True
+
     def fix_bools(self, data: Dict) -> Dict:
         for k, v in data.items():
             if k == "userName" or k == "teamName":
@@ -7,6 +7,7 @@ from sqlalchemy.engine import Row
 from sqlalchemy.sql import func, select
 from sqlalchemy.types import TIMESTAMP, Integer, String
 
+from core.data.replica import read_only
 from core.data.schema.base import BaseData, metadata
 
 aime_user = Table(
@@ -96,6 +97,7 @@ class UserData(BaseData):
             return None
         return result.fetchall()
 
+    @read_only
     async def find_user_by_email(self, email: str) -> Row:
         sql = select(aime_user).where(aime_user.c.email == email)
         result = await self.execute(sql)
@@ -103,6 +105,7 @@ class UserData(BaseData):
             return False
         return result.fetchone()
 
+    @read_only
     async def find_user_by_username(self, username: str) -> List[Row]:
         sql = aime_user.select(aime_user.c.username.like(f"%{username}%"))
         result = await self.execute(sql)
@@ -0,0 +1,122 @@
+import logging
+import time
+from functools import wraps
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, Set, Tuple
+
+if TYPE_CHECKING:
+    from core.data.schema.base import BaseData
+
+
+class StaticDataRegistry:
+    """
+    Holds static (importer-provided) table reads in memory, per title and
+    version. Every so often the generation counters in the static_generation
+    table are checked, and if any version of a title moved since it was loaded
+    everything held for that title is dropped so it gets reloaded on next use.
+    Some reads (ex. ongeki cards) include older versions, so dropping only the
+    changed version isn't enough.
+    """
+
+    def __init__(self) -> None:
+        self.entries: Dict[Tuple[str, int], Dict[Hashable, Any]] = {}
+        self.generations: Dict[Tuple[str, int], int] = {}
+        # (title, version) pairs written through a static_writer method
+        self.written: Set[Tuple[str, int]] = set()
+        self.last_check = 0.0
+        self.logger = logging.getLogger("database")
+
+    async def refresh(self, data: "BaseData") -> None:
+        now = time.monotonic()
+        if now - self.last_check < data.config.database.static_refresh_interval:
+            return
+
+        # Set this before awaiting so concurrent requests don't all check at once
+        self.last_check = now
+        generations = await data.get_static_generations()
+        if generations is None:
+            return
+
+        for (title, version), generation in generations.items():
+            if self.generations.get((title, version)) != generation:
+                if (title, version) in self.generations:
+                    self.logger.info(
+                        f"Static data for {title} v{version} changed, reloading"
+                    )
+                self.invalidate(title)
+
+        self.generations = generations
+
+    def invalidate(self, title: str) -> None:
+        for key in [x for x in self.entries if x[0] == title]:
+            self.entries.pop(key)
+
+    async def get(
+        self,
+        data: "BaseData",
+        title: str,
+        version: int,
+        func: Callable,
+        args: Tuple,
+        kwargs: Dict,
+    ) -> Any:
+        await self.refresh(data)
+
+        version_entries = self.entries.setdefault((title, version), {})
+        key = (func.__qualname__, args, tuple(sorted(kwargs.items())))
+
+        if key in version_entries:
+            result = version_entries[key]
+
+        else:
+            result = await func(data, version, *args, **kwargs)
+            if result is None:
+                return None
+            version_entries[key] = result
+
+        # Callers get their own list so they can't change what's held here
+        if isinstance(result, list):
+            return list(result)
+        return result
+
+
+registry = StaticDataRegistry()
+
+
+def static_data(title: str) -> Callable:
+    """
+    Marks a static table read to be held in memory by the static data registry.
+    The decorated method's first argument (after self) must be the version,
+    any other arguments must be hashable. title is the title's folder name, the
+    same one read.py bumps the generation of after importing.
+    """
+
+    def _static_data(func: Callable) -> Callable:
+        @wraps(func)
+        async def wrapper(self: "BaseData", version: int, *args: Any, **kwargs: Any) -> Any:
+            return await registry.get(self, title, version, func, args, kwargs)
+
+        return wrapper
+
+    return _static_data
+
+
+def static_writer(title: str) -> Callable:
+    """
+    Marks a static table write, so the registry records which title and
+    version it touched. The decorated method's first argument (after self)
+    must be the version. read.py bumps the generation of every pair an import
+    wrote to, which can include other titles than the one being imported (ex.
+    Card Maker writes chuni, mai2 and ongeki cards and gachas).
+    """
+
+    def _static_writer(func: Callable) -> Callable:
+        @wraps(func)
+        async def wrapper(self: "BaseData", version: int, *args: Any, **kwargs: Any) -> Any:
+            result = await func(self, version, *args, **kwargs)
+            # Some importers pass the version straight from a CSV
+            registry.written.add((title, int(version)))
+            return result
+
+        return wrapper
+
+    return _static_writer
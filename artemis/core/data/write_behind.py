@@ -0,0 +1,354 @@
+import asyncio
+import contextvars
+import json
+import logging
+import os
+from collections import OrderedDict
+from datetime import date, datetime
+from itertools import count, islice
+from typing import IO, TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import MetaData, Table
+from sqlalchemy.dialects.mysql import insert
+
+if TYPE_CHECKING:
+    from core.data.schema.base import BaseData
+
+# Make fcntl optional, it's only needed with multiple workers, which Windows
+# doesn't support
+try:
+    import fcntl
+
+    has_fcntl = True
+except ModuleNotFoundError:
+    has_fcntl = False
+
+# Times a row can fail on its own, while other rows are going through, before
+# it's set aside in the rejected file
+MAX_ATTEMPTS = 5
+
+
+def _encode(obj: Any) -> Any:
+    if isinstance(obj, datetime):
+        return {"$datetime": obj.isoformat()}
+    if isinstance(obj, date):
+        return {"$date": obj.isoformat()}
+    raise TypeError(f"Can't journal {type(obj).__name__}")
+
+
+def _decode(obj: Dict) -> Any:
+    if len(obj) == 1:
+        if "$datetime" in obj:
+            return datetime.fromisoformat(obj["$datetime"])
+        if "$date" in obj:
+            return date.fromisoformat(obj["$date"])
+    return obj
+
+
+class WriteBehindQueue:
+    """
+    Journals rows to an append-only file, then inserts them in batches from a
+    background task. Each entry in the journal is either a row, tagged with a
+    sequence number, or an ack listing the sequence numbers that made it into
+    the database. On startup, rows without an ack are queued again, so every
+    row is written at least once, and a row written just before a crash can
+    be written twice.
+    """
+
+    def __init__(self, data: "BaseData", metadata: MetaData, path: str) -> None:
+        self.data = data
+        self.metadata = metadata
+        self.path = path
+        self.config = data.config
+        self.pending: "OrderedDict[int, Dict]" = OrderedDict()
+        self.attempts: Dict[int, int] = {}
+        self.seq = 0
+        self.file: Optional[IO[str]] = None
+        self.task: Optional[asyncio.Task] = None
+        self.wakeup: Optional[asyncio.Event] = None
+        self.closing = False
+        self.logger = logging.getLogger("database")
+
+    def open(self) -> None:
+        """
+        Reads back anything left in the journal by the last run, then starts a
+        fresh journal holding only those rows.
+        """
+        if os.path.exists(self.path):
+            self._replay()
+
+        self._rewrite()
+
+        if self.pending:
+            self.logger.info(
+                f"Replaying {len(self.pending)} rows from write-behind journal {self.path}"
+            )
+
+    async def put(self, table: Table, row: Dict, upsert: bool = False) -> bool:
+        """
+        Journals row for insertion into table. Returns False if it couldn't be
+        journaled, in which case the caller should write it itself.
+        """
+        self.seq += 1
+        entry = {"seq": self.seq, "table": table.name, "upsert": upsert, "row": row}
+
+        try:
+            self._append(entry)
+        except (OSError, TypeError, ValueError) as e:
+            self.logger.error(f"Failed to journal row for {table.name}: {e}")
+            return False
+
+        self.pending[self.seq] = entry
+        self._ensure_running()
+
+        if len(self.pending) >= self.config.database.write_behind_batch_size:
+            self.wakeup.set()
+
+        return True
+
+    async def flush(self) -> bool:
+        """
+        Writes queued rows until the queue is empty. Returns False if it gave
+        up early because the database can't be reached.
+        """
+        batch_size = self.config.database.write_behind_batch_size
+
+        while self.pending:
+            batch = list(islice(self.pending.values(), batch_size))
+            done = await self.write(batch)
+            if not done:
+                return False
+
+            self._append({"ack": done})
+            for seq in done:
+                self.pending.pop(seq, None)
+                self.attempts.pop(seq, None)
+
+        # Everything is in the database, start the journal over
+        if self.file is not None and self.file.tell() > 0:
+            self._rewrite()
+        return True
+
+    async def write(self, batch: List[Dict]) -> List[int]:
+        """
+        Inserts a batch of journal entries, and returns the sequence numbers
+        that are done with, either written or rejected.
+        """
+        groups: Dict[Tuple, List[Dict]] = {}
+        for entry in batch:
+            key = (entry["table"], entry["upsert"], tuple(sorted(entry["row"])))
+            groups.setdefault(key, []).append(entry)
+
+        done = []
+        failed = []
+        for (table_name, upsert, _), entries in groups.items():
+            if await self._insert(table_name, upsert, [x["row"] for x in entries]):
+                done += [x["seq"] for x in entries]
+                continue
+
+            # Find out which rows are the problem
+            for entry in entries:
+                if await self._insert(table_name, upsert, [entry["row"]]):
+                    done.append(entry["seq"])
+                else:
+                    failed.append(entry)
+
+        # If nothing went through the database is probably down, so don't hold
+        # it against the rows
+        if not done:
+            return []
+
+        for entry in failed:
+            attempts = self.attempts.get(entry["seq"], 0) + 1
+            self.attempts[entry["seq"]] = attempts
+
+            if attempts >= MAX_ATTEMPTS:
+                self._reject(entry)
+                done.append(entry["seq"])
+
+        return done
+
+    async def close(self) -> None:
+        """
+        Stops the background task after one last attempt at writing everything
+        queued. Whatever is left stays in the journal for the next start.
+        """
+        self.closing = True
+        if self.task is not None and not self.task.done():
+            self.wakeup.set()
+            await self.task
+
+        await self.flush()
+
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+        if self.pending:
+            self.logger.warning(
+                f"{len(self.pending)} rows left in write-behind journal {self.path}, they'll be written on the next start"
+            )
+
+    async def _insert(self, table_name: str, upsert: bool, rows: List[Dict]) -> bool:
+        table = self.metadata.tables.get(table_name)
+        if table is None:
+            self.logger.error(f"Write-behind journal has rows for unknown table {table_name}")
+            return False
+
+        sql = insert(table).values(rows)
+        if upsert:
+            sql = sql.on_duplicate_key_update({col: sql.inserted[col] for col in rows[0]})
+
+        return await self.data.execute(sql) is not None
+
+    def _ensure_running(self) -> None:
+        if self.closing or (self.task is not None and not self.task.done()):
+            return
+
+        self.wakeup = asyncio.Event()
+        # The first put() can come from inside a request's transaction or a
+        # replica read, start the task in an empty context so it doesn't
+        # inherit them
+        self.task = contextvars.Context().run(
+            asyncio.get_running_loop().create_task, self._run()
+        )
+
+    async def _run(self) -> None:
+        while not self.closing:
+            try:
+                await asyncio.wait_for(
+                    self.wakeup.wait(), self.config.database.write_behind_flush_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+
+            self.wakeup.clear()
+
+            try:
+                await self.flush()
+            except Exception as e:
+                self.logger.error(f"Write-behind flush failed: {e}")
+
+    def _append(self, entry: Dict) -> None:
+        line = json.dumps(entry, default=_encode)
+        self.file.write(line + "\n")
+        self.file.flush()
+
+        if self.config.database.write_behind_fsync:
+            os.fsync(self.file.fileno())
+
+    def _replay(self) -> None:
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line, object_hook=_decode)
+                except ValueError:
+                    # Most likely the last line, cut short by a crash
+                    self.logger.warning(f"Skipping corrupt line in {self.path}")
+                    continue
+
+                if "ack" in entry:
+                    for seq in entry["ack"]:
+                        self.pending.pop(seq, None)
+                else:
+                    self.pending[entry["seq"]] = entry
+
+        # Renumber so the new journal starts from 1
+        entries = list(self.pending.values())
+        self.pending.clear()
+        for seq, entry in enumerate(entries, 1):
+            entry["seq"] = seq
+            self.pending[seq] = entry
+        self.seq = len(entries)
+
+    def _rewrite(self) -> None:
+        """
+        Replaces the journal with one holding only the rows still pending
+        """
+        if self.file is not None:
+            self.file.close()
+
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for entry in self.pending.values():
+                f.write(json.dumps(entry, default=_encode) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(tmp, self.path)
+        self.file = open(self.path, "a", encoding="utf-8")
+
+    def _reject(self, entry: Dict) -> None:
+        self.logger.error(
+            f"Giving up on a row for {entry['table']} after {MAX_ATTEMPTS} attempts, moving it to {self.path}.rejected"
+        )
+        try:
+            with open(self.path + ".rejected", "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, default=_encode) + "\n")
+        except OSError as e:
+            self.logger.error(f"Failed to save rejected row: {e} ({entry})")
+
+
+_queue: Optional[WriteBehindQueue] = None
+_slot_lock: Optional[IO[str]] = None
+
+
+def claim_journal(path: str) -> str:
+    """
+    With multiple title workers (ARTEMIS_WORKERS is set by the supervisor),
+    each needs a journal of its own. Workers take the lowest numbered slot no
+    other live worker holds a lock on, so a worker that replaces one that died
+    picks up its journal.
+    """
+    global _slot_lock
+
+    if not has_fcntl or int(os.environ.get("ARTEMIS_WORKERS", "1")) <= 1:
+        return path
+
+    for slot in count():
+        lock = open(f"{path}.{slot}.lock", "a")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock.close()
+            continue
+
+        # Held until this process exits
+        _slot_lock = lock
+        return f"{path}.{slot}"
+
+
+def get_queue(data: "BaseData", metadata: MetaData) -> WriteBehindQueue:
+    global _queue
+    if _queue is None:
+        _queue = WriteBehindQueue(
+            data, metadata, claim_journal(data.config.database.write_behind_journal)
+        )
+        _queue.open()
+    return _queue
+
+
+def start(data: "BaseData", metadata: MetaData) -> None:
+    """
+    Opens the journal and starts writing any rows left over from the last run.
+    Does nothing unless write_behind is on.
+    """
+    if not data.config.database.write_behind:
+        return
+
+    queue = get_queue(data, metadata)
+    if queue.pending:
+        queue._ensure_running()
+        queue.wakeup.set()
+
+
+async def shutdown() -> None:
+    """
+    Writes out whatever is queued and closes the journal. Safe to call more
+    than once.
+    """
+    global _queue
+    if _queue is not None:
+        queue = _queue
+        _queue = None
+        await queue.close()
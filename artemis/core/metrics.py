@@ -0,0 +1,183 @@
+import logging
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from core.config import CoreConfig
+
+# Upper bounds in seconds, Prometheus style
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+COUNT_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500)
+
+GaugeValue = Union[float, Dict[Tuple[Tuple[str, str], ...], float]]
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def render(self, name: str, labels: str = "") -> List[str]:
+        lines = []
+        sep = "," if labels else ""
+        cumulative = 0
+
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels}{sep}le="{bound}"}} {cumulative}')
+
+        lines.append(f'{name}_bucket{{{labels}{sep}le="+Inf"}} {self.count}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {self.sum}")
+        lines.append(f"{name}_count{suffix} {self.count}")
+        return lines
+
+
+class RequestStats:
+    def __init__(self) -> None:
+        self.queries = 0
+        self.db_time = 0.0
+
+
+histograms: Dict[str, Tuple[str, Dict[str, Histogram]]] = {}
+gauges: Dict[str, Tuple[str, Callable[[], GaugeValue]]] = {}
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    "request_stats", default=None
+)
+
+
+def get_histogram(
+    name: str,
+    help: str,
+    labels: Tuple[Tuple[str, str], ...] = (),
+    buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+) -> Histogram:
+    """
+    Returns the histogram for name and labels, creating it on first use
+    """
+    _, series = histograms.setdefault(name, (help, {}))
+    label_str = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels)
+
+    hist = series.get(label_str)
+    if hist is None:
+        hist = series[label_str] = Histogram(buckets)
+    return hist
+
+
+def record_query(method: str, elapsed: float) -> None:
+    """
+    Records one statement made by a schema method, taking elapsed seconds
+    """
+    get_histogram(
+        "artemis_db_query_seconds",
+        "Query latency by the schema method that made it",
+        (("method", method),),
+    ).observe(elapsed)
+
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+
+
+def register_gauge(name: str, help: str, func: Callable[[], GaugeValue]) -> None:
+    """
+    Adds a gauge read when /metrics is scraped. func returns either a single
+    value, or a dict of values keyed by a tuple of (label, value) pairs.
+    """
+    gauges[name] = (help, func)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render() -> str:
+    lines = []
+    for name, (help, series) in sorted(histograms.items()):
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} histogram")
+        for labels, hist in sorted(series.items()):
+            lines += hist.render(name, labels)
+
+    for name, (help, func) in sorted(gauges.items()):
+        try:
+            value = func()
+        except Exception as e:
+            logging.getLogger("core").error(f"Failed to read gauge {name}: {e}")
+            continue
+
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} gauge")
+        if isinstance(value, dict):
+            for labels, val in value.items():
+                label_str = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels)
+                lines.append(f"{name}{{{label_str}}} {val}")
+        else:
+            lines.append(f"{name} {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+async def handle_metrics(request: Request) -> PlainTextResponse:
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
+
+
+class QueryStatsMiddleware:
+    """
+    Counts the queries made and the time spent in the database while handling
+    each HTTP request, and logs them through the title logger.
+    """
+
+    def __init__(self, app: ASGIApp, cfg: CoreConfig) -> None:
+        self.app = app
+        self.cfg = cfg
+        self.logger = logging.getLogger("title")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        start = time.perf_counter()
+
+        try:
+            await self.app(scope, receive, send)
+
+        finally:
+            _request_stats.reset(token)
+            elapsed = time.perf_counter() - start
+            get_histogram(
+                "artemis_request_queries",
+                "Queries made per HTTP request",
+                buckets=COUNT_BUCKETS,
+            ).observe(stats.queries)
+            get_histogram(
+                "artemis_request_db_seconds",
+                "Time spent in the database per HTTP request",
+            ).observe(stats.db_time)
+
+            msg = (
+                f"{scope['method']} {scope['path']} made {stats.queries} queries, "
+                f"{stats.db_time * 1000:.1f}ms of {elapsed * 1000:.1f}ms in the database"
+            )
+            warn = self.cfg.database.request_query_warn
+            if warn and stats.queries >= warn:
+                self.logger.warning(msg)
+            else:
+                self.logger.debug(msg)
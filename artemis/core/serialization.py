@@ -0,0 +1,187 @@
+import asyncio
+import json
+import logging
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, Union
+
+from core.config import CoreConfig
+
+# Make orjson optional
+try:
+    import orjson  # type: ignore
+
+    has_orjson = True
+except ModuleNotFoundError:
+    has_orjson = False
+
+BACKENDS = ("auto", "orjson", "stdlib")
+
+_use_orjson = has_orjson
+
+# Defaults match TitleConfig, for anything that runs before configure()
+_compression_level = zlib.Z_DEFAULT_COMPRESSION
+_max_request_size = 16 * 1024 * 1024
+_offload_size = 64 * 1024
+_workers = 2
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+class PayloadException(Exception):
+    """
+    Raised when a request body can't be decrypted, decompressed or decoded
+    """
+
+
+def configure(config: CoreConfig) -> None:
+    """
+    Picks the JSON backend from server.json_backend, and applies the title
+    compression and worker settings. Called by TitleServlet on startup, until
+    then orjson is used if it's installed.
+    """
+    global _use_orjson, _compression_level, _max_request_size, _offload_size, _workers
+    backend = config.server.json_backend
+
+    if backend not in BACKENDS:
+        logging.getLogger("core").warning(
+            f"Unknown json_backend {backend}, using auto"
+        )
+        backend = "auto"
+
+    if backend == "orjson" and not has_orjson:
+        logging.getLogger("core").warning(
+            "json_backend is orjson but orjson isn't installed, using the standard library"
+        )
+
+    _use_orjson = has_orjson and backend != "stdlib"
+
+    _compression_level = config.title.compression_level
+    _max_request_size = config.title.max_request_size
+    _offload_size = config.title.codec_offload_size
+    _workers = config.title.codec_workers
+
+
+def backend_name() -> str:
+    return "orjson" if _use_orjson else "stdlib"
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Encodes obj as UTF-8 JSON without escaping non-ASCII characters, like
+    json.dumps(obj, ensure_ascii=False).encode("utf-8").
+
+    orjson leaves out the spaces after , and :, which no game cares about.
+    Anything orjson can't encode (ex. integers wider than 64 bits) goes
+    through the standard library.
+    """
+    if _use_orjson:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass
+
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def loads(data: Union[bytes, bytearray, str]) -> Any:
+    """
+    Decodes JSON from bytes or str. Input orjson rejects (ex. NaN, integers
+    wider than 64 bits) is handed to the standard library, so what's accepted
+    and the errors raised are the same as json.loads.
+    """
+    if _use_orjson:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+
+    return json.loads(data)
+
+
+def decompress(data: bytes, max_size: int) -> bytes:
+    """
+    zlib.decompress that stops once the output reaches max_size bytes, instead
+    of inflating the whole thing first. Raises zlib.error if the data is bad,
+    cut short, or decompresses to more than max_size bytes.
+    """
+    decomp = zlib.decompressobj()
+    out = decomp.decompress(data, max_size)
+
+    if not decomp.eof:
+        if decomp.unconsumed_tail or len(out) >= max_size:
+            raise zlib.error(f"Decompressed size is over the {max_size} byte limit")
+        raise zlib.error("Incomplete or truncated stream")
+
+    return out
+
+
+def decode_request(
+    data: bytes, decrypt: Optional[Callable[[bytes], bytes]] = None
+) -> Any:
+    """
+    Decrypts (if decrypt is given), decompresses and decodes a request body
+    """
+    if decrypt is not None:
+        try:
+            data = decrypt(data)
+        except ValueError as e:
+            raise PayloadException(f"Failed to decrypt: {e}")
+
+    try:
+        data = decompress(data, _max_request_size)
+    except zlib.error as e:
+        raise PayloadException(f"Failed to decompress: {e}")
+
+    try:
+        return loads(data)
+    except ValueError as e:
+        raise PayloadException(f"Failed to decode JSON: {e}")
+
+
+def encode_response(
+    body: bytes, encrypt: Optional[Callable[[bytes], bytes]] = None
+) -> bytes:
+    """
+    Compresses an encoded response, then encrypts it if encrypt is given
+    """
+    zipped = zlib.compress(body, _compression_level)
+    if encrypt is None:
+        return zipped
+
+    return encrypt(zipped)
+
+
+async def run(size: int, func: Callable, *args: Any) -> Any:
+    """
+    Calls func(*args) on a worker thread if size is at least codec_offload_size,
+    otherwise calls it directly. zlib and PyCryptodome release the GIL while
+    they work, so other requests carry on in the meantime.
+    """
+    global _executor
+
+    if _workers <= 0 or size < _offload_size:
+        return func(*args)
+
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=_workers, thread_name_prefix="codec"
+        )
+
+    return await asyncio.get_running_loop().run_in_executor(_executor, func, *args)
+
+
+async def unpack(data: bytes, decrypt: Optional[Callable[[bytes], bytes]] = None) -> Any:
+    """
+    decode_request, on a worker thread for large bodies. Raises PayloadException.
+    """
+    return await run(len(data), decode_request, data, decrypt)
+
+
+async def pack(obj: Any, encrypt: Optional[Callable[[bytes], bytes]] = None) -> bytes:
+    """
+    Encodes, compresses and optionally encrypts a response. Only compression
+    and encryption go to a worker thread, since how large the response is
+    isn't known until it's been encoded.
+    """
+    body = dumps(obj)
+    return await run(len(body), encode_response, body, encrypt)
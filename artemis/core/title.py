@@ -1,13 +1,15 @@
-import json
 import logging
+from bisect import bisect_right
 from logging.handlers import TimedRotatingFileHandler
-from typing import Any, Dict, List, Tuple
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 import coloredlogs
+import inflection
 from starlette.requests import Request
 from starlette.responses import Response
 from starlette.routing import Route
 
+from core import serialization
 from core.config import CoreConfig
 from core.data import Data
 from core.utils import Utils
@@ -17,10 +19,108 @@ class JSONResponseNoASCII(Response):
     media_type = "application/json"
 
     def render(self, content: Any) -> bytes:
-        return json.dumps(
-            content,
-            ensure_ascii=False,
-        ).encode("utf-8")
+        return serialization.dumps(content)
+
+
+class EndpointDispatcher:
+    """
+    Maps the endpoint names a game sends, ex. GetUserMusicApi, to the bound
+    handle_*_request methods of one version handler, so dispatching is a dict
+    lookup instead of converting the name to snake case on every request.
+
+    The table starts out with the CamelCase form of every method. Names the
+    game spells differently (ex. CMGetUserItemApi) are resolved through
+    inflection the first time they're seen and added to the table, and
+    names with no handler are remembered up to a limit.
+    """
+
+    MAX_UNKNOWN = 1024
+
+    def __init__(
+        self, handler: Any, prefix: str = "handle_", suffix: str = "_request"
+    ) -> None:
+        self.handler = handler
+        self.prefix = prefix
+        self.suffix = suffix
+        self.methods: Dict[str, Callable] = {}
+        self.unknown: Set[str] = set()
+
+        for name in dir(type(handler)):
+            if not name.startswith(prefix) or not name.endswith(suffix):
+                continue
+
+            snake = name[len(prefix) : -len(suffix)]
+            endpoint = inflection.camelize(snake)
+            # Only names that convert back to the same method are safe keys
+            if inflection.underscore(endpoint) == snake:
+                self.methods[endpoint] = getattr(handler, name)
+
+    def get(self, endpoint: str) -> Optional[Callable]:
+        method = self.methods.get(endpoint)
+        if method is not None or endpoint in self.unknown:
+            return method
+
+        method = getattr(
+            self.handler,
+            self.prefix + inflection.underscore(endpoint) + self.suffix,
+            None,
+        )
+        if method is not None:
+            self.methods[endpoint] = method
+        elif len(self.unknown) < self.MAX_UNKNOWN:
+            self.unknown.add(endpoint)
+
+        return method
+
+
+class VersionTable:
+    """
+    Resolves the version number a game puts in its URLs (ex. 215 for 2.15) to
+    one of the title's internal versions. Each game code gets a list of
+    (lowest version, internal version) pairs sorted by lowest version. A
+    version resolves to the last pair it reaches, and anything below the
+    first pair resolves to the first pair. Game codes with no list resolve to
+    default. Results are cached per (game code, version).
+    """
+
+    MAX_CACHED = 4096
+
+    def __init__(
+        self, tables: Dict[str, List[Tuple[int, int]]], default: int = 0
+    ) -> None:
+        self.default = default
+        self.thresholds: Dict[str, List[int]] = {}
+        self.versions: Dict[str, List[int]] = {}
+        self.cache: Dict[Tuple[str, int], int] = {}
+
+        for game_code, table in tables.items():
+            thresholds = [x[0] for x in table]
+            if not table or any(a >= b for a, b in zip(thresholds, thresholds[1:])):
+                raise ValueError(
+                    f"Version table for {game_code} must be non-empty and strictly ascending"
+                )
+
+            self.thresholds[game_code] = thresholds
+            self.versions[game_code] = [x[1] for x in table]
+
+    def resolve(self, game_code: str, version: int) -> int:
+        key = (game_code, version)
+        internal_ver = self.cache.get(key)
+        if internal_ver is not None:
+            return internal_ver
+
+        thresholds = self.thresholds.get(game_code)
+        if thresholds is None:
+            internal_ver = self.default
+        else:
+            idx = max(bisect_right(thresholds, version) - 1, 0)
+            internal_ver = self.versions[game_code][idx]
+
+        # version comes straight from the URL, don't let it grow forever
+        if len(self.cache) < self.MAX_CACHED:
+            self.cache[key] = internal_ver
+
+        return internal_ver
 
 
 class BaseServlet:
@@ -141,6 +241,9 @@ class TitleServlet:
             )
             self.logger.initialized = True
 
+        serialization.configure(core_cfg)
+        self.logger.debug(f"Using {serialization.backend_name()} for JSON")
+
         plugins = Utils.get_all_titles()
 
         for folder, mod in plugins.items():
@@ -1,10 +1,11 @@
 import importlib
+import importlib.util
 import logging
 from base64 import b64decode
 from datetime import datetime, timezone
 from os import walk
 from types import ModuleType
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 import jwt
 from starlette.requests import Request
@@ -35,6 +36,30 @@ class Utils:
                         raise
             return ret
 
+    @classmethod
+    def pick_implementation(cls, choice: str, fast: str, fallback: str) -> str:
+        """
+        Returns fast if it was chosen, or choice is auto, and its module is
+        installed, otherwise fallback
+        """
+        if choice == fallback:
+            return fallback
+
+        if choice in ("auto", fast) and importlib.util.find_spec(fast) is not None:
+            return fast
+
+        return fallback
+
+    @classmethod
+    def get_server_stack(cls, cfg: CoreConfig) -> Tuple[str, str]:
+        """
+        Returns the event loop and HTTP implementation to run the servers with
+        """
+        return (
+            cls.pick_implementation(cfg.server.event_loop, "uvloop", "asyncio"),
+            cls.pick_implementation(cfg.server.http, "httptools", "h11"),
+        )
+
     @classmethod
     def get_ip_addr(cls, req: Request) -> str:
         return req.headers.get("x-forwarded-for", req.client.host)
@@ -2,11 +2,42 @@
 import argparse
 import asyncio
 import logging
+from datetime import datetime, timedelta
 from os import W_OK, access, mkdir, path
 
 import yaml
 from core.config import CoreConfig
-from core.data import Data
+from core.data import Data, event_writer, index_check
+from core.utils import Utils
+
+
+async def archive_playlogs(cfg: CoreConfig) -> bool:
+    """
+    Archives every title's old playlogs. Returns False if any title failed,
+    the chunks archived before the failure stay archived.
+    """
+    logger = logging.getLogger("database")
+    before = datetime.now() - timedelta(days=cfg.database.playlog_archive_days)
+    ok = True
+
+    for dir, mod in Utils.get_all_titles().items():
+        title_data = mod.database(cfg)
+        for schema in vars(title_data).values():
+            if hasattr(schema, "archive_playlogs"):
+                count = await schema.archive_playlogs(before)
+                if count is None:
+                    logger.error(
+                        f"{dir}: failed to archive playlogs from before {before:%Y-%m-%d}, run archive-playlogs again to retry"
+                    )
+                    ok = False
+                    continue
+
+                logger.info(
+                    f"{dir}: archived {count} playlogs from before {before:%Y-%m-%d}"
+                )
+
+    return ok
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Database utilities")
@@ -31,7 +62,7 @@ if __name__ == "__main__":
     parser.add_argument(
         "action",
         type=str,
-        help="create, upgrade, create-owner, migrate, create-revision",
+        help="create, upgrade, create-owner, migrate, create-revision, prune-events, archive-playlogs, check-indexes",
     )
     args = parser.parse_args()
 
@@ -78,5 +109,33 @@ if __name__ == "__main__":
         loop = asyncio.get_event_loop()
         loop.run_until_complete(data.create_revision(args.message))
 
+    elif args.action == "prune-events":
+        if cfg.database.event_log_retention_days <= 0:
+            logging.getLogger("database").error(
+                "Set event_log_retention_days in core.yaml to prune the event log"
+            )
+            exit(1)
+        loop = asyncio.get_event_loop()
+        if loop.run_until_complete(event_writer.prune(data.base)) is None:
+            exit(1)
+
+    elif args.action == "archive-playlogs":
+        if cfg.database.playlog_archive_days <= 0:
+            logging.getLogger("database").error(
+                "Set playlog_archive_days in core.yaml to archive playlogs"
+            )
+            exit(1)
+        loop = asyncio.get_event_loop()
+        if not loop.run_until_complete(archive_playlogs(cfg)):
+            exit(1)
+
+    elif args.action == "check-indexes":
+        loop = asyncio.get_event_loop()
+        if not loop.run_until_complete(index_check.check_indexes(data)):
+            exit(1)
+
     else:
         logging.getLogger("database").info(f"Unknown action {args.action}")
+
+    # There's no server shutdown here to write out queued events
+    asyncio.get_event_loop().run_until_complete(event_writer.shutdown())
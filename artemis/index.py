@@ -1,35 +1,47 @@
 #!/usr/bin/env python3
 import argparse
 import asyncio
+import inspect
 import logging
+import platform
+import time
+from multiprocessing import get_context
+from multiprocessing.process import BaseProcess
 from os import environ, path
+from socket import socket
+from typing import List, Optional
 
 import uvicorn
 import yaml
-from core import AimedbServlette, CoreConfig
+from core import AimedbServlette, CoreConfig, Utils
+from core.data import event_writer
+from uvicorn.supervisors.multiprocess import Multiprocess
 
 
-async def launch_main(cfg: CoreConfig, ssl: bool) -> None:
+def title_server_config(cfg: CoreConfig, ssl: bool, port: int, **kwargs) -> uvicorn.Config:
     if ssl:
-        server_cfg = uvicorn.Config(
-            "core.app:app",
-            host=cfg.server.listen_address,
-            port=cfg.server.port if args.port == 0 else args.port,
-            reload=cfg.server.is_develop,
-            log_level="info" if cfg.server.is_develop else "critical",
+        kwargs.update(
             ssl_version=3,
             ssl_certfile=cfg.server.ssl_cert,
             ssl_keyfile=cfg.server.ssl_key,
         )
-    else:
-        server_cfg = uvicorn.Config(
-            "core.app:app",
-            host=cfg.server.listen_address,
-            port=cfg.server.port if args.port == 0 else args.port,
-            reload=cfg.server.is_develop,
-            log_level="info" if cfg.server.is_develop else "critical",
-        )
-    server = uvicorn.Server(server_cfg)
+
+    loop, http = Utils.get_server_stack(cfg)
+
+    return uvicorn.Config(
+        "core.app:app",
+        host=cfg.server.listen_address,
+        port=cfg.server.port if port == 0 else port,
+        reload=cfg.server.is_develop,
+        log_level="info" if cfg.server.is_develop else "critical",
+        loop=loop,
+        http=http,
+        **kwargs,
+    )
+
+
+async def launch_main(cfg: CoreConfig, ssl: bool) -> None:
+    server = uvicorn.Server(title_server_config(cfg, ssl, args.port))
     await server.serve()
 
 
@@ -40,6 +52,7 @@ async def launch_billing(cfg: CoreConfig) -> None:
         port=cfg.billing.port,
         reload=cfg.server.is_develop,
         log_level="info" if cfg.server.is_develop else "critical",
+        http=Utils.get_server_stack(cfg)[1],
         ssl_version=3,
         ssl_certfile=cfg.billing.ssl_cert,
         ssl_keyfile=cfg.billing.ssl_key,
@@ -87,14 +100,17 @@ async def launch_allnet(cfg: CoreConfig) -> None:
         port=cfg.allnet.port,
         reload=cfg.server.is_develop,
         log_level="info" if cfg.server.is_develop else "critical",
+        http=Utils.get_server_stack(cfg)[1],
     )
     server = uvicorn.Server(server_cfg)
     await server.serve()
 
 
-async def launcher(cfg: CoreConfig, ssl: bool) -> None:
-    task_list = [asyncio.create_task(launch_main(cfg, ssl))]
+async def launcher(cfg: CoreConfig, ssl: bool, title: bool = True) -> None:
+    task_list = []
 
+    if title:
+        task_list.append(asyncio.create_task(launch_main(cfg, ssl)))
     if cfg.billing.standalone:
         task_list.append(asyncio.create_task(launch_billing(cfg)))
     if cfg.frontend.enable:
@@ -103,6 +119,9 @@ async def launcher(cfg: CoreConfig, ssl: bool) -> None:
         task_list.append(asyncio.create_task(launch_allnet(cfg)))
     if cfg.aimedb.enable:
         AimedbServlette(cfg).start()
+        if not task_list:
+            # aimedb runs in the background, so keep this process around for it
+            task_list.append(asyncio.get_running_loop().create_future())
 
     done, pending = await asyncio.wait(
         task_list,
@@ -113,6 +132,171 @@ async def launcher(cfg: CoreConfig, ssl: bool) -> None:
     for pending_task in pending:
         pending_task.cancel("Another service died, server is shutting down")
 
+    # Cancelled servers don't run their shutdown hooks, so write out any
+    # events allnet or billing still have queued
+    await asyncio.gather(*pending, return_exceptions=True)
+    await event_writer.shutdown()
+
+
+def install_event_loop(cfg: CoreConfig) -> None:
+    """
+    Makes asyncio.run use the configured event loop. Title workers don't need
+    this, uvicorn sets up their loop itself.
+    """
+    loop, _ = Utils.get_server_stack(cfg)
+    if loop == "uvloop":
+        import uvloop
+
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+
+def check_server_stack(cfg: CoreConfig) -> None:
+    logger = logging.getLogger("core")
+    loop, http = Utils.get_server_stack(cfg)
+
+    for option, choice, picked in (
+        ("event_loop", cfg.server.event_loop, loop),
+        ("http", cfg.server.http, http),
+    ):
+        if choice not in ("auto", picked):
+            logger.warning(
+                f"{option} is set to {choice}, which isn't installed or isn't known, using {picked}"
+            )
+
+    logger.info(f"Using the {loop} event loop and {http} for HTTP")
+
+
+def has_services(cfg: CoreConfig) -> bool:
+    return (
+        cfg.billing.standalone
+        or cfg.frontend.enable
+        or cfg.allnet.standalone
+        or cfg.aimedb.enable
+    )
+
+
+def run_services(cfg: CoreConfig, cfg_dir: str) -> None:
+    environ["ARTEMIS_CFG_DIR"] = cfg_dir
+    install_event_loop(cfg)
+    try:
+        asyncio.run(launcher(cfg, False, title=False))
+    except KeyboardInterrupt:
+        pass
+
+
+class Supervisor(Multiprocess):
+    """
+    uvicorn's worker supervisor, which health checks the title workers and
+    restarts them one at a time on SIGHUP, extended to also look after the
+    process running billing, allnet, aimedb and the frontend. That process
+    only gets a liveness check, and is stopped before its replacement starts
+    since the replacement needs its ports.
+
+    Title workers are replaced the way the installed uvicorn does it. From
+    0.51 each replacement is started before the old worker is stopped, older
+    releases stop the old worker first.
+    """
+
+    # A services process that dies this soon after starting most likely
+    # can't bind its ports, and would keep failing the same way
+    MIN_SERVICES_UPTIME = 10
+
+    def __init__(
+        self,
+        server_cfg: uvicorn.Config,
+        sockets: List[socket],
+        cfg: CoreConfig,
+        cfg_dir: str,
+    ) -> None:
+        if "target" in inspect.signature(Multiprocess.__init__).parameters:
+            # Older uvicorn releases, the newest ones that support python 3.9
+            server = uvicorn.Server(server_cfg)
+            super().__init__(server_cfg, target=server.run, sockets=sockets)
+        else:
+            super().__init__(server_cfg, sockets)
+
+        self.cfg = cfg
+        self.cfg_dir = cfg_dir
+        self.services: Optional[BaseProcess] = None
+        self.services_started = 0.0
+        self.logger = logging.getLogger("core")
+
+    def start_services(self) -> None:
+        if not has_services(self.cfg):
+            return
+
+        self.services = get_context("spawn").Process(
+            target=run_services, args=(self.cfg, self.cfg_dir), name="services"
+        )
+        self.services.start()
+        self.services_started = time.monotonic()
+
+    def stop_services(self) -> None:
+        if self.services is not None and self.services.is_alive():
+            self.services.terminate()
+            self.services.join()
+
+    def init_processes(self) -> None:
+        super().init_processes()
+        self.start_services()
+
+    def keep_subprocess_alive(self) -> None:
+        super().keep_subprocess_alive()
+
+        if self.should_exit.is_set() or self.services is None:
+            return
+
+        if self.services.is_alive():
+            return
+
+        if time.monotonic() - self.services_started < self.MIN_SERVICES_UPTIME:
+            self.logger.error(
+                f"Services process failed to start (exit code {self.services.exitcode}), shutting down"
+            )
+            self.should_exit.set()
+            return
+
+        self.logger.error(
+            f"Services process exited with code {self.services.exitcode}, restarting it"
+        )
+        self.start_services()
+
+    def restart_all(self) -> None:
+        super().restart_all()
+
+        if not self.should_exit.is_set():
+            self.stop_services()
+            self.start_services()
+
+    def terminate_all(self) -> None:
+        super().terminate_all()
+        if self.services is not None and self.services.is_alive():
+            self.services.terminate()
+
+    def join_all(self) -> None:
+        super().join_all()
+        if self.services is not None:
+            self.services.join()
+
+
+def launch_workers(cfg: CoreConfig, ssl: bool, cfg_dir: str) -> None:
+    """
+    Serves the title port from cfg.server.workers processes, and everything
+    else from one more, under a supervisor running in this process
+    """
+    kwargs = {}
+    # Only in uvicorn 0.37 and newer, older releases always wait 5 seconds
+    if "timeout_worker_healthcheck" in inspect.signature(uvicorn.Config).parameters:
+        kwargs["timeout_worker_healthcheck"] = cfg.server.worker_healthcheck_timeout
+
+    server_cfg = title_server_config(
+        cfg, ssl, args.port, workers=cfg.server.workers, **kwargs
+    )
+    environ["ARTEMIS_WORKERS"] = str(cfg.server.workers)
+
+    sock = server_cfg.bind_socket()
+    Supervisor(server_cfg, [sock], cfg, cfg_dir).run()
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Artemis main entry point")
@@ -133,5 +317,23 @@ if __name__ == "__main__":
         cfg.update(yaml.safe_load(open(f"{args.config}/core.yaml")))
 
     environ["ARTEMIS_CFG_DIR"] = args.config
+    check_server_stack(cfg)
+
+    workers = cfg.server.workers
+    if workers > 1 and cfg.server.is_develop:
+        logging.getLogger("core").warning(
+            "Multiple workers can't be used with is_develop on, running one worker"
+        )
+        workers = 1
 
-    asyncio.run(launcher(cfg, args.ssl))
+    elif workers > 1 and platform.system() == "Windows":
+        logging.getLogger("core").warning(
+            "Multiple workers aren't supported on Windows, running one worker"
+        )
+        workers = 1
+
+    if workers > 1:
+        launch_workers(cfg, args.ssl, args.config)
+    else:
+        install_event_loop(cfg)
+        asyncio.run(launcher(cfg, args.ssl))
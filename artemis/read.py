@@ -11,6 +11,8 @@ from typing import List, Optional
 import coloredlogs
 import yaml
 from core import CoreConfig, Utils
+from core.data import Data, event_writer
+from core.data.static_cache import registry as static_registry
 
 
 class BaseReader:
@@ -142,4 +144,15 @@ if __name__ == "__main__":
             loop = asyncio.get_event_loop()
             loop.run_until_complete(handler.read())
 
+            # Let running servers know they need to reload static data for
+            # every title and version the import wrote to, not just this one
+            written = static_registry.written | {(dir, args.version)}
+            static_registry.written.clear()
+            for title, version in sorted(written):
+                loop.run_until_complete(
+                    Data(config).base.bump_static_generation(title, version)
+                )
+
+    # There's no server shutdown here to write out queued events
+    asyncio.get_event_loop().run_until_complete(event_writer.shutdown())
     logger.info("Done")
@@ -1,6 +1,6 @@
 import logging
 from datetime import datetime, timedelta
-from typing import Any, Dict, List
+from typing import Dict
 
 import pytz
 from core.config import CoreConfig
@@ -8,8 +8,6 @@ from titles.chuni.config import ChuniConfig
 from titles.chuni.const import ChuniConstants, FavoriteItemKind
 from titles.chuni.database import ChuniData
 
-SCORE_BUFFER = {}
-
 
 class ChuniBase:
     def __init__(self, core_cfg: CoreConfig, game_cfg: ChuniConfig) -> None:
@@ -523,11 +521,14 @@ class ChuniBase:
         return {"userId": data["userId"], "length": 0, "userFavoriteMusicList": []}
 
     async def handle_get_user_item_api_request(self, data: Dict) -> Dict:
+        # The low part of nextIndex is the id of the first item on the page
         kind = int(int(data["nextIndex"]) / 10000000000)
-        next_idx = int(int(data["nextIndex"]) % 10000000000)
-        user_item_list = await self.data.item.get_items(data["userId"], kind)
+        start_id = int(int(data["nextIndex"]) % 10000000000)
+        page = await self.data.item.get_client_item_page(
+            data["userId"], kind, start_id, int(data["maxCount"])
+        )
 
-        if user_item_list is None or len(user_item_list) == 0:
+        if page is None or (len(page[0]) == 0 and start_id == 0):
             return {
                 "userId": data["userId"],
                 "nextIndex": -1,
@@ -535,21 +536,8 @@ class ChuniBase:
                 "userItemList": [],
             }
 
-        items: List[Dict[str, Any]] = []
-        for i in range(next_idx, len(user_item_list)):
-            tmp = user_item_list[i]._asdict()
-            tmp.pop("user")
-            tmp.pop("id")
-            items.append(tmp)
-            if len(items) >= int(data["maxCount"]):
-                break
-
-        xout = kind * 10000000000 + next_idx + len(items)
-
-        if len(items) < int(data["maxCount"]):
-            next_idx = 0
-        else:
-            next_idx = xout
+        items, next_id = page
+        next_idx = 0 if next_id is None else kind * 10000000000 + next_id
 
         return {
             "userId": data["userId"],
@@ -606,8 +594,11 @@ class ChuniBase:
         }
 
     async def handle_get_user_music_api_request(self, data: Dict) -> Dict:
-        music_detail = await self.data.score.get_scores(data["userId"])
-        if music_detail is None:
+        # nextIndex is the musicId the page starts at
+        page = await self.data.score.get_client_score_page(
+            data["userId"], int(data["nextIndex"]), int(data["maxCount"])
+        )
+        if page is None:
             return {
                 "userId": data["userId"],
                 "length": 0,
@@ -615,51 +606,22 @@ class ChuniBase:
                 "userMusicList": [],  # 240
             }
 
+        music_detail, next_music_id = page
         song_list = []
-        next_idx = int(data["nextIndex"])
-        max_ct = int(data["maxCount"])
 
-        for x in range(next_idx, len(music_detail)):
-            found = False
-            tmp = music_detail[x]._asdict()
-            tmp.pop("user")
-            tmp.pop("id")
-
-            for song in song_list:
-                score_buf = SCORE_BUFFER.get(str(data["userId"])) or []
-                if song["userMusicDetailList"][0]["musicId"] == tmp["musicId"]:
-                    found = True
-                    song["userMusicDetailList"].append(tmp)
-                    song["length"] = len(song["userMusicDetailList"])
-                    score_buf.append(tmp["musicId"])
-                    SCORE_BUFFER[str(data["userId"])] = score_buf
-
-            score_buf = SCORE_BUFFER.get(str(data["userId"])) or []
-            if not found and tmp["musicId"] not in score_buf:
+        # Rows come ordered by musicId, so each song's charts are adjacent
+        for tmp in music_detail:
+            if (
+                song_list
+                and song_list[-1]["userMusicDetailList"][0]["musicId"]
+                == tmp["musicId"]
+            ):
+                song_list[-1]["userMusicDetailList"].append(tmp)
+                song_list[-1]["length"] += 1
+            else:
                 song_list.append({"length": 1, "userMusicDetailList": [tmp]})
-                score_buf.append(tmp["musicId"])
-                SCORE_BUFFER[str(data["userId"])] = score_buf
 
-            if len(song_list) >= max_ct:
-                break
-
-        for songIdx in range(len(song_list)):
-            for recordIdx in range(x + 1, len(music_detail)):
-                if (
-                    song_list[songIdx]["userMusicDetailList"][0]["musicId"]
-                    == music_detail[recordIdx]["musicId"]
-                ):
-                    music = music_detail[recordIdx]._asdict()
-                    music.pop("user")
-                    music.pop("id")
-                    song_list[songIdx]["userMusicDetailList"].append(music)
-                    song_list[songIdx]["length"] += 1
-
-        if len(song_list) >= max_ct:
-            next_idx += len(song_list)
-        else:
-            next_idx = -1
-            SCORE_BUFFER[str(data["userId"])] = []
+        next_idx = -1 if next_music_id is None else next_music_id
         return {
             "userId": data["userId"],
             "length": len(song_list),
@@ -852,182 +814,182 @@ class ChuniBase:
         }
 
     async def handle_upsert_user_all_api_request(self, data: Dict) -> Dict:
-        upsert = data["upsertUserAll"]
-        user_id = data["userId"]
+        async with self.data.transaction() as uow:
+            upsert = data["upsertUserAll"]
+            user_id = data["userId"]
+
+            if "userData" in upsert:
+                try:
+                    upsert["userData"][0]["userName"] = self.read_wtf8(
+                        upsert["userData"][0]["userName"]
+                    )
+                except Exception:
+                    pass
 
-        if "userData" in upsert:
-            try:
-                upsert["userData"][0]["userName"] = self.read_wtf8(
-                    upsert["userData"][0]["userName"]
+                await self.data.profile.put_profile_data(
+                    user_id, self.version, upsert["userData"][0]
                 )
-            except Exception:
-                pass
-
-            await self.data.profile.put_profile_data(
-                user_id, self.version, upsert["userData"][0]
-            )
 
-        if "userDataEx" in upsert:
-            await self.data.profile.put_profile_data_ex(
-                user_id, self.version, upsert["userDataEx"][0]
-            )
+            if "userDataEx" in upsert:
+                await self.data.profile.put_profile_data_ex(
+                    user_id, self.version, upsert["userDataEx"][0]
+                )
 
-        if "userGameOption" in upsert:
-            await self.data.profile.put_profile_option(
-                user_id, upsert["userGameOption"][0]
-            )
+            if "userGameOption" in upsert:
+                await self.data.profile.put_profile_option(
+                    user_id, upsert["userGameOption"][0]
+                )
 
-        if "userGameOptionEx" in upsert:
-            await self.data.profile.put_profile_option_ex(
-                user_id, upsert["userGameOptionEx"][0]
-            )
-        if "userRecentRatingList" in upsert:
-            await self.data.profile.put_profile_recent_rating(
-                user_id, upsert["userRecentRatingList"]
-            )
+            if "userGameOptionEx" in upsert:
+                await self.data.profile.put_profile_option_ex(
+                    user_id, upsert["userGameOptionEx"][0]
+                )
+            if "userRecentRatingList" in upsert:
+                await self.data.profile.put_profile_recent_rating(
+                    user_id, upsert["userRecentRatingList"]
+                )
 
-        if "userCharacterList" in upsert:
-            for character in upsert["userCharacterList"]:
-                await self.data.item.put_character(user_id, character)
+            if "userCharacterList" in upsert:
+                await self.data.item.put_characters(user_id, upsert["userCharacterList"])
 
-        if "userMapList" in upsert:
-            for map in upsert["userMapList"]:
-                await self.data.item.put_map(user_id, map)
+            if "userMapList" in upsert:
+                await self.data.item.put_maps(user_id, upsert["userMapList"])
 
-        if "userCourseList" in upsert:
-            for course in upsert["userCourseList"]:
-                await self.data.score.put_course(user_id, course)
+            if "userCourseList" in upsert:
+                await self.data.score.put_courses(user_id, upsert["userCourseList"])
 
-        if "userDuelList" in upsert:
-            for duel in upsert["userDuelList"]:
-                await self.data.item.put_duel(user_id, duel)
+            if "userDuelList" in upsert:
+                await self.data.item.put_duels(user_id, upsert["userDuelList"])
 
-        if "userItemList" in upsert:
-            for item in upsert["userItemList"]:
-                await self.data.item.put_item(user_id, item)
+            if "userItemList" in upsert:
+                await self.data.item.put_items(user_id, upsert["userItemList"])
 
-        if "userActivityList" in upsert:
-            for activity in upsert["userActivityList"]:
-                await self.data.profile.put_profile_activity(user_id, activity)
+            if "userActivityList" in upsert:
+                for activity in upsert["userActivityList"]:
+                    await self.data.profile.put_profile_activity(user_id, activity)
 
-        if "userChargeList" in upsert:
-            for charge in upsert["userChargeList"]:
-                await self.data.profile.put_profile_charge(user_id, charge)
+            if "userChargeList" in upsert:
+                for charge in upsert["userChargeList"]:
+                    await self.data.profile.put_profile_charge(user_id, charge)
 
-        if "userMusicDetailList" in upsert:
-            for song in upsert["userMusicDetailList"]:
-                await self.data.score.put_score(user_id, song)
+            if "userMusicDetailList" in upsert:
+                await self.data.score.put_scores(user_id, upsert["userMusicDetailList"])
 
-        if "userPlaylogList" in upsert:
-            for playlog in upsert["userPlaylogList"]:
-                # convert the player names to utf-8
-                if playlog["playedUserName1"] is not None:
-                    playlog["playedUserName1"] = self.read_wtf8(
-                        playlog["playedUserName1"]
-                    )
-                if playlog["playedUserName2"] is not None:
-                    playlog["playedUserName2"] = self.read_wtf8(
-                        playlog["playedUserName2"]
-                    )
-                if playlog["playedUserName3"] is not None:
-                    playlog["playedUserName3"] = self.read_wtf8(
-                        playlog["playedUserName3"]
-                    )
-                await self.data.score.put_playlog(user_id, playlog, self.version)
-
-        if "userTeamPoint" in upsert:
-            team_points = upsert["userTeamPoint"]
-            try:
-                for tp in team_points:
-                    if tp["teamId"] != "65535":
-                        # Fetch the current team data
-                        current_team = await self.data.profile.get_team_by_id(
-                            tp["teamId"]
+            if "userPlaylogList" in upsert:
+                for playlog in upsert["userPlaylogList"]:
+                    # convert the player names to utf-8
+                    if playlog["playedUserName1"] is not None:
+                        playlog["playedUserName1"] = self.read_wtf8(
+                            playlog["playedUserName1"]
                         )
-
-                        # Calculate the new teamPoint
-                        new_team_point = (
-                            int(tp["teamPoint"]) + current_team["teamPoint"]
+                    if playlog["playedUserName2"] is not None:
+                        playlog["playedUserName2"] = self.read_wtf8(
+                            playlog["playedUserName2"]
                         )
+                    if playlog["playedUserName3"] is not None:
+                        playlog["playedUserName3"] = self.read_wtf8(
+                            playlog["playedUserName3"]
+                        )
+                    await self.data.score.put_playlog(user_id, playlog, self.version)
+
+            if "userTeamPoint" in upsert:
+                team_points = upsert["userTeamPoint"]
+                try:
+                    for tp in team_points:
+                        if tp["teamId"] != "65535":
+                            # Fetch the current team data
+                            current_team = await self.data.profile.get_team_by_id(
+                                tp["teamId"]
+                            )
+
+                            # Calculate the new teamPoint
+                            new_team_point = (
+                                int(tp["teamPoint"]) + current_team["teamPoint"]
+                            )
+
+                            # Prepare the data to update
+                            team_data = {"teamPoint": new_team_point}
+
+                            # Update the team data
+                            await self.data.profile.update_team(tp["teamId"], team_data)
+                except:
+                    pass  # Probably a better way to catch if the team is not set yet (new profiles), but let's just pass
+            if "userMapAreaList" in upsert:
+                await self.data.item.put_map_areas(user_id, upsert["userMapAreaList"])
+
+            if "userOverPowerList" in upsert:
+                for overpower in upsert["userOverPowerList"]:
+                    await self.data.profile.put_profile_overpower(user_id, overpower)
+
+            if "userEmoneyList" in upsert:
+                for emoney in upsert["userEmoneyList"]:
+                    await self.data.profile.put_profile_emoney(user_id, emoney)
+
+            if "userLoginBonusList" in upsert:
+                for login in upsert["userLoginBonusList"]:
+                    await self.data.item.put_login_bonus(
+                        user_id, self.version, login["presetId"], isWatched=True
+                    )
 
-                        # Prepare the data to update
-                        team_data = {"teamPoint": new_team_point}
-
-                        # Update the team data
-                        await self.data.profile.update_team(tp["teamId"], team_data)
-            except:
-                pass  # Probably a better way to catch if the team is not set yet (new profiles), but let's just pass
-        if "userMapAreaList" in upsert:
-            for map_area in upsert["userMapAreaList"]:
-                await self.data.item.put_map_area(user_id, map_area)
-
-        if "userOverPowerList" in upsert:
-            for overpower in upsert["userOverPowerList"]:
-                await self.data.profile.put_profile_overpower(user_id, overpower)
+            if (
+                "userRecentPlayerList" in upsert
+            ):  # TODO: Seen in Air, maybe implement sometime
+                for rp in upsert["userRecentPlayerList"]:
+                    pass
 
-        if "userEmoneyList" in upsert:
-            for emoney in upsert["userEmoneyList"]:
-                await self.data.profile.put_profile_emoney(user_id, emoney)
+            # added in LUMINOUS
+            if "userCMissionList" in upsert:
+                for cmission in upsert["userCMissionList"]:
+                    mission_id = cmission["missionId"]
 
-        if "userLoginBonusList" in upsert:
-            for login in upsert["userLoginBonusList"]:
-                await self.data.item.put_login_bonus(
-                    user_id, self.version, login["presetId"], isWatched=True
-                )
+                    await self.data.item.put_cmission(
+                        user_id,
+                        {
+                            "missionId": mission_id,
+                            "point": cmission["point"],
+                        },
+                    )
 
-        if (
-            "userRecentPlayerList" in upsert
-        ):  # TODO: Seen in Air, maybe implement sometime
-            for rp in upsert["userRecentPlayerList"]:
-                pass
+                    for progress in cmission["userCMissionProgressList"]:
+                        await self.data.item.put_cmission_progress(
+                            user_id, mission_id, progress
+                        )
 
-        # added in LUMINOUS
-        if "userCMissionList" in upsert:
-            for cmission in upsert["userCMissionList"]:
-                mission_id = cmission["missionId"]
+            if "userNetBattleData" in upsert:
+                net_battle = upsert["userNetBattleData"][0]
 
-                await self.data.item.put_cmission(
-                    user_id,
-                    {
-                        "missionId": mission_id,
-                        "point": cmission["point"],
-                    },
+                # fix the boolean
+                net_battle["isRankUpChallengeFailed"] = (
+                    False if net_battle["isRankUpChallengeFailed"] == "false" else True
                 )
-
-                for progress in cmission["userCMissionProgressList"]:
-                    await self.data.item.put_cmission_progress(
-                        user_id, mission_id, progress
-                    )
-
-        if "userNetBattleData" in upsert:
-            net_battle = upsert["userNetBattleData"][0]
-
-            # fix the boolean
-            net_battle["isRankUpChallengeFailed"] = (
-                False if net_battle["isRankUpChallengeFailed"] == "false" else True
-            )
-            await self.data.profile.put_net_battle(user_id, net_battle)
+                await self.data.profile.put_net_battle(user_id, net_battle)
             
-        if "userFavoriteMusicList" in upsert:
-            # musicId, orderId
-            music_ids = set(int(m["musicId"]) for m in upsert["userFavoriteMusicList"])
-            current_favorites = await self.data.item.get_all_favorites(
-                user_id, self.version, fav_kind=FavoriteItemKind.MUSIC
-            )
+            if "userFavoriteMusicList" in upsert:
+                # musicId, orderId
+                music_ids = set(int(m["musicId"]) for m in upsert["userFavoriteMusicList"])
+                current_favorites = await self.data.item.get_all_favorites(
+                    user_id, self.version, fav_kind=FavoriteItemKind.MUSIC
+                )
 
-            if current_favorites is None:
-                current_favorites = []
+                if current_favorites is None:
+                    current_favorites = []
 
-            current_favorite_ids = set(x.favId for x in current_favorites)
-            keep_ids = current_favorite_ids.intersection(music_ids)
-            deleted_ids = current_favorite_ids - keep_ids
-            added_ids = music_ids - keep_ids
+                current_favorite_ids = set(x.favId for x in current_favorites)
+                keep_ids = current_favorite_ids.intersection(music_ids)
+                deleted_ids = current_favorite_ids - keep_ids
+                added_ids = music_ids - keep_ids
 
-            for fav_id in deleted_ids:
-                await self.data.item.delete_favorite_music(user_id, self.version, fav_id)
+                for fav_id in deleted_ids:
+                    await self.data.item.delete_favorite_music(user_id, self.version, fav_id)
             
-            for fav_id in added_ids:
-                await self.data.item.put_favorite_music(user_id, self.version, fav_id)
+                for fav_id in added_ids:
+                    await self.data.item.put_favorite_music(user_id, self.version, fav_id)
+
+        if uow.failed:
+            self.logger.error(
+                f"Failed to save upsertUserAll for user {user_id}, nothing was saved"
+            )
+            return {"returnCode": "0"}
 
         return {"returnCode": "1"}
 
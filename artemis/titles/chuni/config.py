@@ -91,6 +91,16 @@ class ChuniCryptoConfig:
             self.__config, "chuni", "crypto", "encrypted_only", default=False
         )
 
+    @property
+    def hash_cache(self) -> str:
+        """
+        File the hashed endpoint names are saved to, so they aren't derived
+        again on every start. Blank to always derive them.
+        """
+        return CoreConfig.get_config_field(
+            self.__config, "chuni", "crypto", "hash_cache", default="chuni_hash_cache.json"
+        )
+
 
 class ChuniMatchingConfig:
     def __init__(self, parent_config: "ChuniConfig") -> None:
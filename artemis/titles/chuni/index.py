@@ -1,5 +1,6 @@
 import json
 import logging
+import os
 import string
 import zlib
 from logging.handlers import TimedRotatingFileHandler
@@ -9,8 +10,8 @@ from typing import Dict, List, Tuple
 import coloredlogs
 import inflection
 import yaml
-from core import CoreConfig, Utils
-from core.title import BaseServlet
+from core import CoreConfig, Utils, serialization
+from core.title import BaseServlet, EndpointDispatcher, VersionTable
 from Crypto.Cipher import AES
 from Crypto.Hash import SHA1
 from Crypto.Protocol.KDF import PBKDF2
@@ -41,37 +42,76 @@ from .starplus import ChuniStarPlus
 from .sun import ChuniSun
 from .sunplus import ChuniSunPlus
 
+_JP_VERSIONS = [
+    (0, ChuniConstants.VER_CHUNITHM),
+    (105, ChuniConstants.VER_CHUNITHM_PLUS),
+    (110, ChuniConstants.VER_CHUNITHM_AIR),
+    (115, ChuniConstants.VER_CHUNITHM_AIR_PLUS),
+    (120, ChuniConstants.VER_CHUNITHM_STAR),
+    (125, ChuniConstants.VER_CHUNITHM_STAR_PLUS),
+    (130, ChuniConstants.VER_CHUNITHM_AMAZON),
+    (135, ChuniConstants.VER_CHUNITHM_AMAZON_PLUS),
+    (140, ChuniConstants.VER_CHUNITHM_CRYSTAL),
+    (145, ChuniConstants.VER_CHUNITHM_CRYSTAL_PLUS),
+    (150, ChuniConstants.VER_CHUNITHM_PARADISE),
+    (200, ChuniConstants.VER_CHUNITHM_NEW),
+    (205, ChuniConstants.VER_CHUNITHM_NEW_PLUS),
+    (210, ChuniConstants.VER_CHUNITHM_SUN),
+    (215, ChuniConstants.VER_CHUNITHM_SUN_PLUS),
+    (220, ChuniConstants.VER_CHUNITHM_LUMINOUS),
+    (225, ChuniConstants.VER_CHUNITHM_LUMINOUS_PLUS),
+    (230, ChuniConstants.VER_CHUNITHM_VERSE),
+]
+
+VERSIONS = VersionTable(
+    {
+        ChuniConstants.GAME_CODE: _JP_VERSIONS,
+        ChuniConstants.GAME_CODE_NEW: _JP_VERSIONS,
+        ChuniConstants.GAME_CODE_INT: [
+            # FIXME: SUPERSTAR, not sure what was intended to go here? was just "PARADISE"
+            (0, ChuniConstants.VER_CHUNITHM_PARADISE),
+            (110, ChuniConstants.VER_CHUNITHM_NEW),
+            (115, ChuniConstants.VER_CHUNITHM_NEW_PLUS),
+            (120, ChuniConstants.VER_CHUNITHM_SUN),
+            (125, ChuniConstants.VER_CHUNITHM_SUN_PLUS),
+            (130, ChuniConstants.VER_CHUNITHM_LUMINOUS),
+        ],
+    }
+)
+
 
 class ChuniServlet(BaseServlet):
     def __init__(self, core_cfg: CoreConfig, cfg_dir: str) -> None:
         super().__init__(core_cfg, cfg_dir)
         self.game_cfg = ChuniConfig()
         self.hash_table: Dict[Dict[str, str]] = {}
+        self.ciphers: Dict[int, Tuple[bytes, bytes]] = {}
         if path.exists(f"{cfg_dir}/{ChuniConstants.CONFIG_NAME}"):
             self.game_cfg.update(
                 yaml.safe_load(open(f"{cfg_dir}/{ChuniConstants.CONFIG_NAME}", encoding='utf-8'))
             )
 
         self.versions = [
-            ChuniBase,
-            ChuniPlus,
-            ChuniAir,
-            ChuniAirPlus,
-            ChuniStar,
-            ChuniStarPlus,
-            ChuniAmazon,
-            ChuniAmazonPlus,
-            ChuniCrystal,
-            ChuniCrystalPlus,
-            ChuniParadise,
-            ChuniNew,
-            ChuniNewPlus,
-            ChuniSun,
-            ChuniSunPlus,
-            ChuniLuminous,
-            ChuniLuminousPlus,
-            ChuniVerse,
+            ChuniBase(core_cfg, self.game_cfg),
+            ChuniPlus(core_cfg, self.game_cfg),
+            ChuniAir(core_cfg, self.game_cfg),
+            ChuniAirPlus(core_cfg, self.game_cfg),
+            ChuniStar(core_cfg, self.game_cfg),
+            ChuniStarPlus(core_cfg, self.game_cfg),
+            ChuniAmazon(core_cfg, self.game_cfg),
+            ChuniAmazonPlus(core_cfg, self.game_cfg),
+            ChuniCrystal(core_cfg, self.game_cfg),
+            ChuniCrystalPlus(core_cfg, self.game_cfg),
+            ChuniParadise(core_cfg, self.game_cfg),
+            ChuniNew(core_cfg, self.game_cfg),
+            ChuniNewPlus(core_cfg, self.game_cfg),
+            ChuniSun(core_cfg, self.game_cfg),
+            ChuniSunPlus(core_cfg, self.game_cfg),
+            ChuniLuminous(core_cfg, self.game_cfg),
+            ChuniLuminousPlus(core_cfg, self.game_cfg),
+            ChuniVerse(core_cfg, self.game_cfg),
         ]
+        self.dispatchers = [EndpointDispatcher(x) for x in self.versions]
 
         self.logger = logging.getLogger("chuni")
 
@@ -99,47 +139,108 @@ class ChuniServlet(BaseServlet):
             )
             self.logger.inited = True
 
+        hash_cache = self.load_hash_cache()
+        used_cache = {}
+
         for version, keys in self.game_cfg.crypto.keys.items():
+            try:
+                key_bytes = [bytes.fromhex(x) for x in keys]
+
+            except ValueError as e:
+                self.logger.error(f"Invalid v{version} crypto keys -> {e}")
+                continue
+
+            if len(key_bytes) >= 2:
+                self.ciphers[version] = (key_bytes[0], key_bytes[1])
+
             if len(keys) < 3:
                 continue
 
             self.hash_table[version] = {}
 
+            # number of iterations was changed to 70 in SUN and then to 36
+            if version == ChuniConstants.VER_CHUNITHM_LUMINOUS_PLUS:
+                iter_count = 56
+            elif version == ChuniConstants.VER_CHUNITHM_LUMINOUS:
+                iter_count = 8
+            elif version == ChuniConstants.VER_CHUNITHM_SUN_PLUS:
+                iter_count = 36
+            elif version == ChuniConstants.VER_CHUNITHM_SUN:
+                iter_count = 70
+            else:
+                iter_count = 44
+
+            cache_key = f"{version}:{keys[2]}:{iter_count}"
+            cached = used_cache[cache_key] = hash_cache.get(cache_key, {})
+
             method_list = [
                 method
-                for method in dir(self.versions[version])
-                if not method.startswith("__")
+                for method in dir(type(self.versions[version]))
+                if method.startswith("handle_") and method.endswith("_request")
             ]
             for method in method_list:
                 method_fixed = inflection.camelize(method)[6:-7]
-                # number of iterations was changed to 70 in SUN and then to 36
-                if version == ChuniConstants.VER_CHUNITHM_LUMINOUS_PLUS:
-                    iter_count = 56
-                elif version == ChuniConstants.VER_CHUNITHM_LUMINOUS:
-                    iter_count = 8
-                elif version == ChuniConstants.VER_CHUNITHM_SUN_PLUS:
-                    iter_count = 36
-                elif version == ChuniConstants.VER_CHUNITHM_SUN:
-                    iter_count = 70
-                else:
-                    iter_count = 44
-
-                hash = PBKDF2(
-                    method_fixed,
-                    bytes.fromhex(keys[2]),
-                    128,
-                    count=iter_count,
-                    hmac_hash_module=SHA1,
-                )
 
-                hashed_name = hash.hex()[
-                    :32
-                ]  # truncate unused bytes like the game does
+                hashed_name = cached.get(method_fixed)
+                if hashed_name is None:
+                    hash = PBKDF2(
+                        method_fixed,
+                        key_bytes[2],
+                        128,
+                        count=iter_count,
+                        hmac_hash_module=SHA1,
+                    )
+
+                    hashed_name = hash.hex()[
+                        :32
+                    ]  # truncate unused bytes like the game does
+                    cached[method_fixed] = hashed_name
+
+                    self.logger.debug(
+                        f"Hashed v{version} method {method_fixed} with {key_bytes[2]} to get {hash.hex()}"
+                    )
+
                 self.hash_table[version][hashed_name] = method_fixed
 
-                self.logger.debug(
-                    f"Hashed v{version} method {method_fixed} with {bytes.fromhex(keys[2])} to get {hash.hex()}"
-                )
+        if used_cache != hash_cache:
+            self.save_hash_cache(used_cache)
+
+    def load_hash_cache(self) -> Dict[str, Dict[str, str]]:
+        """
+        Reads the hashed endpoint names saved by the last start, keyed by
+        version, hash key and iteration count
+        """
+        cache_path = self.game_cfg.crypto.hash_cache
+        if not cache_path or not path.exists(cache_path):
+            return {}
+
+        try:
+            with open(cache_path, encoding="utf-8") as f:
+                cache = json.load(f)
+
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable hash cache {cache_path} -> {e}")
+            return {}
+
+        if not isinstance(cache, dict):
+            return {}
+
+        return cache
+
+    def save_hash_cache(self, cache: Dict[str, Dict[str, str]]) -> None:
+        cache_path = self.game_cfg.crypto.hash_cache
+        if not cache_path:
+            return
+
+        try:
+            # Title workers start at the same time, so each writes its own temp file
+            tmp = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(cache, f)
+            os.replace(tmp, cache_path)
+
+        except OSError as e:
+            self.logger.warning(f"Failed to save hash cache {cache_path} -> {e}")
 
     @classmethod
     def is_game_enabled(
@@ -198,61 +299,10 @@ class ChuniServlet(BaseServlet):
         req_raw = await request.body()
 
         encrtped = False
-        internal_ver = 0
+        decrypt = None
         client_ip = Utils.get_ip_addr(request)
 
-        if game_code == "SDHD" or game_code == "SDBT":  # JP
-            if version < 105:  # 1.0
-                internal_ver = ChuniConstants.VER_CHUNITHM
-            elif version >= 105 and version < 110:  # PLUS
-                internal_ver = ChuniConstants.VER_CHUNITHM_PLUS
-            elif version >= 110 and version < 115:  # AIR
-                internal_ver = ChuniConstants.VER_CHUNITHM_AIR
-            elif version >= 115 and version < 120:  # AIR PLUS
-                internal_ver = ChuniConstants.VER_CHUNITHM_AIR_PLUS
-            elif version >= 120 and version < 125:  # STAR
-                internal_ver = ChuniConstants.VER_CHUNITHM_STAR
-            elif version >= 125 and version < 130:  # STAR PLUS
-                internal_ver = ChuniConstants.VER_CHUNITHM_STAR_PLUS
-            elif version >= 130 and version < 135:  # AMAZON
-                internal_ver = ChuniConstants.VER_CHUNITHM_AMAZON
-            elif version >= 135 and version < 140:  # AMAZON PLUS
-                internal_ver = ChuniConstants.VER_CHUNITHM_AMAZON_PLUS
-            elif version >= 140 and version < 145:  # CRYSTAL
-                internal_ver = ChuniConstants.VER_CHUNITHM_CRYSTAL
-            elif version >= 145 and version < 150:  # CRYSTAL PLUS
-                internal_ver = ChuniConstants.VER_CHUNITHM_CRYSTAL_PLUS
-            elif version >= 150 and version < 200:  # PARADISE
-                internal_ver = ChuniConstants.VER_CHUNITHM_PARADISE
-            elif version >= 200 and version < 205:  # NEW!!
-                internal_ver = ChuniConstants.VER_CHUNITHM_NEW
-            elif version >= 205 and version < 210:  # NEW PLUS!!
-                internal_ver = ChuniConstants.VER_CHUNITHM_NEW_PLUS
-            elif version >= 210 and version < 215:  # SUN
-                internal_ver = ChuniConstants.VER_CHUNITHM_SUN
-            elif 215 <= version < 220:  # SUN
-                internal_ver = ChuniConstants.VER_CHUNITHM_SUN_PLUS
-            elif 220 <= version < 225:
-                internal_ver = ChuniConstants.VER_CHUNITHM_LUMINOUS
-            elif 225 <= version < 230:
-                internal_ver = ChuniConstants.VER_CHUNITHM_LUMINOUS_PLUS
-            elif version >= 230:  
-                internal_ver = ChuniConstants.VER_CHUNITHM_VERSE
-        elif game_code == "SDGS":  # Int
-            if version < 110:  # SUPERSTAR
-                internal_ver = (
-                    ChuniConstants.VER_CHUNITHM_PARADISE
-                )  # FIXME: Not sure what was intended to go here? was just "PARADISE"
-            elif version >= 110 and version < 115:  # NEW
-                internal_ver = ChuniConstants.VER_CHUNITHM_NEW
-            elif version >= 115 and version < 120:  # NEW PLUS!!
-                internal_ver = ChuniConstants.VER_CHUNITHM_NEW_PLUS
-            elif version >= 120 and version < 125:  # SUN
-                internal_ver = ChuniConstants.VER_CHUNITHM_SUN
-            elif 125 <= version < 130:  # SUN PLUS
-                internal_ver = ChuniConstants.VER_CHUNITHM_SUN_PLUS
-            elif version >= 130:  # LUMINOUS
-                internal_ver = ChuniConstants.VER_CHUNITHM_LUMINOUS
+        internal_ver = VERSIONS.resolve(game_code, version)
 
         if all(c in string.hexdigits for c in endpoint) and len(endpoint) == 32:
             # If we get a 32 character long hex string, it's a hash and we're
@@ -276,21 +326,17 @@ class ChuniServlet(BaseServlet):
 
                 endpoint = self.hash_table[internal_ver][endpoint.lower()]
 
-            try:
-                crypt = AES.new(
-                    bytes.fromhex(self.game_cfg.crypto.keys[internal_ver][0]),
-                    AES.MODE_CBC,
-                    bytes.fromhex(self.game_cfg.crypto.keys[internal_ver][1]),
-                )
-
-                req_raw = crypt.decrypt(req_raw)
-
-            except Exception as e:
+            if internal_ver not in self.ciphers:
                 self.logger.error(
-                    f"Failed to decrypt v{version} request to {endpoint} -> {e}"
+                    f"No valid keys to decrypt v{version} request to {endpoint}"
                 )
                 return Response(zlib.compress(b'{"stat": "0"}'))
 
+            # CBC ciphers carry state between calls, so each direction of each
+            # request needs its own
+            key, iv = self.ciphers[internal_ver]
+            decrypt = AES.new(key, AES.MODE_CBC, iv).decrypt
+
             encrtped = True
 
         if (
@@ -304,30 +350,24 @@ class ChuniServlet(BaseServlet):
             return Response(zlib.compress(b'{"stat": "0"}'))
 
         try:
-            unzip = zlib.decompress(req_raw)
+            req_data = await serialization.unpack(req_raw, decrypt)
 
-        except zlib.error as e:
-            self.logger.error(
-                f"Failed to decompress v{version} {endpoint} request -> {e}"
-            )
+        except serialization.PayloadException as e:
+            self.logger.error(f"Bad v{version} {endpoint} request -> {e}")
             return Response(zlib.compress(b'{"stat": "0"}'))
 
-        req_data = json.loads(unzip)
-
         self.logger.info(f"v{version} {endpoint} request from {client_ip}")
         self.logger.debug(req_data)
 
         endpoint = endpoint.replace("C3Exp", "") if game_code == "SDGS" else endpoint
-        func_to_find = "handle_" + inflection.underscore(endpoint) + "_request"
-        handler_cls = self.versions[internal_ver](self.core_cfg, self.game_cfg)
+        handler = self.dispatchers[internal_ver].get(endpoint)
 
-        if not hasattr(handler_cls, func_to_find):
+        if handler is None:
             self.logger.warning(f"Unhandled v{version} request {endpoint}")
             resp = {"returnCode": 1}
 
         else:
             try:
-                handler = getattr(handler_cls, func_to_find)
                 resp = await handler(req_data)
 
             except Exception as e:
@@ -339,17 +379,11 @@ class ChuniServlet(BaseServlet):
 
         self.logger.debug(f"Response {resp}")
 
-        zipped = zlib.compress(json.dumps(resp, ensure_ascii=False).encode("utf-8"))
-
         if not encrtped:
-            return Response(zipped)
+            return Response(await serialization.pack(resp))
 
-        padded = pad(zipped, 16)
+        crypt = AES.new(key, AES.MODE_CBC, iv)
 
-        crypt = AES.new(
-            bytes.fromhex(self.game_cfg.crypto.keys[internal_ver][0]),
-            AES.MODE_CBC,
-            bytes.fromhex(self.game_cfg.crypto.keys[internal_ver][1]),
+        return Response(
+            await serialization.pack(resp, lambda zipped: crypt.encrypt(pad(zipped, 16)))
         )
-
-        return Response(crypt.encrypt(padded))
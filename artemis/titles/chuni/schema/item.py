@@ -1,4 +1,4 @@
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from core.data.schema import BaseData, metadata
 from sqlalchemy import (
@@ -450,6 +450,14 @@ class ChuniItemData(BaseData):
             return None
         return result.lastrowid
 
+    async def put_characters(self, user_id: int, character_list: List[Dict]) -> bool:
+        for character_data in character_list:
+            character_data["user"] = user_id
+            character_data["exMaxLv"] = 200
+            self.fix_bools(character_data)
+
+        return await self.upsert_many(character, character_list)
+
     async def get_character(self, user_id: int, character_id: int) -> Optional[Dict]:
         sql = select(character).where(
             and_(character.c.user == user_id, character.c.characterId == character_id)
@@ -481,6 +489,13 @@ class ChuniItemData(BaseData):
             return None
         return result.lastrowid
 
+    async def put_items(self, user_id: int, item_list: List[Dict]) -> bool:
+        for item_data in item_list:
+            item_data["user"] = user_id
+            self.fix_bools(item_data)
+
+        return await self.upsert_many(item, item_list)
+
     async def get_items(self, user_id: int, kind: int = None) -> Optional[List[Row]]:
         if kind is None:
             sql = select(item).where(item.c.user == user_id)
@@ -494,6 +509,15 @@ class ChuniItemData(BaseData):
             return None
         return result.fetchall()
 
+    async def get_client_item_page(
+        self, user_id: int, kind: int, start: int, limit: int
+    ) -> Optional[Tuple[List[Dict], Optional[int]]]:
+        sql = self.client_select(item).where(
+            and_(item.c.user == user_id, item.c.itemKind == kind)
+        )
+
+        return await self.fetch_client_page(sql, item.c.id, start, limit)
+
     async def put_duel(self, user_id: int, duel_data: Dict) -> Optional[int]:
         duel_data["user"] = user_id
 
@@ -507,6 +531,13 @@ class ChuniItemData(BaseData):
             return None
         return result.lastrowid
 
+    async def put_duels(self, user_id: int, duel_list: List[Dict]) -> bool:
+        for duel_data in duel_list:
+            duel_data["user"] = user_id
+            self.fix_bools(duel_data)
+
+        return await self.upsert_many(duel, duel_list)
+
     async def get_duels(self, user_id: int) -> Optional[List[Row]]:
         sql = select(duel).where(duel.c.user == user_id)
 
@@ -528,6 +559,13 @@ class ChuniItemData(BaseData):
             return None
         return result.lastrowid
 
+    async def put_maps(self, user_id: int, map_list: List[Dict]) -> bool:
+        for map_data in map_list:
+            map_data["user"] = user_id
+            self.fix_bools(map_data)
+
+        return await self.upsert_many(map, map_list)
+
     async def get_maps(self, user_id: int) -> Optional[List[Row]]:
         sql = select(map).where(map.c.user == user_id)
 
@@ -549,6 +587,13 @@ class ChuniItemData(BaseData):
             return None
         return result.lastrowid
 
+    async def put_map_areas(self, user_id: int, map_area_list: List[Dict]) -> bool:
+        for map_area_data in map_area_list:
+            map_area_data["user"] = user_id
+            self.fix_bools(map_area_data)
+
+        return await self.upsert_many(map_area, map_area_list)
+
     async def get_map_areas(self, user_id: int, map_area_ids: List[int]) -> Optional[List[Row]]:
         sql = select(map_area).where(map_area.c.user == user_id, map_area.c.mapAreaId.in_(map_area_ids))
 
@@ -4,7 +4,7 @@ from sqlalchemy import Table, Column, UniqueConstraint, and_
 from sqlalchemy.types import Integer, String, Boolean, JSON, BigInteger
 from sqlalchemy.schema import ForeignKey
 from sqlalchemy.engine import Row
-from sqlalchemy.sql import select, delete
+from sqlalchemy.sql import bindparam, select, delete
 from sqlalchemy.dialects.mysql import insert
 
 from core.data.schema import BaseData, metadata
@@ -527,14 +527,18 @@ class ChuniProfileData(BaseData):
         return result.fetchone()
 
     async def get_profile_data(self, aime_id: int, version: int) -> Optional[Row]:
-        sql = select(profile).where(
-            and_(
-                profile.c.user == aime_id,
-                profile.c.version <= version,
+        sql = self.cached_statement(
+            lambda: select(profile)
+            .where(
+                and_(
+                    profile.c.user == bindparam("aime_id"),
+                    profile.c.version <= bindparam("version"),
+                )
             )
-        ).order_by(profile.c.version.desc())
+            .order_by(profile.c.version.desc())
+        )
 
-        result = await self.execute(sql)
+        result = await self.execute(sql, {"aime_id": aime_id, "version": version})
         if result is None:
             return None
         return result.fetchone()
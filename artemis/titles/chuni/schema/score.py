@@ -1,12 +1,15 @@
-from typing import Dict, List, Optional
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 
-from sqlalchemy import Column, Table, UniqueConstraint
+from sqlalchemy import Column, Index, Table, UniqueConstraint
 from sqlalchemy.dialects.mysql import insert
 from sqlalchemy.engine import Row
 from sqlalchemy.schema import ForeignKey
-from sqlalchemy.sql import func, select
+from sqlalchemy.sql import Executable, bindparam, cast, func, literal, select, union_all
 from sqlalchemy.types import Boolean, Integer, String
 
+from core.data import read_only
+from core.data.index_check import HotQuery
 from core.data.schema import BaseData, metadata
 
 from ..config import ChuniConfig
@@ -141,9 +144,30 @@ playlog = Table(
     Column("ticketId", Integer),
     Column("monthPoint", Integer),
     Column("eventPoint", Integer),
+    Index("chuni_score_playlog_romversion_user_idx", "romVersion", "user"),
     mysql_charset="utf8mb4"
 )
 
+# Play counts of archived playlogs, kept for rankings
+playlog_summary = Table(
+    "chuni_score_playlog_summary",
+    metadata,
+    Column("id", Integer, primary_key=True, nullable=False),
+    Column(
+        "user",
+        ForeignKey("aime_user.id", ondelete="cascade", onupdate="cascade"),
+        nullable=False,
+    ),
+    Column("romVersion", String(255)),
+    Column("musicId", Integer),
+    Column("level", Integer),
+    Column("plays", Integer, nullable=False, server_default="0"),
+    UniqueConstraint(
+        "user", "romVersion", "musicId", "level", name="chuni_score_playlog_summary_uk"
+    ),
+    mysql_charset="utf8mb4",
+)
+
 class ChuniRomVersion():
     """
     Class used to easily compare rom version strings and map back to the internal integer version.
@@ -271,6 +295,13 @@ class ChuniScoreData(BaseData):
             return None
         return result.lastrowid
 
+    async def put_courses(self, aime_id: int, course_list: List[Dict]) -> bool:
+        for course_data in course_list:
+            course_data["user"] = aime_id
+            self.fix_bools(course_data)
+
+        return await self.upsert_many(course, course_list)
+
     async def get_scores(
         self,
         aime_id: int,
@@ -283,7 +314,14 @@ class ChuniScoreData(BaseData):
         if levels is not None:
             condition &= best_score.c.level.in_(levels)
 
-        if limit is None and offset is None:
+        if levels is None and limit is None and offset is None:
+            # Unfiltered reads are by far the most common, so reuse the statement
+            sql = self.cached_statement(
+                lambda: select(best_score)
+                .where(best_score.c.user == bindparam("aime_id"))
+                .order_by(best_score.c.musicId.asc(), best_score.c.level.asc())
+            )
+        elif limit is None and offset is None:
             sql = (
                 select(best_score)
                 .where(condition)
@@ -311,11 +349,50 @@ class ChuniScoreData(BaseData):
                 .order_by(best_score.c.musicId, best_score.c.level)
             )
 
-        result = await self.execute(sql)
+        result = await self.execute(sql, {"aime_id": aime_id})
         if result is None:
             return None
         return result.fetchall()
 
+    async def get_client_score_page(
+        self, aime_id: int, start_music_id: int, max_songs: int
+    ) -> Optional[Tuple[List[Dict], Optional[int]]]:
+        """
+        Returns the scores for up to max_songs songs, starting from
+        start_music_id, and the musicId the next page starts at (None on the
+        last page).
+        """
+        subq = (
+            select(best_score.c.musicId)
+            .distinct()
+            .where(
+                (best_score.c.user == aime_id)
+                & (best_score.c.musicId >= start_music_id)
+            )
+            .order_by(best_score.c.musicId)
+            .limit(max_songs + 1)
+            .subquery()
+        )
+
+        sql = (
+            self.client_select(best_score)
+            .join(subq, best_score.c.musicId == subq.c.musicId)
+            .where(best_score.c.user == aime_id)
+            .order_by(best_score.c.musicId, best_score.c.level)
+        )
+
+        rows = await self.fetch_client_rows(sql)
+        if rows is None:
+            return None
+
+        music_ids = {x["musicId"] for x in rows}
+        if len(music_ids) <= max_songs:
+            return rows, None
+
+        # The extra song only tells us where the next page starts
+        next_start = rows[-1]["musicId"]
+        return [x for x in rows if x["musicId"] != next_start], next_start
+
     async def put_score(self, aime_id: int, score_data: Dict) -> Optional[int]:
         score_data["user"] = aime_id
         score_data = self.fix_bools(score_data)
@@ -328,6 +405,13 @@ class ChuniScoreData(BaseData):
             return None
         return result.lastrowid
 
+    async def put_scores(self, aime_id: int, score_list: List[Dict]) -> bool:
+        for score_data in score_list:
+            score_data["user"] = aime_id
+            self.fix_bools(score_data)
+
+        return await self.upsert_many(best_score, score_list)
+
     async def get_playlogs(self, aime_id: int) -> Optional[Row]:
         sql = select(playlog).where(playlog.c.user == aime_id)
 
@@ -336,15 +420,46 @@ class ChuniScoreData(BaseData):
             return None
         return result.fetchall()
 
-    async def get_playlog_rom_versions_by_int_version(self, version: int, aime_id: int = -1) -> Optional[str]:
-        # Get a set of all romVersion values present
+    def rom_versions_sql(self, aime_id: int = -1) -> Executable:
+        # Get a set of all romVersion values present, including archived plays
         sql = select([playlog.c.romVersion])
+        summary_sql = select([playlog_summary.c.romVersion])
         if aime_id != -1:
             # limit results to a specific user
             sql = sql.where(playlog.c.user == aime_id)
-        sql = sql.distinct()
+            summary_sql = summary_sql.where(playlog_summary.c.user == aime_id)
+        return sql.union(summary_sql)
+
+    def rankings_sql(self, rom_versions: List[str]) -> Executable:
+        # Query results that have the matching romVersions, counting archived plays too
+        plays = union_all(
+            select([playlog.c.musicId, literal(1).label('plays')]).where((playlog.c.level != 4) & (playlog.c.romVersion.in_(rom_versions))),
+            select([playlog_summary.c.musicId, playlog_summary.c.plays]).where((playlog_summary.c.level != 4) & (playlog_summary.c.romVersion.in_(rom_versions))),
+        ).subquery()
+        point = cast(func.sum(plays.c.plays), Integer)
+        return select([plays.c.musicId.label('id'), point.label('point')]).group_by(plays.c.musicId).order_by(point.desc()).limit(10)
+
+    def hot_queries(self) -> List[HotQuery]:
+        """
+        Queries that dbutils.py check-indexes EXPLAINs, see core.data.index_check
+        """
+        return [
+            (
+                "chuni romVersions played",
+                "chuni_score_playlog_romversion_user_idx",
+                self.rom_versions_sql(),
+                {},
+            ),
+            (
+                "chuni rankings",
+                "chuni_score_playlog_romversion_user_idx",
+                self.rankings_sql(["2.15.00", "2.16.00"]),
+                {},
+            ),
+        ]
 
-        result = await self.execute(sql)
+    async def get_playlog_rom_versions_by_int_version(self, version: int, aime_id: int = -1) -> Optional[str]:
+        result = await self.execute(self.rom_versions_sql(aime_id))
         if result is None:
             return None
         record_versions = result.fetchall()
@@ -401,25 +516,48 @@ class ChuniScoreData(BaseData):
         if "romVersion" not in playlog_data:
             playlog_data["romVersion"] = ChuniRomVersion.Versions[version]
 
-        sql = insert(playlog).values(**playlog_data)
-
-        result = await self.execute(sql)
-        if result is None:
-            return None
-        return result.lastrowid
+        return await self.insert_later(playlog, playlog_data)
 
+    @read_only
     async def get_rankings(self, version: int) -> Optional[List[Dict]]:
         # Get a list of all the recorded romVersions in the playlog for the given version
         rom_versions = await self.get_playlog_rom_versions_by_int_version(version)
         if rom_versions is None:
             return None
 
-        # Query results that have the matching romVersions
-        sql = select([playlog.c.musicId.label('id'), func.count(playlog.c.musicId).label('point')]).where((playlog.c.level != 4) & (playlog.c.romVersion.in_(rom_versions))).group_by(playlog.c.musicId).order_by(func.count(playlog.c.musicId).desc()).limit(10)
-        result = await self.execute(sql)
+        result = await self.execute(self.rankings_sql(rom_versions))
 
         if result is None:
             return None
 
         rows = result.fetchall()
         return [dict(row) for row in rows]
+
+    async def archive_playlogs(self, before: datetime) -> Optional[int]:
+        """
+        Moves playlogs from before the given date to the archive, keeping
+        their play counts in the summary table for rankings.
+        """
+        return await self.archive_rows(
+            playlog,
+            playlog.c.userPlayDate < before.strftime("%Y-%m-%d"),
+            summarize=self.summarize_playlogs,
+        )
+
+    async def summarize_playlogs(self, rows: List[Dict]) -> bool:
+        counts: Dict[tuple, int] = {}
+        for row in rows:
+            key = (row["user"], row["romVersion"], row["musicId"], row["level"])
+            counts[key] = counts.get(key, 0) + 1
+
+        sql = insert(playlog_summary).values(
+            [
+                {"user": k[0], "romVersion": k[1], "musicId": k[2], "level": k[3], "plays": v}
+                for k, v in counts.items()
+            ]
+        )
+        conflict = sql.on_duplicate_key_update(
+            plays=playlog_summary.c.plays + sql.inserted.plays
+        )
+
+        return await self.execute(conflict) is not None
@@ -1,5 +1,6 @@
 from typing import Dict, List, Optional
 
+from core.data import static_data, static_writer
 from core.data.schema import BaseData, metadata
 from sqlalchemy import (
     Column,
@@ -173,6 +174,7 @@ login_bonus = Table(
 
 
 class ChuniStaticData(BaseData):
+    @static_writer("chuni")
     async def put_login_bonus(
         self,
         version: int,
@@ -210,6 +212,7 @@ class ChuniStaticData(BaseData):
             return None
         return result.lastrowid
 
+    @static_data("chuni")
     async def get_login_bonus(
         self,
         version: int,
@@ -243,6 +246,7 @@ class ChuniStaticData(BaseData):
             return None
         return result.fetchone()
 
+    @static_writer("chuni")
     async def put_login_bonus_preset(
         self, version: int, preset_id: int, preset_name: str, is_enabled: bool
     ) -> Optional[int]:
@@ -262,6 +266,7 @@ class ChuniStaticData(BaseData):
             return None
         return result.lastrowid
 
+    @static_data("chuni")
     async def get_login_bonus_presets(
         self, version: int, is_enabled: bool = True
     ) -> Optional[List[Row]]:
@@ -277,6 +282,7 @@ class ChuniStaticData(BaseData):
             return None
         return result.fetchall()
 
+    @static_writer("chuni")
     async def put_event(
         self, version: int, event_id: int, type: int, name: str
     ) -> Optional[int]:
@@ -291,6 +297,7 @@ class ChuniStaticData(BaseData):
             return None
         return result.lastrowid
 
+    @static_writer("chuni")
     async def update_event(
         self, version: int, event_id: int, enabled: bool
     ) -> Optional[bool]:
@@ -305,6 +312,8 @@ class ChuniStaticData(BaseData):
             )
             return None
 
+        await self.bump_static_generation("chuni", version)
+
         event = self.get_event(version, event_id)
         if event is None:
             self.logger.warning(
@@ -323,6 +332,7 @@ class ChuniStaticData(BaseData):
             return None
         return result.fetchone()
 
+    @static_data("chuni")
     async def get_enabled_events(self, version: int) -> Optional[List[Row]]:
         sql = select(events).where(
             and_(events.c.version == version, events.c.enabled == True,or_(events.c.type == 3,events.c.type == 6))
@@ -341,6 +351,7 @@ class ChuniStaticData(BaseData):
             return None
         return result.fetchall()
 
+    @static_writer("chuni")
     async def put_music(
         self,
         version: int,
@@ -379,6 +390,7 @@ class ChuniStaticData(BaseData):
             return None
         return result.lastrowid
 
+    @static_writer("chuni")
     async def put_charge(
         self,
         version: int,
@@ -409,6 +421,7 @@ class ChuniStaticData(BaseData):
             return None
         return result.lastrowid
 
+    @static_data("chuni")
     async def get_enabled_charges(self, version: int) -> Optional[List[Row]]:
         sql = select(charge).where(
             and_(charge.c.version == version, charge.c.enabled == True)
@@ -459,6 +472,7 @@ class ChuniStaticData(BaseData):
             return None
         return result.fetchone()
 
+    @static_writer("chuni")
     async def put_avatar(
         self,
         version: int,
@@ -489,6 +503,7 @@ class ChuniStaticData(BaseData):
             return None
         return result.lastrowid
 
+    @static_writer("chuni")
     async def put_gacha(
         self,
         version: int,
@@ -576,6 +591,7 @@ class ChuniStaticData(BaseData):
             return None
         return result.fetchone()
 
+    @static_writer("chuni")
     async def put_card(self, version: int, card_id: int, **card_data) -> Optional[int]:
         sql = insert(cards).values(version=version, cardId=card_id, **card_data)
 
@@ -1,4 +1,3 @@
-import json
 import logging
 import string
 import zlib
@@ -7,10 +6,10 @@ from os import path
 from typing import List
 
 import coloredlogs
-import inflection
 import yaml
 from core.config import CoreConfig
-from core.title import BaseServlet
+from core import serialization
+from core.title import BaseServlet, EndpointDispatcher
 from core.utils import Utils
 from starlette.requests import Request
 from starlette.responses import Response
@@ -35,6 +34,7 @@ class CardMakerServlet(BaseServlet):
             CardMakerBase(core_cfg, self.game_cfg),
             CardMaker135(core_cfg, self.game_cfg),
         ]
+        self.dispatchers = [EndpointDispatcher(x) for x in self.versions]
 
         self.logger = logging.getLogger("cardmaker")
         log_fmt_str = "[%(asctime)s] Card Maker | %(levelname)s | %(message)s"
@@ -100,27 +100,22 @@ class CardMakerServlet(BaseServlet):
             self.logger.error("Encryption not supported at this time")
 
         try:
-            unzip = zlib.decompress(req_raw)
+            req_data = await serialization.unpack(req_raw)
 
-        except zlib.error as e:
-            self.logger.error(
-                f"Failed to decompress v{version} {endpoint} request -> {e}"
-            )
+        except serialization.PayloadException as e:
+            self.logger.error(f"Bad v{version} {endpoint} request -> {e}")
             return Response(zlib.compress(b'{"stat": "0"}'))
 
-        req_data = json.loads(unzip)
-
         self.logger.info(f"v{version} {endpoint} request from {client_ip}")
         self.logger.debug(req_data)
 
-        func_to_find = "handle_" + inflection.underscore(endpoint) + "_request"
+        handler = self.dispatchers[internal_ver].get(endpoint)
 
-        if not hasattr(self.versions[internal_ver], func_to_find):
+        if handler is None:
             self.logger.warning(f"Unhandled v{version} request {endpoint}")
             return Response(zlib.compress(b'{"returnCode": 1}'))
 
         try:
-            handler = getattr(self.versions[internal_ver], func_to_find)
             resp = await handler(req_data)
 
         except Exception as e:
@@ -133,6 +128,4 @@ class CardMakerServlet(BaseServlet):
 
         self.logger.debug(f"Response {resp}")
 
-        return Response(
-            zlib.compress(json.dumps(resp, ensure_ascii=False).encode("utf-8"))
-        )
+        return Response(await serialization.pack(resp))
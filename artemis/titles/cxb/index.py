@@ -1,4 +1,3 @@
-import json
 import logging
 import re
 import sys
@@ -11,6 +10,7 @@ import coloredlogs
 import inflection
 import yaml
 from core.config import CoreConfig
+from core import serialization
 from core.title import BaseServlet, JSONResponseNoASCII
 from core.utils import Utils
 from starlette.requests import Request
@@ -112,11 +112,11 @@ class CxbServlet(BaseServlet):
         req_bytes = await req.body()
 
         try:
-            req_json: Dict = json.loads(req_bytes)
+            req_json: Dict = serialization.loads(req_bytes)
 
         except Exception as e:
             try:
-                req_json: Dict = json.loads(
+                req_json: Dict = serialization.loads(
                     req_bytes.decode().replace('"', '\\"').replace("'", '"')
                 )
 
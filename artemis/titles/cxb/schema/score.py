@@ -107,31 +107,32 @@ class CxbScoreData(BaseData):
         """
         Add an entry to the user's play log
         """
-        sql = playlog.insert().values(
-            user=user_id,
-            song_mcode=song_mcode,
-            chart_id=chart_id,
-            score=score,
-            clear=clear,
-            flawless=flawless,
-            super=this_super,
-            cool=cool,
-            fast=this_fast,
-            fast2=this_fast2,
-            slow=this_slow,
-            slow2=this_slow2,
-            fail=fail,
-            combo=combo,
+        result = await self.insert_later(
+            playlog,
+            {
+                "user": user_id,
+                "song_mcode": song_mcode,
+                "chart_id": chart_id,
+                "score": score,
+                "clear": clear,
+                "flawless": flawless,
+                "super": this_super,
+                "cool": cool,
+                "fast": this_fast,
+                "fast2": this_fast2,
+                "slow": this_slow,
+                "slow2": this_slow2,
+                "fail": fail,
+                "combo": combo,
+            },
         )
-
-        result = await self.execute(sql)
         if result is None:
             self.logger.error(
                 f"{__name__} failed to insert playlog! profile: {user_id}, song: {song_mcode}, chart: {chart_id}"
             )
             return None
 
-        return result.lastrowid
+        return result
 
     async def put_ranking(
         self, user_id: int, rev_id: int, song_id: int, score: int, clear: int
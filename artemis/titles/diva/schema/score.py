@@ -1,11 +1,13 @@
 from typing import List, Optional
 
+from core.data import read_only
+from core.data.index_check import HotQuery
 from core.data.schema import BaseData, metadata
-from sqlalchemy import Column, Table, UniqueConstraint, and_
+from sqlalchemy import Column, Index, Table, UniqueConstraint, and_
 from sqlalchemy.dialects.mysql import insert
 from sqlalchemy.engine import Row
 from sqlalchemy.schema import ForeignKey
-from sqlalchemy.sql import func, select
+from sqlalchemy.sql import Executable, func, select
 from sqlalchemy.types import TIMESTAMP, Integer
 
 score = Table(
@@ -28,6 +30,7 @@ score = Table(
     Column("worst", Integer),
     Column("max_combo", Integer),
     UniqueConstraint("user", "pv_id", "difficulty", "edition", name="diva_score_uk"),
+    Index("diva_score_ranking_idx", "pv_id", "difficulty", "edition", "score"),
     mysql_charset="utf8mb4",
 )
 
@@ -202,9 +205,9 @@ class DivaScoreData(BaseData):
             return None
         return result.fetchall()
 
-    async def get_global_ranking(
+    def global_ranking_sql(
         self, user_id: int, pv_id: int, difficulty: int, edition: int
-    ) -> Optional[List[Row]]:
+    ) -> Executable:
         # get the subquery max score of a user with pv_id, difficulty and
         # edition
         sql_sub = (
@@ -225,8 +228,28 @@ class DivaScoreData(BaseData):
             score.c.difficulty == difficulty,
             score.c.edition == edition,
         )
+        return sql
 
-        result = await self.execute(sql)
+    def hot_queries(self) -> List[HotQuery]:
+        """
+        Queries that dbutils.py check-indexes EXPLAINs, see core.data.index_check
+        """
+        return [
+            (
+                "diva global ranking",
+                "diva_score_ranking_idx",
+                self.global_ranking_sql(1, 1, 0, 0),
+                {},
+            ),
+        ]
+
+    @read_only
+    async def get_global_ranking(
+        self, user_id: int, pv_id: int, difficulty: int, edition: int
+    ) -> Optional[List[Row]]:
+        result = await self.execute(
+            self.global_ranking_sql(user_id, pv_id, difficulty, edition)
+        )
         if result is None:
             return None
         return result.fetchone()
@@ -1,5 +1,6 @@
 from typing import List, Optional
 
+from core.data import static_data, static_writer
 from core.data.schema import BaseData, metadata
 from sqlalchemy import Column, Table, UniqueConstraint, and_
 from sqlalchemy.dialects.mysql import insert
@@ -81,6 +82,7 @@ items = Table(
 
 
 class DivaStaticData(BaseData):
+    @static_writer("diva")
     async def put_quests(
         self,
         version: int,
@@ -114,6 +116,7 @@ class DivaStaticData(BaseData):
             return None
         return result.lastrowid
 
+    @static_data("diva")
     async def get_enabled_quests(self, version: int) -> Optional[List[Row]]:
         sql = select(quests).where(
             and_(quests.c.version == version, quests.c.quest_enable == True)
@@ -124,6 +127,7 @@ class DivaStaticData(BaseData):
             return None
         return result.fetchall()
 
+    @static_writer("diva")
     async def put_shop(
         self,
         version: int,
@@ -167,6 +171,7 @@ class DivaStaticData(BaseData):
             return None
         return result.fetchone()
 
+    @static_data("diva")
     async def get_enabled_shops(self, version: int) -> Optional[List[Row]]:
         sql = select(shop).where(
             and_(shop.c.version == version, shop.c.enabled == True)
@@ -177,6 +182,7 @@ class DivaStaticData(BaseData):
             return None
         return result.fetchall()
 
+    @static_writer("diva")
     async def put_items(
         self,
         version: int,
@@ -220,6 +226,7 @@ class DivaStaticData(BaseData):
             return None
         return result.fetchone()
 
+    @static_data("diva")
     async def get_enabled_items(self, version: int) -> Optional[List[Row]]:
         sql = select(items).where(
             and_(items.c.version == version, items.c.enabled == True)
@@ -230,6 +237,7 @@ class DivaStaticData(BaseData):
             return None
         return result.fetchall()
 
+    @static_writer("diva")
     async def put_music(
         self,
         version: int,
@@ -1,5 +1,4 @@
 import asyncio
-import json
 import logging
 import traceback
 from logging.handlers import TimedRotatingFileHandler
@@ -9,6 +8,7 @@ from typing import Dict, List, Tuple
 import coloredlogs
 import yaml
 from core.config import CoreConfig
+from core import serialization
 from core.title import BaseServlet, JSONResponseNoASCII
 from core.utils import Utils
 from starlette.requests import Request
@@ -119,7 +119,7 @@ class IDACServlet(BaseServlet):
 
         header_application = self.decode_header(request.headers.get("application", ""))
 
-        req_data = json.loads(req_raw)
+        req_data = serialization.loads(req_raw)
 
         self.logger.info(f"v{version} {endpoint} request from {client_ip}")
         self.logger.debug(f"Headers: {header_application}")
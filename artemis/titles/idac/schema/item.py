@@ -1,5 +1,6 @@
 from typing import Dict, List, Optional
 
+from core.data import read_only
 from core.data.schema import BaseData, metadata
 from sqlalchemy import (
     Column,
@@ -532,6 +533,7 @@ class IDACItemData(BaseData):
             return None
         return result.fetchall()
 
+    @read_only
     async def get_time_trial_ranking_by_course(
         self,
         version: int,
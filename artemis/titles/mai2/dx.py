@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Any, Dict, List
+from typing import Dict
 
 from core.config import CoreConfig
 from titles.mai2.base import Mai2Base
@@ -95,126 +95,130 @@ class Mai2DX(Mai2Base):
         return {"returnCode": 1, "apiName": "UpsertUserChargelogApi"}
 
     async def handle_upsert_user_all_api_request(self, data: Dict) -> Dict:
-        user_id = data["userId"]
-        upsert = data["upsertUserAll"]
-
-        if int(user_id) & 1000000000001 == 1000000000001:
-            self.logger.info("Guest play, ignoring.")
-            return {"returnCode": 1, "apiName": "UpsertUserAllApi"}
-
-        if "userData" in upsert and len(upsert["userData"]) > 0:
-            upsert["userData"][0]["isNetMember"] = 1
-            upsert["userData"][0].pop("accessCode")
-            await self.data.profile.put_profile_detail(
-                user_id, self.version, upsert["userData"][0]
-            )
-
-        if "userExtend" in upsert and len(upsert["userExtend"]) > 0:
-            await self.data.profile.put_profile_extend(
-                user_id, self.version, upsert["userExtend"][0]
-            )
-
-        if "userGhost" in upsert:
-            for ghost in upsert["userGhost"]:
-                await self.data.profile.put_profile_ghost(user_id, self.version, ghost)
-
-        if "userOption" in upsert and len(upsert["userOption"]) > 0:
-            await self.data.profile.put_profile_option(
-                user_id, self.version, upsert["userOption"][0]
-            )
-
-        if "userRatingList" in upsert and len(upsert["userRatingList"]) > 0:
-            await self.data.profile.put_profile_rating(
-                user_id, self.version, upsert["userRatingList"][0]
-            )
-
-        if "userActivityList" in upsert and len(upsert["userActivityList"]) > 0:
-            for k, v in upsert["userActivityList"][0].items():
-                for act in v:
-                    await self.data.profile.put_profile_activity(user_id, act)
-
-        if "userChargeList" in upsert and len(upsert["userChargeList"]) > 0:
-            for charge in upsert["userChargeList"]:
-                # remove the ".0" from the date string, festival only?
-                charge["purchaseDate"] = charge["purchaseDate"].replace(".0", "")
-                await self.data.item.put_charge(
-                    user_id,
-                    charge["chargeId"],
-                    charge["stock"],
-                    datetime.strptime(
-                        charge["purchaseDate"], Mai2Constants.DATE_TIME_FORMAT
-                    ),
-                    datetime.strptime(
-                        charge["validDate"], Mai2Constants.DATE_TIME_FORMAT
-                    ),
+        async with self.data.transaction() as uow:
+            user_id = data["userId"]
+            upsert = data["upsertUserAll"]
+
+            if int(user_id) & 1000000000001 == 1000000000001:
+                self.logger.info("Guest play, ignoring.")
+                return {"returnCode": 1, "apiName": "UpsertUserAllApi"}
+
+            if "userData" in upsert and len(upsert["userData"]) > 0:
+                upsert["userData"][0]["isNetMember"] = 1
+                upsert["userData"][0].pop("accessCode")
+                await self.data.profile.put_profile_detail(
+                    user_id, self.version, upsert["userData"][0]
                 )
 
-        if "userCharacterList" in upsert and len(upsert["userCharacterList"]) > 0:
-            for char in upsert["userCharacterList"]:
-                await self.data.item.put_character(
-                    user_id,
-                    char["characterId"],
-                    char["level"],
-                    char["awakening"],
-                    char["useCount"],
+            if "userExtend" in upsert and len(upsert["userExtend"]) > 0:
+                await self.data.profile.put_profile_extend(
+                    user_id, self.version, upsert["userExtend"][0]
                 )
 
-        if "userItemList" in upsert and len(upsert["userItemList"]) > 0:
-            for item in upsert["userItemList"]:
-                await self.data.item.put_item(
-                    user_id,
-                    int(item["itemKind"]),
-                    item["itemId"],
-                    item["stock"],
-                    item["isValid"],
+            if "userGhost" in upsert:
+                for ghost in upsert["userGhost"]:
+                    await self.data.profile.put_profile_ghost(user_id, self.version, ghost)
+
+            if "userOption" in upsert and len(upsert["userOption"]) > 0:
+                await self.data.profile.put_profile_option(
+                    user_id, self.version, upsert["userOption"][0]
                 )
 
-        if "userLoginBonusList" in upsert and len(upsert["userLoginBonusList"]) > 0:
-            for login_bonus in upsert["userLoginBonusList"]:
-                await self.data.item.put_login_bonus(
-                    user_id,
-                    login_bonus["bonusId"],
-                    login_bonus["point"],
-                    login_bonus["isCurrent"],
-                    login_bonus["isComplete"],
+            if "userRatingList" in upsert and len(upsert["userRatingList"]) > 0:
+                await self.data.profile.put_profile_rating(
+                    user_id, self.version, upsert["userRatingList"][0]
                 )
 
-        if "userMapList" in upsert and len(upsert["userMapList"]) > 0:
-            for map in upsert["userMapList"]:
-                await self.data.item.put_map(
+            if "userActivityList" in upsert and len(upsert["userActivityList"]) > 0:
+                for k, v in upsert["userActivityList"][0].items():
+                    for act in v:
+                        await self.data.profile.put_profile_activity(user_id, act)
+
+            if "userChargeList" in upsert and len(upsert["userChargeList"]) > 0:
+                for charge in upsert["userChargeList"]:
+                    # remove the ".0" from the date string, festival only?
+                    charge["purchaseDate"] = charge["purchaseDate"].replace(".0", "")
+                    await self.data.item.put_charge(
+                        user_id,
+                        charge["chargeId"],
+                        charge["stock"],
+                        datetime.strptime(
+                            charge["purchaseDate"], Mai2Constants.DATE_TIME_FORMAT
+                        ),
+                        datetime.strptime(
+                            charge["validDate"], Mai2Constants.DATE_TIME_FORMAT
+                        ),
+                    )
+
+            if "userCharacterList" in upsert and len(upsert["userCharacterList"]) > 0:
+                await self.data.item.put_characters(
                     user_id,
-                    map["mapId"],
-                    map["distance"],
-                    map["isLock"],
-                    map["isClear"],
-                    map["isComplete"],
+                    [
+                        {
+                            "characterId": char["characterId"],
+                            "level": char["level"],
+                            "awakening": char["awakening"],
+                            "useCount": char["useCount"],
+                        }
+                        for char in upsert["userCharacterList"]
+                    ],
                 )
 
-        if "userMusicDetailList" in upsert and len(upsert["userMusicDetailList"]) > 0:
-            for music in upsert["userMusicDetailList"]:
-                await self.data.score.put_best_score(user_id, music)
-
-        if "userCourseList" in upsert and len(upsert["userCourseList"]) > 0:
-            for course in upsert["userCourseList"]:
-                await self.data.score.put_course(user_id, course)
-
-        if "userFavoriteList" in upsert and len(upsert["userFavoriteList"]) > 0:
-            for fav in upsert["userFavoriteList"]:
-                await self.data.item.put_favorite(
-                    user_id, fav["kind"], fav["itemIdList"]
+            if "userItemList" in upsert and len(upsert["userItemList"]) > 0:
+                await self.data.item.put_items(user_id, upsert["userItemList"])
+
+            if "userLoginBonusList" in upsert and len(upsert["userLoginBonusList"]) > 0:
+                for login_bonus in upsert["userLoginBonusList"]:
+                    await self.data.item.put_login_bonus(
+                        user_id,
+                        login_bonus["bonusId"],
+                        login_bonus["point"],
+                        login_bonus["isCurrent"],
+                        login_bonus["isComplete"],
+                    )
+
+            if "userMapList" in upsert and len(upsert["userMapList"]) > 0:
+                for map in upsert["userMapList"]:
+                    await self.data.item.put_map(
+                        user_id,
+                        map["mapId"],
+                        map["distance"],
+                        map["isLock"],
+                        map["isClear"],
+                        map["isComplete"],
+                    )
+
+            if "userMusicDetailList" in upsert and len(upsert["userMusicDetailList"]) > 0:
+                await self.data.score.put_best_scores(
+                    user_id, upsert["userMusicDetailList"]
                 )
 
-        if (
-            "userFriendSeasonRankingList" in upsert
-            and len(upsert["userFriendSeasonRankingList"]) > 0
-        ):
-            for fsr in upsert["userFriendSeasonRankingList"]:
-                fsr["recordDate"] = (
-                    datetime.strptime(
-                        fsr["recordDate"], f"{Mai2Constants.DATE_TIME_FORMAT}.0"
-                    ),
-                )
-                await self.data.item.put_friend_season_ranking(user_id, fsr)
+            if "userCourseList" in upsert and len(upsert["userCourseList"]) > 0:
+                await self.data.score.put_courses(user_id, upsert["userCourseList"])
+
+            if "userFavoriteList" in upsert and len(upsert["userFavoriteList"]) > 0:
+                for fav in upsert["userFavoriteList"]:
+                    await self.data.item.put_favorite(
+                        user_id, fav["kind"], fav["itemIdList"]
+                    )
+
+            if (
+                "userFriendSeasonRankingList" in upsert
+                and len(upsert["userFriendSeasonRankingList"]) > 0
+            ):
+                for fsr in upsert["userFriendSeasonRankingList"]:
+                    fsr["recordDate"] = (
+                        datetime.strptime(
+                            fsr["recordDate"], f"{Mai2Constants.DATE_TIME_FORMAT}.0"
+                        ),
+                    )
+                    await self.data.item.put_friend_season_ranking(user_id, fsr)
+
+        if uow.failed:
+            self.logger.error(
+                f"Failed to save upsertUserAll for user {user_id}, nothing was saved"
+            )
+            return {"returnCode": 0, "apiName": "UpsertUserAllApi"}
 
         return {"returnCode": 1, "apiName": "UpsertUserAllApi"}
 
@@ -295,25 +299,14 @@ class Mai2DX(Mai2Base):
         }
 
     async def handle_get_user_item_api_request(self, data: Dict) -> Dict:
+        # The low part of nextIndex is the id of the first item on the page
         kind = int(data["nextIndex"] / 10000000000)
-        next_idx = int(data["nextIndex"] % 10000000000)
-        user_item_list = await self.data.item.get_items(data["userId"], kind)
-
-        items: List[Dict[str, Any]] = []
-        for i in range(next_idx, len(user_item_list)):
-            tmp = user_item_list[i]._asdict()
-            tmp.pop("user")
-            tmp.pop("id")
-            items.append(tmp)
-            if len(items) >= int(data["maxCount"]):
-                break
-
-        xout = kind * 10000000000 + next_idx + len(items)
-
-        if len(items) < int(data["maxCount"]):
-            next_idx = 0
-        else:
-            next_idx = xout
+        start_id = int(data["nextIndex"] % 10000000000)
+        page = await self.data.item.get_client_item_page(
+            data["userId"], kind, start_id, int(data["maxCount"])
+        )
+        items, next_id = page if page is not None else ([], None)
+        next_idx = 0 if next_id is None else kind * 10000000000 + next_id
 
         return {
             "userId": data["userId"],
@@ -571,8 +564,6 @@ class Mai2DX(Mai2Base):
         user_id = data.get("userId", 0)
         next_index = data.get("nextIndex", 0)
         max_ct = data.get("maxCount", 50)
-        upper_lim = next_index + max_ct
-        music_detail_list = []
 
         if user_id <= 0:
             self.logger.warning(
@@ -580,8 +571,11 @@ class Mai2DX(Mai2Base):
             )
             return {}
 
-        songs = await self.data.score.get_best_scores(user_id)
-        if songs is None:
+        # nextIndex is the id of the first score on the page
+        page = await self.data.score.get_client_best_score_page(
+            user_id, next_index, max_ct
+        )
+        if page is None:
             self.logger.debug(
                 "handle_get_user_music_api_request: get_best_scores returned None!"
             )
@@ -591,24 +585,10 @@ class Mai2DX(Mai2Base):
                 "userMusicList": [],
             }
 
-        num_user_songs = len(songs)
-
-        for x in range(next_index, upper_lim):
-            if num_user_songs <= x:
-                break
-
-            tmp = songs[x]._asdict()
-            tmp.pop("id")
-            tmp.pop("user")
-            music_detail_list.append(tmp)
-
-        next_index = (
-            0
-            if len(music_detail_list) < max_ct or num_user_songs == upper_lim
-            else upper_lim
-        )
+        music_detail_list, next_id = page
+        next_index = 0 if next_id is None else next_id
         self.logger.info(
-            f"Send songs {next_index}-{upper_lim} ({len(music_detail_list)}) out of {num_user_songs} for user {user_id} (next idx {next_index})"
+            f"Send {len(music_detail_list)} songs for user {user_id} (next idx {next_index})"
         )
         return {
             "userId": data["userId"],
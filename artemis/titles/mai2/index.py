@@ -1,4 +1,3 @@
-import json
 import logging
 import zlib
 from logging.handlers import TimedRotatingFileHandler
@@ -6,10 +5,10 @@ from os import mkdir, path
 from typing import List, Tuple
 
 import coloredlogs
-import inflection
 import yaml
 from core.config import CoreConfig
-from core.title import BaseServlet
+from core import serialization
+from core.title import BaseServlet, EndpointDispatcher, VersionTable
 from core.utils import Utils
 from starlette.requests import Request
 from starlette.responses import JSONResponse, Response
@@ -28,6 +27,38 @@ from .splashplus import Mai2SplashPlus
 from .universe import Mai2Universe
 from .universeplus import Mai2UniversePlus
 
+VERSIONS = VersionTable(
+    {
+        # Old MaimaiServlet clients
+        Mai2Constants.GAME_CODE: [
+            (0, Mai2Constants.VER_MAIMAI),
+            (110, Mai2Constants.VER_MAIMAI_PLUS),
+            (120, Mai2Constants.VER_MAIMAI_GREEN),
+            (130, Mai2Constants.VER_MAIMAI_GREEN_PLUS),
+            (140, Mai2Constants.VER_MAIMAI_ORANGE),
+            (150, Mai2Constants.VER_MAIMAI_ORANGE_PLUS),
+            (160, Mai2Constants.VER_MAIMAI_PINK),
+            (170, Mai2Constants.VER_MAIMAI_PINK_PLUS),
+            (180, Mai2Constants.VER_MAIMAI_MURASAKI),
+            (185, Mai2Constants.VER_MAIMAI_MURASAKI_PLUS),
+            (190, Mai2Constants.VER_MAIMAI_MILK),
+            (195, Mai2Constants.VER_MAIMAI_MILK_PLUS),
+            (197, Mai2Constants.VER_MAIMAI_FINALE),
+        ],
+        # Maimai2Servlet clients
+        Mai2Constants.GAME_CODE_DX: [
+            (0, Mai2Constants.VER_MAIMAI_DX),
+            (105, Mai2Constants.VER_MAIMAI_DX_PLUS),
+            (110, Mai2Constants.VER_MAIMAI_DX_SPLASH),
+            (115, Mai2Constants.VER_MAIMAI_DX_SPLASH_PLUS),
+            (120, Mai2Constants.VER_MAIMAI_DX_UNIVERSE),
+            (125, Mai2Constants.VER_MAIMAI_DX_UNIVERSE_PLUS),
+            (130, Mai2Constants.VER_MAIMAI_DX_FESTIVAL),
+            (135, Mai2Constants.VER_MAIMAI_DX_FESTIVAL_PLUS),
+        ],
+    }
+)
+
 
 class Mai2Servlet(BaseServlet):
     def __init__(self, core_cfg: CoreConfig, cfg_dir: str) -> None:
@@ -39,7 +70,7 @@ class Mai2Servlet(BaseServlet):
             )
 
         self.versions = [
-            Mai2Base,
+            Mai2Base(core_cfg, self.game_cfg),
             None,
             None,
             None,
@@ -51,15 +82,18 @@ class Mai2Servlet(BaseServlet):
             None,
             None,
             None,
-            Mai2Finale,
-            Mai2DX,
-            Mai2DXPlus,
-            Mai2Splash,
-            Mai2SplashPlus,
-            Mai2Universe,
-            Mai2UniversePlus,
-            Mai2Festival,
-            Mai2FestivalPlus,
+            Mai2Finale(core_cfg, self.game_cfg),
+            Mai2DX(core_cfg, self.game_cfg),
+            Mai2DXPlus(core_cfg, self.game_cfg),
+            Mai2Splash(core_cfg, self.game_cfg),
+            Mai2SplashPlus(core_cfg, self.game_cfg),
+            Mai2Universe(core_cfg, self.game_cfg),
+            Mai2UniversePlus(core_cfg, self.game_cfg),
+            Mai2Festival(core_cfg, self.game_cfg),
+            Mai2FestivalPlus(core_cfg, self.game_cfg),
+        ]
+        self.dispatchers = [
+            EndpointDispatcher(x) if x is not None else None for x in self.versions
         ]
 
         self.logger = logging.getLogger("mai2")
@@ -202,60 +236,28 @@ class Mai2Servlet(BaseServlet):
             return Response(zlib.compress(b'{"returnCode": "1"}'))
 
         req_raw = await request.body()
-        internal_ver = 0
         client_ip = Utils.get_ip_addr(request)
 
-        if version < 110:  # 1.0
-            internal_ver = Mai2Constants.VER_MAIMAI
-        elif version >= 110 and version < 120:  # Plus
-            internal_ver = Mai2Constants.VER_MAIMAI_PLUS
-        elif version >= 120 and version < 130:  # Green
-            internal_ver = Mai2Constants.VER_MAIMAI_GREEN
-        elif version >= 130 and version < 140:  # Green Plus
-            internal_ver = Mai2Constants.VER_MAIMAI_GREEN_PLUS
-        elif version >= 140 and version < 150:  # Orange
-            internal_ver = Mai2Constants.VER_MAIMAI_ORANGE
-        elif version >= 150 and version < 160:  # Orange Plus
-            internal_ver = Mai2Constants.VER_MAIMAI_ORANGE_PLUS
-        elif version >= 160 and version < 170:  # Pink
-            internal_ver = Mai2Constants.VER_MAIMAI_PINK
-        elif version >= 170 and version < 180:  # Pink Plus
-            internal_ver = Mai2Constants.VER_MAIMAI_PINK_PLUS
-        elif version >= 180 and version < 185:  # Murasaki
-            internal_ver = Mai2Constants.VER_MAIMAI_MURASAKI
-        elif version >= 185 and version < 190:  # Murasaki Plus
-            internal_ver = Mai2Constants.VER_MAIMAI_MURASAKI_PLUS
-        elif version >= 190 and version < 195:  # Milk
-            internal_ver = Mai2Constants.VER_MAIMAI_MILK
-        elif version >= 195 and version < 197:  # Milk Plus
-            internal_ver = Mai2Constants.VER_MAIMAI_MILK_PLUS
-        elif version >= 197:  # Finale
-            internal_ver = Mai2Constants.VER_MAIMAI_FINALE
+        internal_ver = VERSIONS.resolve(Mai2Constants.GAME_CODE, version)
 
         try:
-            unzip = zlib.decompress(req_raw)
+            req_data = await serialization.unpack(req_raw)
 
-        except zlib.error as e:
-            self.logger.error(
-                f"Failed to decompress v{version} {endpoint} request -> {e}"
-            )
+        except serialization.PayloadException as e:
+            self.logger.error(f"Bad v{version} {endpoint} request -> {e}")
             return Response(zlib.compress(b'{"stat": "0"}'))
 
-        req_data = json.loads(unzip)
-
         self.logger.info(f"v{version} {endpoint} request from {client_ip}")
         self.logger.debug(req_data)
 
-        func_to_find = "handle_" + inflection.underscore(endpoint) + "_request"
-        handler_cls = self.versions[internal_ver](self.core_cfg, self.game_cfg)
+        handler = self.dispatchers[internal_ver].get(endpoint)
 
-        if not hasattr(handler_cls, func_to_find):
+        if handler is None:
             self.logger.warning(f"Unhandled v{version} request {endpoint}")
             resp = {"returnCode": 1}
 
         else:
             try:
-                handler = getattr(handler_cls, func_to_find)
                 resp = await handler(req_data)
 
             except Exception as e:
@@ -267,9 +269,7 @@ class Mai2Servlet(BaseServlet):
 
         self.logger.debug(f"Response {resp}")
 
-        return Response(
-            zlib.compress(json.dumps(resp, ensure_ascii=False).encode("utf-8"))
-        )
+        return Response(await serialization.pack(resp))
 
     async def handle_mai2(self, request: Request) -> bytes:
         endpoint: str = request.path_params.get("endpoint")
@@ -278,24 +278,8 @@ class Mai2Servlet(BaseServlet):
             return Response(zlib.compress(b'{"returnCode": "1"}'))
 
         req_raw = await request.body()
-        internal_ver = 0
         client_ip = Utils.get_ip_addr(request)
-        if version < 105:  # 1.0
-            internal_ver = Mai2Constants.VER_MAIMAI_DX
-        elif version >= 105 and version < 110:  # PLUS
-            internal_ver = Mai2Constants.VER_MAIMAI_DX_PLUS
-        elif version >= 110 and version < 115:  # Splash
-            internal_ver = Mai2Constants.VER_MAIMAI_DX_SPLASH
-        elif version >= 115 and version < 120:  # Splash PLUS
-            internal_ver = Mai2Constants.VER_MAIMAI_DX_SPLASH_PLUS
-        elif version >= 120 and version < 125:  # UNiVERSE
-            internal_ver = Mai2Constants.VER_MAIMAI_DX_UNIVERSE
-        elif version >= 125 and version < 130:  # UNiVERSE PLUS
-            internal_ver = Mai2Constants.VER_MAIMAI_DX_UNIVERSE_PLUS
-        elif version >= 130 and version < 135:  # FESTiVAL
-            internal_ver = Mai2Constants.VER_MAIMAI_DX_FESTIVAL
-        elif version >= 135:  # FESTiVAL PLUS
-            internal_ver = Mai2Constants.VER_MAIMAI_DX_FESTIVAL_PLUS
+        internal_ver = VERSIONS.resolve(Mai2Constants.GAME_CODE_DX, version)
 
         if (
             request.headers.get("Mai-Encoding") is not None
@@ -312,29 +296,23 @@ class Mai2Servlet(BaseServlet):
             )
 
         try:
-            unzip = zlib.decompress(req_raw)
+            req_data = await serialization.unpack(req_raw)
 
-        except zlib.error as e:
-            self.logger.error(
-                f"Failed to decompress v{version} {endpoint} request -> {e}"
-            )
+        except serialization.PayloadException as e:
+            self.logger.error(f"Bad v{version} {endpoint} request -> {e}")
             return Response(zlib.compress(b'{"stat": "0"}'))
 
-        req_data = json.loads(unzip)
-
         self.logger.info(f"v{version} {endpoint} request from {client_ip}")
         self.logger.debug(req_data)
 
-        func_to_find = "handle_" + inflection.underscore(endpoint) + "_request"
-        handler_cls = self.versions[internal_ver](self.core_cfg, self.game_cfg)
+        handler = self.dispatchers[internal_ver].get(endpoint)
 
-        if not hasattr(handler_cls, func_to_find):
+        if handler is None:
             self.logger.warning(f"Unhandled v{version} request {endpoint}")
             resp = {"returnCode": 1}
 
         else:
             try:
-                handler = getattr(handler_cls, func_to_find)
                 resp = await handler(req_data)
 
             except Exception as e:
@@ -346,9 +324,7 @@ class Mai2Servlet(BaseServlet):
 
         self.logger.debug(f"Response {resp}")
 
-        return Response(
-            zlib.compress(json.dumps(resp, ensure_ascii=False).encode("utf-8"))
-        )
+        return Response(await serialization.pack(resp))
 
     async def handle_old_srv(self, request: Request) -> bytes:
         endpoint = request.path_params.get("endpoint")
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from core.data.schema import BaseData, metadata
 from sqlalchemy import Column, Table, UniqueConstraint, and_
@@ -210,6 +210,26 @@ class Mai2ItemData(BaseData):
             return None
         return result.lastrowid
 
+    async def put_items(
+        self, user_id: int, item_list: List[Dict], is_valid: Optional[bool] = None
+    ) -> bool:
+        """
+        Bulk version of put_item. If is_valid is None, the isValid value
+        sent by the client is used for each item.
+        """
+        rows = [
+            {
+                "user": user_id,
+                "itemKind": int(x["itemKind"]),
+                "itemId": x["itemId"],
+                "stock": x["stock"],
+                "isValid": x["isValid"] if is_valid is None else is_valid,
+            }
+            for x in item_list
+        ]
+
+        return await self.upsert_many(item, rows)
+
     async def get_items(
         self, user_id: int, item_kind: int = None
     ) -> Optional[List[Row]]:
@@ -225,6 +245,15 @@ class Mai2ItemData(BaseData):
             return None
         return result.fetchall()
 
+    async def get_client_item_page(
+        self, user_id: int, item_kind: int, start: int, limit: int
+    ) -> Optional[Tuple[List[Dict], Optional[int]]]:
+        sql = self.client_select(item).where(
+            and_(item.c.user == user_id, item.c.itemKind == item_kind)
+        )
+
+        return await self.fetch_client_page(sql, item.c.id, start, limit)
+
     async def get_item(
         self, user_id: int, item_kind: int, item_id: int
     ) -> Optional[Row]:
@@ -351,6 +380,12 @@ class Mai2ItemData(BaseData):
             return None
         return result.lastrowid
 
+    async def put_characters(self, user_id: int, char_list: List[Dict]) -> bool:
+        for char_data in char_list:
+            char_data["user"] = user_id
+
+        return await self.upsert_many(character, char_list)
+
     async def put_character(
         self,
         user_id: int,
@@ -508,25 +543,22 @@ class Mai2ItemData(BaseData):
         purchase_date: str,
         valid_date: str,
     ) -> Optional[Row]:
-        sql = insert(charge).values(
-            user=user_id,
-            chargeId=charge_id,
-            stock=stock,
-            purchaseDate=purchase_date,
-            validDate=valid_date,
+        result = await self.insert_later(
+            charge,
+            {
+                "user": user_id,
+                "chargeId": charge_id,
+                "stock": stock,
+                "purchaseDate": purchase_date,
+                "validDate": valid_date,
+            },
+            upsert=True,
         )
-
-        conflict = sql.on_duplicate_key_update(
-            stock=stock, purchaseDate=purchase_date, validDate=valid_date
-        )
-
-        result = await self.execute(conflict)
         if result is None:
             self.logger.warning(
                 f"put_card: failed to insert charge! user_id: {user_id}, chargeId: {charge_id}"
             )
-            return None
-        return result.lastrowid
+        return result
 
     async def get_charges(self, user_id: int) -> Optional[Row]:
         sql = charge.select(charge.c.user == user_id)
@@ -1,4 +1,5 @@
-from typing import Dict, List, Optional
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 
 from core.data import cached
 from core.data.schema import BaseData, metadata
@@ -292,6 +293,16 @@ class Mai2ScoreData(BaseData):
             return None
         return result.lastrowid
 
+    async def put_best_scores(
+        self, user_id: int, score_list: List[Dict], is_dx: bool = True
+    ) -> bool:
+        for score_data in score_list:
+            score_data["user"] = user_id
+
+        return await self.upsert_many(
+            best_score if is_dx else best_score_old, score_list
+        )
+
     @cached(2)
     async def get_best_scores(
         self, user_id: int, song_id: int = None, is_dx: bool = True
@@ -318,6 +329,14 @@ class Mai2ScoreData(BaseData):
             return None
         return result.fetchall()
 
+    async def get_client_best_score_page(
+        self, user_id: int, start: int, limit: int, is_dx: bool = True
+    ) -> Optional[Tuple[List[Dict], Optional[int]]]:
+        table = best_score if is_dx else best_score_old
+        sql = self.client_select(table).where(table.c.user == user_id)
+
+        return await self.fetch_client_page(sql, table.c.id, start, limit)
+
     async def get_best_score(
         self, user_id: int, song_id: int, chart_id: int
     ) -> Optional[Row]:
@@ -339,20 +358,29 @@ class Mai2ScoreData(BaseData):
     ) -> Optional[int]:
         playlog_data["user"] = user_id
 
-        if is_dx:
-            sql = insert(playlog).values(**playlog_data)
-        else:
-            sql = insert(playlog_old).values(**playlog_data)
-
-        conflict = sql.on_duplicate_key_update(**playlog_data)
-
-        result = await self.execute(conflict)
+        result = await self.insert_later(
+            playlog if is_dx else playlog_old, playlog_data, upsert=True
+        )
         if result is None:
             self.logger.error(
                 f"put_playlog:  Failed to insert! user_id {user_id} is_dx {is_dx}"
             )
-            return None
-        return result.lastrowid
+        return result
+
+    async def archive_playlogs(self, before: datetime) -> Optional[int]:
+        """
+        Moves playlogs from before the given date to the archive
+        """
+        archived = 0
+        for table in (playlog, playlog_old):
+            count = await self.archive_rows(
+                table, table.c.userPlayDate < before.strftime("%Y-%m-%d")
+            )
+            if count is None:
+                return None
+            archived += count
+
+        return archived
 
     async def put_course(self, user_id: int, course_data: Dict) -> Optional[int]:
         course_data["user"] = user_id
@@ -366,6 +394,12 @@ class Mai2ScoreData(BaseData):
             return None
         return result.lastrowid
 
+    async def put_courses(self, user_id: int, course_list: List[Dict]) -> bool:
+        for course_data in course_list:
+            course_data["user"] = user_id
+
+        return await self.upsert_many(course, course_list)
+
     async def get_courses(self, user_id: int) -> Optional[List[Row]]:
         sql = course.select(course.c.user == user_id)
 
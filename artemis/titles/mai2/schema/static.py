@@ -1,5 +1,6 @@
 from typing import List, Optional
 
+from core.data import static_data, static_writer
 from core.data.schema.base import BaseData, metadata
 from sqlalchemy import Column, Table, UniqueConstraint, and_
 from sqlalchemy.dialects.mysql import insert
@@ -71,6 +72,7 @@ cards = Table(
 
 
 class Mai2StaticData(BaseData):
+    @static_writer("mai2")
     async def put_game_event(
         self, version: int, type: int, event_id: int, name: str
     ) -> Optional[int]:
@@ -98,6 +100,7 @@ class Mai2StaticData(BaseData):
             return None
         return result.fetchall()
 
+    @static_data("mai2")
     async def get_enabled_events(self, version: int) -> Optional[List[Row]]:
         sql = select(event).where(
             and_(event.c.version == version, event.c.enabled == True)
@@ -120,8 +123,12 @@ class Mai2StaticData(BaseData):
             self.logger.warning(
                 f"toggle_game_event: Failed to update event! event_id {event_id} toggle {toggle}"
             )
+            return None
+
+        await self.bump_static_generation("mai2", version)
         return result.last_updated_params()
 
+    @static_writer("mai2")
     async def put_game_music(
         self,
         version: int,
@@ -164,6 +171,7 @@ class Mai2StaticData(BaseData):
             return None
         return result.lastrowid
 
+    @static_writer("mai2")
     async def put_game_ticket(
         self,
         version: int,
@@ -192,6 +200,7 @@ class Mai2StaticData(BaseData):
             return None
         return result.lastrowid
 
+    @static_data("mai2")
     async def get_enabled_tickets(
         self, version: int, kind: int = None
     ) -> Optional[List[Row]]:
@@ -229,6 +238,7 @@ class Mai2StaticData(BaseData):
             return None
         return result.fetchone()
 
+    @static_writer("mai2")
     async def put_card(
         self, version: int, card_id: int, card_name: str, **card_data
     ) -> int:
@@ -244,6 +254,7 @@ class Mai2StaticData(BaseData):
             return None
         return result.lastrowid
 
+    @static_data("mai2")
     async def get_enabled_cards(self, version: int) -> Optional[List[Row]]:
         sql = cards.select(and_(cards.c.version == version, cards.c.enabled == True))
 
@@ -545,10 +545,13 @@ class OngekiBase:
         }
 
     async def handle_get_user_item_api_request(self, data: Dict) -> Dict:
-        kind = data["nextIndex"] / 10000000000
-        p = await self.data.item.get_items(data["userId"], kind)
+        # The low part of nextIndex is the id of the first item on the page
+        kind = data["nextIndex"] // 10000000000
+        page = await self.data.item.get_client_item_page(
+            data["userId"], kind, data["nextIndex"] % 10000000000, data["maxCount"]
+        )
 
-        if p is None:
+        if page is None:
             return {
                 "userId": data["userId"],
                 "nextIndex": -1,
@@ -556,21 +559,11 @@ class OngekiBase:
                 "userItemList": [],
             }
 
-        items: List[Dict[str, Any]] = []
-        for i in range(data["nextIndex"] % 10000000000, len(p)):
-            if len(items) > data["maxCount"]:
-                break
-            tmp = p[i]._asdict()
-            tmp.pop("user")
-            tmp.pop("id")
-            items.append(tmp)
-
-        xout = kind * 10000000000 + (data["nextIndex"] % 10000000000) + len(items)
-
-        if len(items) < data["maxCount"] or data["maxCount"] == 0:
+        items, next_id = page
+        if next_id is None or data["maxCount"] == 0:
             nextIndex = 0
         else:
-            nextIndex = xout
+            nextIndex = kind * 10000000000 + next_id
 
         return {
             "userId": data["userId"],
@@ -978,136 +971,140 @@ class OngekiBase:
         }
 
     async def handle_upsert_user_all_api_request(self, data: Dict) -> Dict:
-        upsert = data["upsertUserAll"]
-        user_id = data["userId"]
+        async with self.data.transaction() as uow:
+            upsert = data["upsertUserAll"]
+            user_id = data["userId"]
 
-        # The isNew fields are new as of Red and up. We just won't use them for now.
+            # The isNew fields are new as of Red and up. We just won't use them for now.
 
-        if "userData" in upsert and len(upsert["userData"]) > 0:
-            await self.data.profile.put_profile_data(
-                user_id, self.version, upsert["userData"][0]
-            )
+            if "userData" in upsert and len(upsert["userData"]) > 0:
+                await self.data.profile.put_profile_data(
+                    user_id, self.version, upsert["userData"][0]
+                )
 
-        if "userOption" in upsert and len(upsert["userOption"]) > 0:
-            await self.data.profile.put_profile_options(
-                user_id, upsert["userOption"][0]
-            )
+            if "userOption" in upsert and len(upsert["userOption"]) > 0:
+                await self.data.profile.put_profile_options(
+                    user_id, upsert["userOption"][0]
+                )
 
-        if "userPlaylogList" in upsert:
-            for playlog in upsert["userPlaylogList"]:
-                await self.data.score.put_playlog(user_id, playlog)
-
-        if "userActivityList" in upsert:
-            for act in upsert["userActivityList"]:
-                await self.data.profile.put_profile_activity(
-                    user_id,
-                    act["kind"],
-                    act["id"],
-                    act["sortNumber"],
-                    act["param1"],
-                    act["param2"],
-                    act["param3"],
-                    act["param4"],
+            if "userPlaylogList" in upsert:
+                for playlog in upsert["userPlaylogList"]:
+                    await self.data.score.put_playlog(user_id, playlog)
+
+            if "userActivityList" in upsert:
+                for act in upsert["userActivityList"]:
+                    await self.data.profile.put_profile_activity(
+                        user_id,
+                        act["kind"],
+                        act["id"],
+                        act["sortNumber"],
+                        act["param1"],
+                        act["param2"],
+                        act["param3"],
+                        act["param4"],
+                    )
+
+            if "userRecentRatingList" in upsert:
+                await self.data.profile.put_profile_recent_rating(
+                    user_id, upsert["userRecentRatingList"]
                 )
 
-        if "userRecentRatingList" in upsert:
-            await self.data.profile.put_profile_recent_rating(
-                user_id, upsert["userRecentRatingList"]
-            )
+            if "userBpBaseList" in upsert:
+                await self.data.profile.put_profile_bp_list(
+                    user_id, upsert["userBpBaseList"]
+                )
 
-        if "userBpBaseList" in upsert:
-            await self.data.profile.put_profile_bp_list(
-                user_id, upsert["userBpBaseList"]
-            )
+            if "userMusicDetailList" in upsert:
+                await self.data.score.put_best_scores(
+                    user_id, upsert["userMusicDetailList"]
+                )
+                self.util_generate_music_list.invalidate(self, user_id)
 
-        if "userMusicDetailList" in upsert:
-            for x in upsert["userMusicDetailList"]:
-                await self.data.score.put_best_score(user_id, x)
+            if "userCharacterList" in upsert:
+                await self.data.item.put_characters(user_id, upsert["userCharacterList"])
 
-        if "userCharacterList" in upsert:
-            for x in upsert["userCharacterList"]:
-                await self.data.item.put_character(user_id, x)
+            if "userCardList" in upsert:
+                await self.data.item.put_cards(user_id, upsert["userCardList"])
 
-        if "userCardList" in upsert:
-            for x in upsert["userCardList"]:
-                await self.data.item.put_card(user_id, x)
+            if "userDeckList" in upsert:
+                await self.data.item.put_decks(user_id, upsert["userDeckList"])
 
-        if "userDeckList" in upsert:
-            for x in upsert["userDeckList"]:
-                await self.data.item.put_deck(user_id, x)
+            if "userTrainingRoomList" in upsert:
+                for x in upsert["userTrainingRoomList"]:
+                    await self.data.profile.put_training_room(user_id, x)
 
-        if "userTrainingRoomList" in upsert:
-            for x in upsert["userTrainingRoomList"]:
-                await self.data.profile.put_training_room(user_id, x)
+            if "userStoryList" in upsert:
+                for x in upsert["userStoryList"]:
+                    await self.data.item.put_story(user_id, x)
 
-        if "userStoryList" in upsert:
-            for x in upsert["userStoryList"]:
-                await self.data.item.put_story(user_id, x)
+            if "userChapterList" in upsert:
+                for x in upsert["userChapterList"]:
+                    await self.data.item.put_chapter(user_id, x)
 
-        if "userChapterList" in upsert:
-            for x in upsert["userChapterList"]:
-                await self.data.item.put_chapter(user_id, x)
+            if "userMemoryChapterList" in upsert:
+                for x in upsert["userMemoryChapterList"]:
+                    await self.data.item.put_memorychapter(user_id, x)
 
-        if "userMemoryChapterList" in upsert:
-            for x in upsert["userMemoryChapterList"]:
-                await self.data.item.put_memorychapter(user_id, x)
+            if "userItemList" in upsert:
+                await self.data.item.put_items(user_id, upsert["userItemList"])
 
-        if "userItemList" in upsert:
-            for x in upsert["userItemList"]:
-                await self.data.item.put_item(user_id, x)
+            if "userMusicItemList" in upsert:
+                await self.data.item.put_music_items(user_id, upsert["userMusicItemList"])
 
-        if "userMusicItemList" in upsert:
-            for x in upsert["userMusicItemList"]:
-                await self.data.item.put_music_item(user_id, x)
+            if "userLoginBonusList" in upsert:
+                for x in upsert["userLoginBonusList"]:
+                    await self.data.item.put_login_bonus(user_id, x)
 
-        if "userLoginBonusList" in upsert:
-            for x in upsert["userLoginBonusList"]:
-                await self.data.item.put_login_bonus(user_id, x)
+            if "userEventPointList" in upsert:
+                for x in upsert["userEventPointList"]:
+                    await self.data.item.put_event_point(user_id, self.version, x)
 
-        if "userEventPointList" in upsert:
-            for x in upsert["userEventPointList"]:
-                await self.data.item.put_event_point(user_id, self.version, x)
+            if "userMissionPointList" in upsert:
+                for x in upsert["userMissionPointList"]:
+                    await self.data.item.put_mission_point(user_id, self.version, x)
 
-        if "userMissionPointList" in upsert:
-            for x in upsert["userMissionPointList"]:
-                await self.data.item.put_mission_point(user_id, self.version, x)
+            if "userRatinglogList" in upsert:
+                for x in upsert["userRatinglogList"]:
+                    await self.data.profile.put_profile_rating_log(
+                        user_id, x["dataVersion"], x["highestRating"]
+                    )
 
-        if "userRatinglogList" in upsert:
-            for x in upsert["userRatinglogList"]:
-                await self.data.profile.put_profile_rating_log(
-                    user_id, x["dataVersion"], x["highestRating"]
-                )
+            if "userBossList" in upsert:
+                for x in upsert["userBossList"]:
+                    await self.data.item.put_boss(user_id, x)
 
-        if "userBossList" in upsert:
-            for x in upsert["userBossList"]:
-                await self.data.item.put_boss(user_id, x)
+            if "userTechCountList" in upsert:
+                for x in upsert["userTechCountList"]:
+                    await self.data.score.put_tech_count(user_id, x)
 
-        if "userTechCountList" in upsert:
-            for x in upsert["userTechCountList"]:
-                await self.data.score.put_tech_count(user_id, x)
+            if "userScenerioList" in upsert:
+                for x in upsert["userScenerioList"]:
+                    await self.data.item.put_scenerio(user_id, x)
 
-        if "userScenerioList" in upsert:
-            for x in upsert["userScenerioList"]:
-                await self.data.item.put_scenerio(user_id, x)
+            if "userTradeItemList" in upsert:
+                for x in upsert["userTradeItemList"]:
+                    await self.data.item.put_trade_item(user_id, x)
 
-        if "userTradeItemList" in upsert:
-            for x in upsert["userTradeItemList"]:
-                await self.data.item.put_trade_item(user_id, x)
+            if "userEventMusicList" in upsert:
+                for x in upsert["userEventMusicList"]:
+                    await self.data.item.put_event_music(user_id, x)
 
-        if "userEventMusicList" in upsert:
-            for x in upsert["userEventMusicList"]:
-                await self.data.item.put_event_music(user_id, x)
+            if "userTechEventList" in upsert:
+                for x in upsert["userTechEventList"]:
+                    await self.data.item.put_tech_event(user_id, self.version, x)
 
-        if "userTechEventList" in upsert:
-            for x in upsert["userTechEventList"]:
-                await self.data.item.put_tech_event(user_id, self.version, x)
+                    # This should be updated once a day in maintenance window, but for time being we will push the update on each upsert
+                    await self.data.item.put_tech_event_ranking(user_id, self.version, x)
 
-                # This should be updated once a day in maintenance window, but for time being we will push the update on each upsert
-                await self.data.item.put_tech_event_ranking(user_id, self.version, x)
+            if "userKopList" in upsert:
+                for x in upsert["userKopList"]:
+                    await self.data.profile.put_kop(user_id, x)
 
-        if "userKopList" in upsert:
-            for x in upsert["userKopList"]:
-                await self.data.profile.put_kop(user_id, x)
+        if uow.failed:
+            self.logger.error(
+                f"Failed to save upsertUserAll for user {user_id}, nothing was saved"
+            )
+            return {"returnCode": 0, "apiName": "upsertUserAll"}
 
         return {"returnCode": 1, "apiName": "upsertUserAll"}
 
@@ -1,4 +1,3 @@
-import json
 import logging
 import string
 import zlib
@@ -10,7 +9,8 @@ import coloredlogs
 import inflection
 import yaml
 from core.config import CoreConfig
-from core.title import BaseServlet
+from core import serialization
+from core.title import BaseServlet, EndpointDispatcher, VersionTable
 from core.utils import Utils
 from Crypto.Cipher import AES
 from Crypto.Hash import SHA1
@@ -31,6 +31,24 @@ from .redplus import OngekiRedPlus
 from .summer import OngekiSummer
 from .summerplus import OngekiSummerPlus
 
+VERSIONS = VersionTable(
+    {
+        OngekiConstants.GAME_CODE: [
+            (0, OngekiConstants.VER_ONGEKI),
+            (105, OngekiConstants.VER_ONGEKI_PLUS),
+            (110, OngekiConstants.VER_ONGEKI_SUMMER),
+            (115, OngekiConstants.VER_ONGEKI_SUMMER_PLUS),
+            (120, OngekiConstants.VER_ONGEKI_RED),
+            (125, OngekiConstants.VER_ONGEKI_RED_PLUS),
+            (130, OngekiConstants.VER_ONGEKI_BRIGHT),
+            (135, OngekiConstants.VER_ONGEKI_BRIGHT_MEMORY),
+            # Versions newer than we know about get the base handler, same
+            # as before the table existed
+            (140, OngekiConstants.VER_ONGEKI),
+        ],
+    }
+)
+
 
 class OngekiServlet(BaseServlet):
     def __init__(self, core_cfg: CoreConfig, cfg_dir: str) -> None:
@@ -52,6 +70,7 @@ class OngekiServlet(BaseServlet):
             OngekiBright(core_cfg, self.game_cfg),
             OngekiBrightMemory(core_cfg, self.game_cfg),
         ]
+        self.dispatchers = [EndpointDispatcher(x) for x in self.versions]
 
         self.logger = logging.getLogger("ongeki")
 
@@ -162,25 +181,10 @@ class OngekiServlet(BaseServlet):
 
         req_raw = await request.body()
         encrtped = False
-        internal_ver = 0
+        decrypt = None
         client_ip = Utils.get_ip_addr(request)
 
-        if version < 105:  # 1.0
-            internal_ver = OngekiConstants.VER_ONGEKI
-        elif version >= 105 and version < 110:  # Plus
-            internal_ver = OngekiConstants.VER_ONGEKI_PLUS
-        elif version >= 110 and version < 115:  # Summer
-            internal_ver = OngekiConstants.VER_ONGEKI_SUMMER
-        elif version >= 115 and version < 120:  # Summer Plus
-            internal_ver = OngekiConstants.VER_ONGEKI_SUMMER_PLUS
-        elif version >= 120 and version < 125:  # Red
-            internal_ver = OngekiConstants.VER_ONGEKI_RED
-        elif version >= 125 and version < 130:  # Red Plus
-            internal_ver = OngekiConstants.VER_ONGEKI_RED_PLUS
-        elif version >= 130 and version < 135:  # Bright
-            internal_ver = OngekiConstants.VER_ONGEKI_BRIGHT
-        elif version >= 135 and version < 140:  # Bright Memory
-            internal_ver = OngekiConstants.VER_ONGEKI_BRIGHT_MEMORY
+        internal_ver = VERSIONS.resolve(OngekiConstants.GAME_CODE, version)
 
         if all(c in string.hexdigits for c in endpoint) and len(endpoint) == 32:
             # If we get a 32 character long hex string, it's a hash and we're
@@ -205,11 +209,11 @@ class OngekiServlet(BaseServlet):
                     bytes.fromhex(self.game_cfg.crypto.keys[internal_ver][1]),
                 )
 
-                req_raw = crypt.decrypt(req_raw)
+                decrypt = crypt.decrypt
 
             except Exception as e:
                 self.logger.error(
-                    f"Failed to decrypt v{version} request to {endpoint} -> {e}"
+                    f"Failed to set up decryption for v{version} request to {endpoint} -> {e}"
                 )
                 return Response(zlib.compress(b'{"stat": "0"}'))
 
@@ -222,27 +226,22 @@ class OngekiServlet(BaseServlet):
             return Response(zlib.compress(b'{"stat": "0"}'))
 
         try:
-            unzip = zlib.decompress(req_raw)
+            req_data = await serialization.unpack(req_raw, decrypt)
 
-        except zlib.error as e:
-            self.logger.error(
-                f"Failed to decompress v{version} {endpoint} request -> {e}"
-            )
+        except serialization.PayloadException as e:
+            self.logger.error(f"Bad v{version} {endpoint} request -> {e}")
             return Response(zlib.compress(b'{"stat": "0"}'))
 
-        req_data = json.loads(unzip)
-
         self.logger.info(f"v{version} {endpoint} request from {client_ip}")
         self.logger.debug(req_data)
 
-        func_to_find = "handle_" + inflection.underscore(endpoint) + "_request"
+        handler = self.dispatchers[internal_ver].get(endpoint)
 
-        if not hasattr(self.versions[internal_ver], func_to_find):
+        if handler is None:
             self.logger.warning(f"Unhandled v{version} request {endpoint}")
             return Response(zlib.compress(b'{"returnCode": 1}'))
 
         try:
-            handler = getattr(self.versions[internal_ver], func_to_find)
             resp = await handler(req_data)
 
         except Exception as e:
@@ -254,12 +253,8 @@ class OngekiServlet(BaseServlet):
 
         self.logger.debug(f"Response {resp}")
 
-        zipped = zlib.compress(json.dumps(resp, ensure_ascii=False).encode("utf-8"))
-
         if not encrtped or version < 120:
-            return Response(zipped)
-
-        padded = pad(zipped, 16)
+            return Response(await serialization.pack(resp))
 
         crypt = AES.new(
             bytes.fromhex(self.game_cfg.crypto.keys[internal_ver][0]),
@@ -267,4 +262,6 @@ class OngekiServlet(BaseServlet):
             bytes.fromhex(self.game_cfg.crypto.keys[internal_ver][1]),
         )
 
-        return Response(crypt.encrypt(padded))
+        return Response(
+            await serialization.pack(resp, lambda zipped: crypt.encrypt(pad(zipped, 16)))
+        )
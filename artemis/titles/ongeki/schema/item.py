@@ -1,12 +1,14 @@
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
+from core.data import read_only
+from core.data.index_check import HotQuery
 from core.data.schema import BaseData, metadata
-from sqlalchemy import Column, Table, UniqueConstraint, and_
+from sqlalchemy import Column, Index, Table, UniqueConstraint, and_
 from sqlalchemy.dialects.mysql import insert
 from sqlalchemy.engine import Row
 from sqlalchemy.schema import ForeignKey
-from sqlalchemy.sql import func, select
+from sqlalchemy.sql import Executable, func, select
 from sqlalchemy.types import TIMESTAMP, Boolean, Integer, String
 
 card = Table(
@@ -270,6 +272,9 @@ tech_ranking = Table(
     Column("totalPlatinumScore", Integer, nullable=False),
     Column("totalTechScore", Integer, nullable=False),
     UniqueConstraint("user", "eventId", name="ongeki_tech_event_ranking_uk"),
+    Index(
+        "ongeki_tech_event_ranking_version_idx", "version", "eventId", "totalTechScore"
+    ),
     mysql_charset="utf8mb4",
 )
 
@@ -356,6 +361,12 @@ class OngekiItemData(BaseData):
             return None
         return result.lastrowid
 
+    async def put_cards(self, aime_id: int, card_list: List[Dict]) -> bool:
+        for card_data in card_list:
+            card_data["user"] = aime_id
+
+        return await self.upsert_many(card, card_list)
+
     async def get_cards(self, aime_id: int) -> Optional[List[Dict]]:
         sql = select(card).where(card.c.user == aime_id)
 
@@ -376,6 +387,12 @@ class OngekiItemData(BaseData):
             return None
         return result.lastrowid
 
+    async def put_characters(self, aime_id: int, character_list: List[Dict]) -> bool:
+        for character_data in character_list:
+            character_data["user"] = aime_id
+
+        return await self.upsert_many(character, character_list)
+
     async def get_characters(self, aime_id: int) -> Optional[List[Dict]]:
         sql = select(character).where(character.c.user == aime_id)
 
@@ -396,6 +413,12 @@ class OngekiItemData(BaseData):
             return None
         return result.lastrowid
 
+    async def put_decks(self, aime_id: int, deck_list: List[Dict]) -> bool:
+        for deck_data in deck_list:
+            deck_data["user"] = aime_id
+
+        return await self.upsert_many(deck, deck_list)
+
     async def get_deck(self, aime_id: int, deck_id: int) -> Optional[Dict]:
         sql = select(deck).where(and_(deck.c.user == aime_id, deck.c.deckId == deck_id))
 
@@ -476,6 +499,12 @@ class OngekiItemData(BaseData):
             return None
         return result.lastrowid
 
+    async def put_items(self, aime_id: int, item_list: List[Dict]) -> bool:
+        for item_data in item_list:
+            item_data["user"] = aime_id
+
+        return await self.upsert_many(item, item_list)
+
     async def get_item(
         self, aime_id: int, item_id: int, item_kind: int
     ) -> Optional[Dict]:
@@ -501,6 +530,15 @@ class OngekiItemData(BaseData):
             return None
         return result.fetchall()
 
+    async def get_client_item_page(
+        self, aime_id: int, item_kind: int, start: int, limit: int
+    ) -> Optional[Tuple[List[Dict], Optional[int]]]:
+        sql = self.client_select(item).where(
+            and_(item.c.user == aime_id, item.c.itemKind == item_kind)
+        )
+
+        return await self.fetch_client_page(sql, item.c.id, start, limit)
+
     async def put_music_item(
         self, aime_id: int, music_item_data: Dict
     ) -> Optional[int]:
@@ -515,6 +553,12 @@ class OngekiItemData(BaseData):
             return None
         return result.lastrowid
 
+    async def put_music_items(self, aime_id: int, music_item_list: List[Dict]) -> bool:
+        for music_item_data in music_item_list:
+            music_item_data["user"] = aime_id
+
+        return await self.upsert_many(music_item, music_item_list)
+
     async def get_music_items(self, aime_id: int) -> Optional[List[Dict]]:
         sql = select(music_item).where(music_item.c.user == aime_id)
         result = await self.execute(sql)
@@ -804,6 +848,7 @@ class OngekiItemData(BaseData):
             return None
         return result.lastrowid
 
+    @read_only
     async def get_ranking_event_ranks(
         self, version: int, aime_id: int
     ) -> Optional[List[Dict]]:
@@ -829,10 +874,8 @@ class OngekiItemData(BaseData):
             return None
         return result.fetchall()
 
-    async def get_tech_event_ranking(
-        self, version: int, aime_id: int
-    ) -> Optional[List[Dict]]:
-        sql = select(
+    def tech_event_ranking_sql(self, version: int) -> Executable:
+        return select(
             tech_ranking.c.id,
             tech_ranking.c.user,
             tech_ranking.c.date,
@@ -849,7 +892,24 @@ class OngekiItemData(BaseData):
             tech_ranking.c.totalTechScore,
             tech_ranking.c.totalPlatinumScore,
         ).where(tech_ranking.c.version == version)
-        result = await self.execute(sql)
+
+    def hot_queries(self) -> List[HotQuery]:
+        """
+        Queries that dbutils.py check-indexes EXPLAINs, see core.data.index_check
+        """
+        return [
+            (
+                "ongeki tech event ranking",
+                "ongeki_tech_event_ranking_version_idx",
+                self.tech_event_ranking_sql(7),
+                {},
+            ),
+        ]
+
+    async def get_tech_event_ranking(
+        self, version: int, aime_id: int
+    ) -> Optional[List[Dict]]:
+        result = await self.execute(self.tech_event_ranking_sql(version))
         if result is None:
             self.logger.warning(f"aime_id: {aime_id} has no tech ranking ranks")
             return None
@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import Dict, List, Optional
 
 from core.data.schema import BaseData, metadata
@@ -172,6 +173,12 @@ class OngekiScoreData(BaseData):
             return None
         return result.lastrowid
 
+    async def put_best_scores(self, aime_id: int, music_detail_list: List[Dict]) -> bool:
+        for music_detail in music_detail_list:
+            music_detail["user"] = aime_id
+
+        return await self.upsert_many(score_best, music_detail_list)
+
     async def put_playlog(self, aime_id: int, playlog_data: Dict) -> Optional[int]:
         playlog_data["user"] = aime_id
 
@@ -184,3 +191,9 @@ class OngekiScoreData(BaseData):
             )
             return None
         return result.lastrowid
+
+    async def archive_playlogs(self, before: datetime) -> Optional[int]:
+        """
+        Moves playlogs from before the given date to the archive
+        """
+        return await self.archive_rows(playlog, playlog.c.userPlayDate < before)
@@ -1,5 +1,6 @@
 from typing import Dict, List, Optional
 
+from core.data import static_data, static_writer
 from core.data.schema import BaseData, metadata
 from core.data.schema.arcade import machine
 from sqlalchemy import Column, Table, UniqueConstraint, and_
@@ -192,6 +193,7 @@ game_point = Table(
 
 
 class OngekiStaticData(BaseData):
+    @static_writer("ongeki")
     async def put_card(self, version: int, card_id: int, **card_data) -> Optional[int]:
         sql = insert(cards).values(version=version, cardId=card_id, **card_data)
 
@@ -242,6 +244,7 @@ class OngekiStaticData(BaseData):
             return None
         return result.fetchall()
 
+    @static_data("ongeki")
     async def get_cards_by_rarity(
         self, version: int, rarity: int
     ) -> Optional[List[Dict]]:
@@ -252,6 +255,7 @@ class OngekiStaticData(BaseData):
             return None
         return result.fetchall()
 
+    @static_writer("ongeki")
     async def put_gacha(
         self,
         version: int,
@@ -325,6 +329,7 @@ class OngekiStaticData(BaseData):
             return None
         return result.fetchall()
 
+    @static_writer("ongeki")
     async def put_event(
         self, version: int, event_id: int, event_type: int, event_name: str
     ) -> Optional[int]:
@@ -364,6 +369,7 @@ class OngekiStaticData(BaseData):
             return None
         return result.fetchall()
 
+    @static_data("ongeki")
     async def get_enabled_events(self, version: int) -> Optional[List[Dict]]:
         sql = select(events).where(
             and_(events.c.version == version, events.c.enabled == True)
@@ -374,6 +380,7 @@ class OngekiStaticData(BaseData):
             return None
         return result.fetchall()
 
+    @static_writer("ongeki")
     async def put_chart(
         self,
         version: int,
@@ -444,6 +451,7 @@ class OngekiStaticData(BaseData):
             return None
         return result.fetchall()
 
+    @static_writer("ongeki")
     async def put_reward(
         self, version: int, rewardId: int, rewardname: str, itemKind: int, itemId: int
     ) -> Optional[int]:
@@ -463,6 +471,7 @@ class OngekiStaticData(BaseData):
             return None
         return result.lastrowid
 
+    @static_data("ongeki")
     async def get_reward_list(self, version: int) -> Optional[List[Dict]]:
         sql = select(rewards).where(rewards.c.version == version)
 
@@ -472,6 +481,7 @@ class OngekiStaticData(BaseData):
             return None
         return result.fetchall()
 
+    @static_data("ongeki")
     async def get_present_list(self, version: int) -> Optional[List[Dict]]:
         sql = select(present).where(present.c.version == version)
 
@@ -481,6 +491,7 @@ class OngekiStaticData(BaseData):
             return None
         return result.fetchall()
 
+    @static_data("ongeki")
     async def get_tech_music(self, version: int) -> Optional[List[Dict]]:
         sql = select(tech_music).where(tech_music.c.version == version)
 
@@ -1,4 +1,3 @@
-import json
 import logging
 import sys
 import traceback
@@ -9,7 +8,7 @@ from typing import Dict, List, Tuple
 
 import coloredlogs
 import yaml
-from core import CoreConfig, Utils
+from core import CoreConfig, Utils, serialization
 from core.title import BaseServlet
 from starlette.requests import Request
 from starlette.responses import Response
@@ -114,8 +113,9 @@ class WaccaServlet(BaseServlet):
 
     async def render_POST(self, request: Request) -> bytes:
         def end(resp: Dict) -> bytes:
-            hash = md5(json.dumps(resp, ensure_ascii=False).encode()).digest()
-            j_Resp = Response(json.dumps(resp, ensure_ascii=False))
+            body = serialization.dumps(resp)
+            hash = md5(body).digest()
+            j_Resp = Response(body)
             j_Resp.raw_headers.append((b"X-Wacca-Hash", hash.hex().encode()))
             return j_Resp
 
@@ -134,7 +134,7 @@ class WaccaServlet(BaseServlet):
             func_to_find = f"handle_{api}_{endpoint}_request"
 
         try:
-            req_json = json.loads(bod)
+            req_json = serialization.loads(bod)
             version_full = Version(req_json["appVersion"])
             req = BaseRequest(req_json)
 
@@ -192,31 +192,32 @@ class WaccaScoreData(BaseData):
         """
         Add an entry to the user's play log
         """
-        sql = playlog.insert().values(
-            user=user_id,
-            song_id=song_id,
-            chart_id=chart_id,
-            score=this_score,
-            clear=clear,
-            grade=grade,
-            max_combo=max_combo,
-            marv_ct=marv_ct,
-            great_ct=great_ct,
-            good_ct=good_ct,
-            miss_ct=miss_ct,
-            fast_ct=fast_ct,
-            late_ct=late_ct,
-            season=season,
+        result = await self.insert_later(
+            playlog,
+            {
+                "user": user_id,
+                "song_id": song_id,
+                "chart_id": chart_id,
+                "score": this_score,
+                "clear": clear,
+                "grade": grade,
+                "max_combo": max_combo,
+                "marv_ct": marv_ct,
+                "great_ct": great_ct,
+                "good_ct": good_ct,
+                "miss_ct": miss_ct,
+                "fast_ct": fast_ct,
+                "late_ct": late_ct,
+                "season": season,
+            },
         )
-
-        result = await self.execute(sql)
         if result is None:
             self.logger.error(
                 f"{__name__} failed to insert playlog! profile: {user_id}, song: {song_id}, chart: {chart_id}"
             )
             return None
 
-        return result.lastrowid
+        return result
 
     async def get_best_score(
         self, user_id: int, song_id: int, chart_id: int